@@ -1,4 +1,4 @@
-CREATE TABLE `fic_reports` (
+CREATE TABLE IF NOT EXISTS `fic_reports` (
 	`id` integer PRIMARY KEY AUTOINCREMENT NOT NULL,
 	`fic_id` text NOT NULL,
 	`ip_hash` text NOT NULL,
@@ -8,7 +8,7 @@ CREATE TABLE `fic_reports` (
 	FOREIGN KEY (`fic_id`) REFERENCES `fics`(`id`) ON UPDATE no action ON DELETE cascade
 );
 --> statement-breakpoint
-CREATE TABLE `fics` (
+CREATE TABLE IF NOT EXISTS `fics` (
 	`id` text PRIMARY KEY NOT NULL,
 	`title` text NOT NULL,
 	`author` text NOT NULL,
@@ -41,7 +41,7 @@ CREATE TABLE `fics` (
 	`updated_at` integer
 );
 --> statement-breakpoint
-CREATE TABLE `ratings` (
+CREATE TABLE IF NOT EXISTS `ratings` (
 	`fic_id` text NOT NULL,
 	`ip_hash` text NOT NULL,
 	`spice` integer,
@@ -54,7 +54,7 @@ CREATE TABLE `ratings` (
 	FOREIGN KEY (`fic_id`) REFERENCES `fics`(`id`) ON UPDATE no action ON DELETE cascade
 );
 --> statement-breakpoint
-CREATE TABLE `shared_collections` (
+CREATE TABLE IF NOT EXISTS `shared_collections` (
 	`share_id` text PRIMARY KEY NOT NULL,
 	`title` text DEFAULT 'My Collection',
 	`content_json` text NOT NULL,
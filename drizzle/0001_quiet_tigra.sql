@@ -0,0 +1,15 @@
+CREATE TABLE `fic_tags` (
+	`fic_id` text NOT NULL,
+	`tag_id` integer NOT NULL,
+	PRIMARY KEY(`fic_id`, `tag_id`)
+);
+--> statement-breakpoint
+CREATE INDEX `fic_tags_tag_id_idx` ON `fic_tags` (`tag_id`,`fic_id`);--> statement-breakpoint
+CREATE TABLE `tags` (
+	`id` integer PRIMARY KEY NOT NULL,
+	`name` text NOT NULL,
+	`kind` text NOT NULL
+);
+--> statement-breakpoint
+CREATE UNIQUE INDEX `tags_name_idx` ON `tags` (`name`);--> statement-breakpoint
+CREATE INDEX `tags_kind_name_idx` ON `tags` (`kind`,`name`);
@@ -0,0 +1,22 @@
+-- Custom SQL migration file, put your code below! --
+-- FTS5 index for /api/fics search, kept in sync by the ETL (scripts/etl_pipeline.py).
+-- Virtual tables are not part of the drizzle schema. The ETL creates and fills
+-- the index itself when it is missing, so both steps are no-ops after a load.
+CREATE VIRTUAL TABLE IF NOT EXISTS `fics_fts` USING fts5(
+	`title`,
+	`author`,
+	`summary`,
+	`tags`,
+	tokenize = 'porter unicode61 remove_diacritics 2',
+	prefix = '2 3'
+);
+--> statement-breakpoint
+INSERT INTO `fics_fts` (`rowid`, `title`, `author`, `summary`, `tags`)
+SELECT
+	CAST(`id` AS INTEGER),
+	`title`,
+	`author`,
+	`summary`,
+	(SELECT group_concat(`value`, '; ') FROM json_each(`fics`.`tags_json`))
+FROM `fics`
+WHERE NOT EXISTS (SELECT 1 FROM `fics_fts`);
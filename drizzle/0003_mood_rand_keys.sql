@@ -0,0 +1,14 @@
+ALTER TABLE `fics` ADD `mood_fluff` integer DEFAULT false NOT NULL;--> statement-breakpoint
+ALTER TABLE `fics` ADD `mood_angst` integer DEFAULT false NOT NULL;--> statement-breakpoint
+ALTER TABLE `fics` ADD `mood_spicy` integer DEFAULT false NOT NULL;--> statement-breakpoint
+ALTER TABLE `fics` ADD `rand_key` integer DEFAULT 0 NOT NULL;--> statement-breakpoint
+CREATE INDEX `fics_rand_key_idx` ON `fics` (`rand_key`);--> statement-breakpoint
+CREATE INDEX `fics_mood_fluff_rand_key_idx` ON `fics` (`mood_fluff`,`rand_key`);--> statement-breakpoint
+CREATE INDEX `fics_mood_angst_rand_key_idx` ON `fics` (`mood_angst`,`rand_key`);--> statement-breakpoint
+CREATE INDEX `fics_mood_spicy_rand_key_idx` ON `fics` (`mood_spicy`,`rand_key`);--> statement-breakpoint
+-- Backfill existing rows; the ETL keeps both up to date from here on
+UPDATE `fics` SET
+	`mood_fluff` = ifnull(`base_fluff`, 0) >= 4,
+	`mood_angst` = ifnull(`base_angst`, 0) >= 4,
+	`mood_spicy` = ifnull(`base_spice`, 0) >= 4,
+	`rand_key` = abs(random() % 2147483648);
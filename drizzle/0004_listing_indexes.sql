@@ -0,0 +1,29 @@
+CREATE TABLE IF NOT EXISTS `fic_counts` (
+	`rating` text NOT NULL,
+	`status` text NOT NULL,
+	`word_bucket` text NOT NULL,
+	`count` integer NOT NULL,
+	PRIMARY KEY(`rating`, `status`, `word_bucket`)
+);
+--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `fics_created_at_id_idx` ON `fics` (`created_at`,`id`,`rating`,`status`,`words`);--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `fics_kudos_id_idx` ON `fics` (`kudos`,`id`,`rating`,`status`,`words`);--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `fics_words_id_idx` ON `fics` (`words`,`id`,`rating`,`status`);--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `fics_rating_status_words_idx` ON `fics` (`rating`,`status`,`words`);--> statement-breakpoint
+-- The ETL creates the table and indexes too, and rebuilds the listing totals
+-- after each load; recount them here in case a load already filled the table
+DELETE FROM `fic_counts`;--> statement-breakpoint
+INSERT INTO `fic_counts` (`rating`, `status`, `word_bucket`, `count`)
+SELECT
+	ifnull(`rating`, ''),
+	ifnull(`status`, ''),
+	CASE
+		WHEN ifnull(`words`, 0) < 5000 THEN 'short'
+		WHEN ifnull(`words`, 0) < 20000 THEN 'medium'
+		WHEN ifnull(`words`, 0) < 50000 THEN 'long'
+		WHEN ifnull(`words`, 0) < 100000 THEN 'epic'
+		ELSE 'legendary'
+	END,
+	count(*)
+FROM `fics`
+GROUP BY 1, 2, 3;
@@ -0,0 +1,28 @@
+CREATE TABLE IF NOT EXISTS `fic_facets` (
+	`facet` text NOT NULL,
+	`value` text NOT NULL,
+	`count` integer NOT NULL,
+	PRIMARY KEY(`facet`, `value`)
+);
+--> statement-breakpoint
+CREATE INDEX IF NOT EXISTS `fic_facets_facet_count_idx` ON `fic_facets` (`facet`,`count`);--> statement-breakpoint
+-- Count existing rows once, unless an ETL load already created and counted the
+-- table; the ETL keeps the counts current from here on.
+-- Tags are only counted for fics that have fic_tags rows (see README: Deploying)
+INSERT INTO `fic_facets` (`facet`, `value`, `count`)
+SELECT `facet`, `value`, count(*) FROM (
+	SELECT 'rating' AS `facet`, ifnull(`rating`, '') AS `value` FROM `fics`
+	UNION ALL SELECT 'status', ifnull(`status`, '') FROM `fics`
+	UNION ALL SELECT 'words', CASE
+		WHEN ifnull(`words`, 0) < 5000 THEN 'short'
+		WHEN ifnull(`words`, 0) < 20000 THEN 'medium'
+		WHEN ifnull(`words`, 0) < 50000 THEN 'long'
+		WHEN ifnull(`words`, 0) < 100000 THEN 'epic'
+		ELSE 'legendary'
+	END FROM `fics`
+	UNION ALL SELECT `tags`.`kind`, `tags`.`name` FROM `fic_tags`
+		JOIN `tags` ON `tags`.`id` = `fic_tags`.`tag_id`
+		JOIN `fics` ON `fics`.`id` = `fic_tags`.`fic_id`
+)
+WHERE NOT EXISTS (SELECT 1 FROM `fic_facets`)
+GROUP BY `facet`, `value`;
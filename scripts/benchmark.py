@@ -0,0 +1,712 @@
+"""
+CaitVi Hub - ETL Pipeline Benchmarks
+
+Measures the hot stages of etl_pipeline.py against synthetic corpora
+without touching archiveofourown.org. Search and work pages are rendered
+in AO3's markup and served from a local HTTP stand-in; every AO3 session
+the pipeline opens is pointed at it through a requests transport adapter.
+
+Usage:
+    # Default run: 1k, 10k and 100k works, report to benchmark_report.json
+    python benchmark.py
+
+    # Quick run, compared against an earlier report
+    python benchmark.py --sizes 1000 --baseline benchmark_report.json
+
+    # Fail (exit 1) when any stage is more than 20% slower than the baseline
+    python benchmark.py --baseline old.json --threshold 0.2
+"""
+
+import argparse
+import bisect
+import contextlib
+import html
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from AO3.search import get_work_from_banner
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+import etl_pipeline as etl
+
+AO3_URL = "https://archiveofourown.org"
+RESULTS_PER_PAGE = 20
+
+# ============== Synthetic Corpus ==============
+
+RATINGS = [
+    "General Audiences",
+    "Teen And Up Audiences",
+    "Mature",
+    "Explicit",
+    "Not Rated",
+]
+CATEGORIES = ["F/F", "F/M", "Gen", "Multi", "Other"]
+CHARACTERS = ["Vi (League of Legends)", "Caitlyn (League of Legends)", "Jinx (League of Legends)"]
+FILLER_TAGS = [f"Additional Tag {i}" for i in range(2000)]
+
+
+def rule_tags() -> list[str]:
+    """Freeform tags that trigger TAG_RULES, in AO3's title case."""
+    tags = [key.title() for key in etl.TAG_RULES]
+    tags += [f"{key.title()} - Alternate Universe" for key in list(etl.TAG_RULES)[::3]]
+    return tags
+
+
+def make_corpus(size: int, seed: int = 0) -> list[dict]:
+    """Deterministic synthetic works shaped like AO3 search results.
+
+    Kudos follow a heavy-tailed distribution like the real archive, and
+    roughly half of each work's tags match a scoring rule.
+    """
+    rng = random.Random(seed)
+    matching = rule_tags()
+    base_date = datetime(2025, 1, 1)
+
+    works = []
+    for i in range(size):
+        work_id = 10_000_000 + i
+        tags = rng.sample(matching, rng.randint(3, 10))
+        tags += rng.sample(FILLER_TAGS, rng.randint(3, 12))
+        chapters = rng.randint(1, 30)
+        words = rng.randint(500, 4_000) * chapters
+        paragraphs = "".join(
+            f"<p>Paragraph {n} of the summary for work {work_id} &amp; friends.</p>"
+            for n in range(rng.randint(1, 4))
+        )
+        works.append(
+            {
+                "id": work_id,
+                "title": f"Synthetic Work {i}",
+                "authors": [f"author{rng.randint(1, size // 5 + 1)}"],
+                "fandoms": ["Arcane: League of Legends (Cartoon 2021)"],
+                "relationships": ["Caitlyn/Vi (League of Legends)"],
+                "characters": rng.sample(CHARACTERS, rng.randint(1, 3)),
+                "tags": tags,
+                "rating": rng.choice(RATINGS),
+                "categories": [rng.choice(CATEGORIES)],
+                "summary": paragraphs,
+                "words": words,
+                "chapters": chapters,
+                "expected_chapters": chapters if rng.random() < 0.6 else None,
+                "kudos": int(rng.paretovariate(1.1) * 20),
+                "hits": rng.randint(100, 200_000),
+                "comments": rng.randint(0, 2_000),
+                "bookmarks": rng.randint(0, 3_000),
+                "date_updated": base_date - timedelta(days=rng.randint(0, 1_500)),
+            }
+        )
+    return works
+
+
+def search_result(work: dict) -> SimpleNamespace:
+    """Stand-in for the AO3.Work banner object a search page yields."""
+    return SimpleNamespace(
+        id=work["id"],
+        title=work["title"],
+        authors=[SimpleNamespace(username=name) for name in work["authors"]],
+        fandoms=work["fandoms"],
+        characters=work["characters"],
+        relationships=work["relationships"],
+        tags=work["tags"],
+        words=work["words"],
+        chapters=[],
+        kudos=work["kudos"],
+        hits=work["hits"],
+        comments=work["comments"],
+        bookmarks=work["bookmarks"],
+        rating=work["rating"],
+        status="Completed" if work["expected_chapters"] else "Work in Progress",
+        categories=work["categories"],
+        summary=work["summary"],
+    )
+
+
+# ============== AO3 Markup ==============
+
+
+def _links(items: list[str]) -> str:
+    return "".join(f'<li><a class="tag" href="/tags/x">{html.escape(t)}</a></li>' for t in items)
+
+
+def _chapters_text(work: dict) -> str:
+    expected = work["expected_chapters"] or "?"
+    return f"{work['chapters']}/{expected}"
+
+
+def render_banner(work: dict) -> str:
+    """A work blurb as it appears in AO3 search results."""
+    author = html.escape(work["authors"][0])
+    tag_items = [
+        ("relationships", work["relationships"]),
+        ("characters", work["characters"]),
+        ("freeforms", work["tags"]),
+    ]
+    tags = "".join(
+        f'<li class="{cls}"><a class="tag" href="/tags/x">{html.escape(tag)}</a></li>'
+        for cls, values in tag_items
+        for tag in values
+    )
+    return f"""<li id="work_{work['id']}" class="work blurb group" role="article">
+<div class="header module">
+<h4 class="heading"><a href="/works/{work['id']}">{html.escape(work['title'])}</a> by <a rel="author" href="/users/{author}/pseuds/{author}">{author}</a></h4>
+<h5 class="fandoms heading"><span class="landmark">Fandoms:</span> {''.join(f'<a class="tag" href="/tags/x">{html.escape(f)}</a>' for f in work['fandoms'])}</h5>
+<ul class="required-tags">
+<li><span class="rating" title="{work['rating']}"><span class="text">{work['rating']}</span></span></li>
+<li><span class="category" title="{work['categories'][0]}"><span class="text">{', '.join(work['categories'])}</span></span></li>
+</ul>
+<p class="datetime">{work['date_updated'].strftime('%d %b %Y')}</p>
+</div>
+<ul class="tags commas">{tags}</ul>
+<blockquote class="userstuff summary">{work['summary']}</blockquote>
+<dl class="stats">
+<dt class="language">Language:</dt><dd class="language" lang="en">English</dd>
+<dt class="words">Words:</dt><dd class="words">{work['words']:,}</dd>
+<dt class="chapters">Chapters:</dt><dd class="chapters">{_chapters_text(work)}</dd>
+<dt class="comments">Comments:</dt><dd class="comments">{work['comments']:,}</dd>
+<dt class="kudos">Kudos:</dt><dd class="kudos">{work['kudos']:,}</dd>
+<dt class="bookmarks">Bookmarks:</dt><dd class="bookmarks">{work['bookmarks']:,}</dd>
+<dt class="hits">Hits:</dt><dd class="hits">{work['hits']:,}</dd>
+</dl>
+</li>"""
+
+
+def render_search_page(works: list[dict], total: int) -> str:
+    if not total:
+        return """<html><body><div class="works-search region" id="main">
+<p>No results found. You may want to edit your search to make it less specific.</p>
+</div></body></html>"""
+    banners = "\n".join(render_banner(work) for work in works)
+    return f"""<html><body><div class="works-search region" id="main">
+<h3 class="heading">{total:,} Found</h3>
+<ol class="work index group">
+{banners}
+</ol>
+</div></body></html>"""
+
+
+PROSE = [
+    "Caitlyn watched the rain trace crooked lines down the window of the Enforcer station.",
+    "\"You always look at me like I'm a case you haven't solved yet,\" Vi said, leaning on the doorframe.",
+    "The lamps of Piltover hummed somewhere far above, indifferent to the two of them.",
+    "She did not answer, because any answer would have been an admission.",
+    "Vi's knuckles were split again, and Caitlyn found she could not look away from them.",
+    "\"Cupcake, you're allowed to say you missed me.\"",
+    "Somewhere below, Zaun breathed its green smoke into the night.",
+    "It was late, and both of them were too tired to pretend anymore.",
+]
+
+
+def render_chapter_text(work: dict, n: int) -> str:
+    """A few paragraphs of prose, deterministic per work and chapter."""
+    rng = random.Random(work["id"] * 1000 + n)
+    paragraphs = (
+        f"<p>{html.escape(' '.join(rng.sample(PROSE, 3)), quote=False).replace('Vi', '<em>Vi</em>', 1)}</p>"
+        for _ in range(12)
+    )
+    return "\n".join(paragraphs)
+
+
+def render_work_page(work: dict, full: bool = True) -> str:
+    """A work page; with full (view_full_work=true) it shows every chapter."""
+    chapters = "\n".join(
+        f"""<div class="chapter" id="chapter-{n}">
+<div class="chapter preface group"><h3 class="title"><a href="/works/{work['id']}/chapters/{work['id'] * 100 + n}">Chapter {n}</a></h3>
+<div class="notes module"><h3 class="heading">Notes:</h3><blockquote class="userstuff"><p>Author's note for chapter {n}, thank you all for reading and commenting!</p></blockquote></div></div>
+<div class="userstuff module" role="article">{render_chapter_text(work, n)}</div>
+</div>"""
+        for n in range(1, (work["chapters"] if full else 1) + 1)
+    )
+    return f"""<html><body><div id="main" class="works-show region">
+<div class="wrapper"><dl class="work meta group">
+<dt class="rating tags">Rating:</dt><dd class="rating tags"><ul class="commas">{_links([work['rating']])}</ul></dd>
+<dt class="category tags">Category:</dt><dd class="category tags"><ul class="commas">{_links(work['categories'])}</ul></dd>
+<dt class="fandom tags">Fandom:</dt><dd class="fandom tags"><ul class="commas">{_links(work['fandoms'])}</ul></dd>
+<dt class="relationship tags">Relationship:</dt><dd class="relationship tags"><ul class="commas">{_links(work['relationships'])}</ul></dd>
+<dt class="character tags">Characters:</dt><dd class="character tags"><ul class="commas">{_links(work['characters'])}</ul></dd>
+<dt class="freeform tags">Additional Tags:</dt><dd class="freeform tags"><ul class="commas">{_links(work['tags'])}</ul></dd>
+<dt class="stats">Stats:</dt><dd class="stats"><dl class="stats">
+<dt class="published">Published:</dt><dd class="published">{work['date_updated'].strftime('%Y-%m-%d')}</dd>
+<dt class="words">Words:</dt><dd class="words">{work['words']:,}</dd>
+<dt class="chapters">Chapters:</dt><dd class="chapters">{_chapters_text(work)}</dd>
+<dt class="comments">Comments:</dt><dd class="comments">{work['comments']:,}</dd>
+<dt class="kudos">Kudos:</dt><dd class="kudos">{work['kudos']:,}</dd>
+<dt class="bookmarks">Bookmarks:</dt><dd class="bookmarks">{work['bookmarks']:,}</dd>
+<dt class="hits">Hits:</dt><dd class="hits">{work['hits']:,}</dd>
+</dl></dd></dl></div>
+<div id="workskin"><div class="preface group">
+<h2 class="title heading">{html.escape(work['title'])}</h2>
+<h3 class="byline heading"><a rel="author" href="/users/x">{html.escape(', '.join(work['authors']))}</a></h3>
+<div class="summary module"><h3 class="heading">Summary:</h3><blockquote class="userstuff">{work['summary']}</blockquote></div>
+</div>
+<div id="chapters">{chapters}</div></div>
+</div></body></html>"""
+
+
+# ============== Local AO3 Stand-in ==============
+
+
+def parse_kudos_constraint(value: str) -> tuple:
+    """Inclusive (low, high) bounds for an AO3 kudos constraint string."""
+    value = value.strip()
+    if not value:
+        return 0, None
+    if value.startswith("<"):
+        return 0, int(value[1:]) - 1
+    if value.startswith(">"):
+        return int(value[1:]) + 1, None
+    low, high = value.split("-")
+    return int(low), int(high)
+
+
+class AO3StandIn:
+    """Local HTTP server answering AO3 search and work URLs from a corpus.
+
+    Search results are sorted by kudos (highest first) and honour the kudos
+    constraint and page number, which is all the pipeline's crawls vary.
+    """
+
+    def __init__(self, works: list[dict]):
+        self.works = {work["id"]: work for work in works}
+        self.by_kudos = sorted(works, key=lambda work: work["kudos"])
+        self.kudos_keys = [work["kudos"] for work in self.by_kudos]
+        self.requests = 0
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, body = stand_in.respond(self.path)
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "AO3StandIn":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, path: str) -> tuple[int, str]:
+        self.requests += 1
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+
+        if url.path == "/works/search":
+            low, high = parse_kudos_constraint(
+                query.get("work_search[kudos_count]", [""])[0]
+            )
+            start = bisect.bisect_left(self.kudos_keys, low)
+            end = len(self.kudos_keys) if high is None else bisect.bisect_right(self.kudos_keys, high)
+            total = max(0, end - start)
+            page = int(query.get("page", ["1"])[0])
+            # Highest kudos first, as in sort_column=kudos_count
+            top = end - (page - 1) * RESULTS_PER_PAGE
+            works = self.by_kudos[max(start, top - RESULTS_PER_PAGE):max(start, top)][::-1]
+            return 200, render_search_page(works, total)
+
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "works" and parts[1].isdigit():
+            work = self.works.get(int(parts[1]))
+            if work is not None:
+                return 200, render_work_page(work, "view_full_work" in query)
+        return 404, '<html><body><h2 class="heading">Error 404</h2></body></html>'
+
+    def adapter(self) -> HTTPAdapter:
+        return StandInAdapter(self.base_url)
+
+
+class StandInAdapter(HTTPAdapter):
+    """Transport adapter that sends archiveofourown.org requests to the stand-in."""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        if request.url.startswith(AO3_URL):
+            request.url = self.base_url + request.url[len(AO3_URL):]
+        return super().send(request, **kwargs)
+
+
+# ============== Benchmarks ==============
+
+
+def timed(fn: Callable[[], object], repeat: int) -> tuple[float, object]:
+    """Best wall time of repeat runs of fn, and the result of the last run."""
+    best = math.inf
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def quiet():
+    """Silence the pipeline's progress output while timing."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def ao3_api_parse_page(content: bytes) -> list:
+    """Parse a search page the way AO3.Search.update() does."""
+    soup = BeautifulSoup(content, features="lxml")
+    listing = soup.find("ol", {"class": ("work", "index", "group")})
+    if listing is None:
+        return []
+    return [
+        get_work_from_banner(work)
+        for work in listing.find_all("li", {"role": "article"})
+        if work.h4 is not None
+    ]
+
+
+def bench_stages(works: list[dict], repeat: int, workdir: str) -> list[dict]:
+    size = len(works)
+    results = []
+
+    def record(name: str, seconds: float, items: int, **extra) -> None:
+        results.append(
+            {
+                "name": name,
+                "size": size,
+                "items": items,
+                "seconds": round(seconds, 6),
+                "per_second": round(items / seconds, 1) if seconds else None,
+                **extra,
+            }
+        )
+        print(f"  {name:<28} {items:>8} items  {seconds:9.3f}s  {items / seconds:12,.0f}/s")
+
+    seconds, _ = timed(
+        lambda: [
+            etl.calculate_metrics(w["tags"], etl.map_rating(w["rating"]), w["words"])
+            for w in works
+        ],
+        repeat,
+    )
+    record("calculate_metrics", seconds, size)
+
+    banners = [search_result(w) for w in works]
+    with quiet():
+        seconds, fics = timed(lambda: [etl.parse_search_result(b) for b in banners], repeat)
+    record("parse_search_result", seconds, size)
+
+    pages = [
+        render_search_page(works[i : i + RESULTS_PER_PAGE], size).encode()
+        for i in range(0, size, RESULTS_PER_PAGE)
+    ]
+    seconds, _ = timed(lambda: [ao3_api_parse_page(p) for p in pages], repeat)
+    record("parse_page[ao3-api]", seconds, size)
+    seconds, _ = timed(lambda: [etl.parse_search_page(p) for p in pages], repeat)
+    record("parse_page[lxml]", seconds, size)
+
+    chapter_pages = [render_work_page(w, full=False).encode() for w in works]
+
+    def extract_quotes() -> list[str]:
+        quotes = []
+        for page in chapter_pages:
+            extractor = etl.QuoteExtractor()
+            for start in range(0, len(page), etl.QUOTE_CHUNK_BYTES):
+                if extractor.feed(page[start : start + etl.QUOTE_CHUNK_BYTES]):
+                    break
+            extractor.close()
+            quotes.append(max(extractor.candidates, key=etl.score_sentence, default=""))
+        return quotes
+
+    seconds, _ = timed(extract_quotes, repeat)
+    record("extract_quote", seconds, size)
+
+    summaries = [w["summary"] for w in works]
+    seconds, _ = timed(lambda: [etl.clean_summary(s) for s in summaries], repeat)
+    record("clean_summary", seconds, size)
+
+    sql_path = os.path.join(workdir, f"bench_{size}.sql")
+    with quiet():
+        seconds, paths = timed(lambda: etl.generate_sql_file(fics, sql_path), repeat)
+    record(
+        "generate_sql_file",
+        seconds,
+        size,
+        output_bytes=sum(os.path.getsize(p) for p in paths),
+    )
+
+    # Each repeat appends one more snapshot to the same warehouse
+    warehouse = os.path.join(workdir, f"bench_{size}_warehouse")
+
+    def write_snapshot() -> list[str]:
+        sink = etl.ParquetSink(warehouse)
+        for i in range(0, size, RESULTS_PER_PAGE):
+            sink.write_page(fics[i : i + RESULTS_PER_PAGE])
+        return sink.close()
+
+    with quiet():
+        seconds, _ = timed(write_snapshot, repeat)
+    data_files = [
+        os.path.join(root, name)
+        for root, _, names in os.walk(warehouse)
+        for name in names
+        if name.endswith(".parquet")
+    ]
+    record(
+        "write_parquet_snapshot",
+        seconds,
+        size,
+        output_bytes=sum(os.path.getsize(p) for p in data_files) // max(1, repeat),
+    )
+    return results
+
+
+def bench_pipeline(
+    works: list[dict], workdir: str, batch_works: int, workers: int
+) -> list[dict]:
+    """End-to-end run_pipeline over HTTP against the local stand-in."""
+    size = len(works)
+    results = []
+
+    with AO3StandIn(works) as stand_in:
+        etl.cache.work_cache = None
+        etl.session.session_pool = etl.SessionPool(
+            size=workers, adapters={AO3_URL: stand_in.adapter()}
+        )
+
+        output = os.path.join(workdir, f"pipeline_{size}.sql")
+        with quiet():
+            start = time.perf_counter()
+            total = etl.run_pipeline(
+                "full",
+                output,
+                "sql",
+                min_kudos=0,
+                page_limit=math.ceil(size / RESULTS_PER_PAGE) + 1,
+                page_delay=0,
+            )
+            seconds = time.perf_counter() - start
+        results.append(
+            {
+                "name": "run_pipeline[full]",
+                "size": size,
+                "items": total,
+                "seconds": round(seconds, 6),
+                "per_second": round(total / seconds, 1) if seconds else None,
+                "requests": stand_in.requests,
+            }
+        )
+        print(f"  {'run_pipeline[full]':<28} {total:>8} items  {seconds:9.3f}s  {total / seconds:12,.0f}/s")
+
+        work_ids = [w["id"] for w in works[:batch_works]]
+        if work_ids:
+            requests_before = stand_in.requests
+            output = os.path.join(workdir, f"batch_{size}.sql")
+            with quiet():
+                start = time.perf_counter()
+                total = etl.run_pipeline(
+                    "batch",
+                    output,
+                    "sql",
+                    work_ids=work_ids,
+                    workers=workers,
+                    rate=1_000_000,
+                )
+                seconds = time.perf_counter() - start
+            results.append(
+                {
+                    "name": "run_pipeline[batch]",
+                    "size": size,
+                    "items": total,
+                    "seconds": round(seconds, 6),
+                    "per_second": round(total / seconds, 1) if seconds else None,
+                    "requests": stand_in.requests - requests_before,
+                }
+            )
+            print(f"  {'run_pipeline[batch]':<28} {total:>8} items  {seconds:9.3f}s  {total / seconds:12,.0f}/s")
+
+            # Detail refresh: the first crawl fetches every work, the rerun none
+            listing_index = os.path.join(workdir, f"listings_{size}.json")
+            for name in ("run_pipeline[details-cold]", "run_pipeline[details-warm]"):
+                requests_before = stand_in.requests
+                output = os.path.join(workdir, f"details_{size}.sql")
+                with quiet():
+                    start = time.perf_counter()
+                    total = etl.run_pipeline(
+                        "full",
+                        output,
+                        "sql",
+                        min_kudos=0,
+                        page_limit=math.ceil(len(work_ids) / RESULTS_PER_PAGE),
+                        page_delay=0,
+                        details=True,
+                        listing_index=listing_index,
+                        workers=workers,
+                        rate=1_000_000,
+                    )
+                    seconds = time.perf_counter() - start
+                results.append(
+                    {
+                        "name": name,
+                        "size": size,
+                        "items": total,
+                        "seconds": round(seconds, 6),
+                        "per_second": round(total / seconds, 1) if seconds else None,
+                        "requests": stand_in.requests - requests_before,
+                    }
+                )
+                print(f"  {name:<28} {total:>8} items  {seconds:9.3f}s  {total / seconds:12,.0f}/s")
+
+    return results
+
+
+# ============== Report ==============
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> list[str]:
+    """Print throughput changes against a previous report; return regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (r["name"], r["size"]): r for r in json.load(f).get("results", [])
+        }
+
+    regressions = []
+    print(f"\n📊 Compared with {baseline_path}:")
+    for result in results:
+        previous = baseline.get((result["name"], result["size"]))
+        if not previous or not previous.get("per_second") or not result["per_second"]:
+            continue
+        change = result["per_second"] / previous["per_second"] - 1
+        marker = "⚠️" if change < -threshold else "  "
+        print(f"{marker} {result['name']:<28} n={result['size']:<7} {change:+7.1%}")
+        if change < -threshold:
+            regressions.append(f"{result['name']} (n={result['size']})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CaitVi Hub ETL benchmarks")
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default="1000,10000,100000",
+        help="Comma-separated corpus sizes",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per stage; the best is reported"
+    )
+    parser.add_argument(
+        "--pipeline-max-works",
+        type=int,
+        default=10000,
+        help="Cap on works crawled by the end-to-end run_pipeline benchmark",
+    )
+    parser.add_argument(
+        "--batch-works",
+        type=int,
+        default=500,
+        help="Work pages fetched by the batch-mode benchmark",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Workers for the batch-mode benchmark"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument(
+        "--output",
+        type=str,
+        default="benchmark_report.json",
+        help="Report file path",
+    )
+    parser.add_argument(
+        "--baseline", type=str, default=None, help="Earlier report to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Throughput drop vs. baseline treated as a regression (0.2 = 20%%)",
+    )
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            print(f"🏁 Corpus of {size:,} works")
+            works = make_corpus(size, args.seed)
+            results.extend(bench_stages(works, args.repeat, workdir))
+
+            pipeline_works = works[: args.pipeline_max_works]
+            results.extend(
+                bench_pipeline(
+                    pipeline_works,
+                    workdir,
+                    min(args.batch_works, len(pipeline_works)),
+                    args.workers,
+                )
+            )
+
+    report = {
+        "version": 1,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📁 Report saved to: {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Stages of the CaitVi Hub ETL pipeline; etl_pipeline.py is its command line."""
@@ -0,0 +1,210 @@
+"""Full crawls split into kudos bands that are crawled in parallel."""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+
+import AO3
+
+from .models import FicData
+from .governor import RequestGovernor
+from .session import get_session
+from .crawl import (
+    CrawlInterrupted,
+    ListingIndex,
+    build_search_params,
+    fetch_search_page,
+    iter_search_pages,
+)
+
+
+# ============== Kudos-Band Sharding ==============
+
+
+def constraint_bounds(min_kudos: int, max_kudos: Optional[int]) -> tuple:
+    """Inclusive (low, high) kudos range matched by Constraint(min, max).
+
+    AO3 reads "<N" and ">N" as exclusive, so e.g. Constraint(500, None)
+    (">500") covers 501 and up. high is None when unbounded.
+    """
+    if not min_kudos and not max_kudos:
+        return 0, None
+    if max_kudos is None:
+        return min_kudos + 1, None
+    if not min_kudos:
+        return 0, max_kudos - 1
+    return min_kudos, max_kudos
+
+
+def kudos_constraint(low: int, high: Optional[int]):
+    """AO3 kudos constraint covering the inclusive range [low, high]."""
+    if high is None:
+        # ">N" is exclusive; Constraint(0, None) cannot express ">0"
+        return AO3.utils.Constraint(low - 1, None) if low > 1 else None
+    if low <= 0:
+        return AO3.utils.Constraint(0, high + 1)
+    return AO3.utils.Constraint(low, high)
+
+
+def count_search_results(search_kwargs: dict, kudos, governor: RequestGovernor) -> int:
+    """Number of works a search matches, read from its first page."""
+    params = build_search_params(
+        search_kwargs["tags"],
+        days_back=search_kwargs.get("days_back", 0),
+        sort_by=search_kwargs.get("sort_by", "kudos_count"),
+        kudos=kudos,
+    )
+    search = AO3.Search(**params, session=get_session())
+
+    try:
+        _, total = governor.call(
+            lambda: fetch_search_page(search, params, 1), f"Probe for kudos {kudos}"
+        )
+    except Exception as e:
+        print(f"❌ Probe for kudos {kudos} failed: {e}")
+        raise CrawlInterrupted(1) from e
+    return total
+
+
+def plan_kudos_bands(
+    search_kwargs: dict,
+    band_pages: int,
+    governor: RequestGovernor,
+) -> list[list]:
+    """Split the kudos range into bands that each fit within band_pages pages.
+
+    Bands are probed and halved until every band's result count fits the
+    page budget. The open-ended top band is split geometrically since kudos
+    counts are heavy-tailed.
+
+    Returns:
+        [low, high] inclusive bands (high None for unbounded), highest first
+    """
+    capacity = band_pages * 20
+    low, high = constraint_bounds(
+        search_kwargs.get("min_kudos", 0), search_kwargs.get("max_kudos")
+    )
+
+    bands = []
+    stack = [(low, high)]
+    while stack:
+        low, high = stack.pop()
+        total = count_search_results(search_kwargs, kudos_constraint(low, high), governor)
+        print(f"📐 Kudos band {low}-{high if high is not None else '∞'}: {total} works")
+
+        if total <= capacity or low == high:
+            if total > capacity:
+                print(f"⚠️ Band {low}-{high} exceeds {band_pages} pages and cannot be split")
+            if total:
+                bands.append([low, high])
+            continue
+
+        if high is None:
+            middle = max(low * 2, low + 100)
+            stack.append((low, middle - 1))
+            stack.append((middle, None))
+        else:
+            middle = (low + high) // 2
+            stack.append((low, middle))
+            stack.append((middle + 1, high))
+
+    bands.sort(key=lambda band: band[0], reverse=True)
+    print(f"📐 Planned {len(bands)} kudos bands")
+    return bands
+
+
+_BAND_DONE = object()
+
+
+def iter_sharded_pages(
+    search_kwargs: dict,
+    workers: int = 4,
+    band_pages: int = 10,
+    rate: Optional[float] = None,
+    seen_ids: Optional[set] = None,
+    progress: Optional[dict] = None,
+    listing: Optional[ListingIndex] = None,
+    governor: Optional[RequestGovernor] = None,
+) -> Iterator[tuple[int, list[FicData]]]:
+    """Crawl kudos bands concurrently and yield pages deduplicated by ID.
+
+    Args:
+        search_kwargs: iter_search_pages arguments for the whole crawl
+        workers: Number of bands crawled at the same time
+        band_pages: Page budget per band, used to plan the bands
+        rate: Starting AO3 request rate shared by all workers (requests/second)
+        seen_ids: Fic IDs already written; updated in place
+        progress: Band plan and completed bands; updated in place so callers
+            can checkpoint it
+        listing: Listing index passed on to every band's crawl
+        governor: Shared request governor (created from rate when omitted)
+
+    Closing the generator early cancels the bands not started yet and stops
+    the running ones without waiting out their governor backoff.
+
+    Yields:
+        (sequence number, new FicData) as pages arrive from any band; an empty
+        page marks a band as completed
+    """
+    seen_ids = set() if seen_ids is None else seen_ids
+    progress = {} if progress is None else progress
+    governor = governor or RequestGovernor(rate or 0.2 * workers)
+
+    if "bands" not in progress:
+        progress["bands"] = plan_kudos_bands(search_kwargs, band_pages, governor)
+        progress["completed"] = []
+
+    pending = [band for band in progress["bands"] if band not in progress["completed"]]
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def crawl(band: list) -> None:
+        if stop.is_set():
+            return
+        try:
+            for _, page_fics in iter_search_pages(
+                tags=search_kwargs["tags"],
+                days_back=search_kwargs.get("days_back", 0),
+                sort_by="kudos_count",
+                page_limit=band_pages,
+                kudos=kudos_constraint(*band),
+                governor=governor,
+                listing=listing,
+                stop=stop,
+            ):
+                results.put((band, page_fics))
+                if stop.is_set():
+                    return
+            if not stop.is_set():
+                results.put((band, _BAND_DONE))
+        except Exception as e:
+            results.put((band, e))
+
+    sequence = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    for band in pending:
+        executor.submit(crawl, band)
+
+    try:
+        remaining = len(pending)
+        while remaining:
+            band, item = results.get()
+            if item is _BAND_DONE:
+                remaining -= 1
+                progress["completed"].append(band)
+                item = []
+            elif isinstance(item, Exception):
+                raise item
+
+            page_fics = []
+            for fic in item:
+                if fic.id not in seen_ids:
+                    seen_ids.add(fic.id)
+                    page_fics.append(fic)
+
+            sequence += 1
+            yield sequence, page_fics
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,156 @@
+"""Local SQLite cache of fetched works, search pages and quotes."""
+
+import os
+import time
+import json
+import sqlite3
+import threading
+from typing import Optional
+
+
+# ============== Local Cache ==============
+
+
+class WorkCache:
+    """SQLite-backed cache of raw AO3 records with a TTL and LRU eviction.
+
+    Values are the raw fields read from AO3 (not scored FicData), so changing
+    TAG_RULES never serves stale meters from the cache. Access times of hits
+    are kept in memory and written in batches, so a read never commits.
+    """
+
+    # Pending access times written per batch
+    TOUCH_BATCH = 256
+
+    def __init__(
+        self,
+        cache_dir: str,
+        work_ttl_hours: float = 168,
+        search_ttl_hours: float = 12,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "ao3_cache.sqlite3")
+        self.work_ttl = work_ttl_hours * 3600
+        self.search_ttl = search_ttl_hours * 3600
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._touched: dict[str, float] = {}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+    @staticmethod
+    def work_key(work_id) -> str:
+        return f"work:{work_id}"
+
+    @staticmethod
+    def quote_key(work_id, chapters: int) -> str:
+        return f"quote:{work_id}:{chapters}"
+
+    @staticmethod
+    def search_key(params: dict, page: int) -> str:
+        """Key a search page by its normalized query parameters and page number."""
+        normalized = {
+            k: " ".join(str(v).lower().split())
+            for k, v in params.items()
+            if v not in (None, "")
+        }
+        query = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return f"search:{query}:page={page}"
+
+    def get(self, key: str, ttl: float):
+        """Return the cached value for key, or None if missing or older than ttl."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if now - row[1] > ttl:
+                self._delete(key)
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value) -> None:
+        """Store a JSON-serializable value, evicting least recently used entries."""
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._delete(key)
+            self._conn.execute(
+                "INSERT INTO entries (key, value, size, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            self._size += size
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched = {}
+
+    def _delete(self, key: str) -> None:
+        self._touched.pop(key, None)
+        row = self._conn.execute(
+            "SELECT size FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._size -= row[0]
+
+    def _evict(self) -> None:
+        if self._size > self.max_bytes:
+            # Recent hits must not be evicted as least recently used
+            self._flush_touched()
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._size -= size
+                if self._size <= self.max_bytes:
+                    break
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+work_cache: Optional[WorkCache] = None
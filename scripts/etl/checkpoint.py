@@ -0,0 +1,85 @@
+"""Crawl checkpoints, so an interrupted run can resume."""
+
+import os
+import json
+from datetime import datetime
+from typing import Optional
+
+
+# ============== Checkpoints ==============
+
+
+class Checkpoint:
+    """Crawl progress saved atomically after every page.
+
+    Records the search parameters, the last completed page, the IDs seen so
+    far, the output sink position and any delta snapshot and listing index
+    entries written in this run, so an interrupted crawl can continue where
+    it stopped. Sharded
+    crawls also record the band plan and completed bands; unfinished bands
+    are crawled again and deduplicated against the seen IDs.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, params: dict):
+        self.path = path
+        self.params = params
+
+    def load(self) -> Optional[dict]:
+        """Return the saved state, or None if there is nothing to resume."""
+        if not os.path.exists(self.path):
+            print(f"⚠️ No checkpoint at {self.path}, starting from page 1")
+            return None
+
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+
+        if state.get("params") != self.params:
+            raise ValueError(
+                f"Checkpoint {self.path} was written for different parameters: "
+                f"{state.get('params')}"
+            )
+
+        print(
+            f"♻️ Resuming after page {state['last_page']} "
+            f"({len(state['seen_ids'])} works already seen)"
+        )
+        return state
+
+    def save(
+        self,
+        last_page: int,
+        seen_ids: set,
+        total: int,
+        sink_state: Optional[dict],
+        snapshot_entries: Optional[dict] = None,
+        shards: Optional[dict] = None,
+        listing_entries: Optional[dict] = None,
+    ) -> None:
+        output_dir = os.path.dirname(self.path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        state = {
+            "version": self.VERSION,
+            "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "params": self.params,
+            "last_page": last_page,
+            "total": total,
+            "seen_ids": sorted(seen_ids),
+            "sink": sink_state,
+            "snapshot_entries": snapshot_entries or {},
+            "listing_entries": listing_entries or {},
+            "shards": shards,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,629 @@
+"""Fetching works and search pages from AO3, and deciding which works need details."""
+
+import os
+import time
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import AO3
+
+from .metrics import _write_atomic, pipeline_metrics, timed_stage
+from .models import FicData, FicStats
+from .scoring import calculate_metrics
+from .governor import RateLimited, RequestGovernor, parse_retry_after, request_governor
+from .session import get_session
+from . import cache
+from .cache import WorkCache
+from .parse import (
+    clean_summary,
+    map_rating,
+    map_status,
+    parse_search_page,
+    record_to_fic,
+    search_page_url,
+    search_result_to_record,
+    work_to_record,
+)
+
+
+# ============== AO3 Data Fetcher ==============
+
+@timed_stage("fetch_work")
+def fetch_work(
+    work_id: int, refresh: bool = False, governor: Optional[RequestGovernor] = None
+) -> Optional[FicData]:
+    """Fetch a single work from ao3
+
+    Args:
+        work_id (int): work id
+        refresh (bool): skip the cached copy, e.g. when the work was updated
+        governor (RequestGovernor): paces and retries the request
+            (defaults to request_governor)
+
+    Returns:
+        Optional[FicData]: FicData object or None if fetch failed
+    """
+    try:
+        print(f"🔍 Fetching AO3 Work ID: {work_id}...")
+
+        key = WorkCache.work_key(work_id)
+        work_cache = cache.work_cache
+        record = None
+        if work_cache and not refresh:
+            record = work_cache.get(key, work_cache.work_ttl)
+
+        if record is None:
+            # Call the AO3 API
+            def load():
+                start = time.perf_counter()
+                # Chapter text is never read; quotes are fetched separately
+                work = AO3.Work(work_id, session=get_session(), load_chapters=False)
+                pipeline_metrics.observe("work_fetch_seconds", time.perf_counter() - start)
+                pipeline_metrics.count("work_fetches")
+                return work
+
+            work = (governor or request_governor).call(load, f"Work {work_id}")
+            record = work_to_record(work)
+            if work_cache:
+                work_cache.set(key, record)
+        else:
+            print(f"💾 Using cached work {work_id}")
+
+        # Calculate Metrics
+        mapped_rating = map_rating(record["rating"])
+        state_metrics = calculate_metrics(
+            record["tags"], mapped_rating, record["words"] or 0
+        )
+
+        # Build FicData object
+        fic = FicData(
+            id=f"{work_id}",
+            title=record["title"],
+            author=record["authors"][0] if record["authors"] else "Anonymous",
+            summary=clean_summary(record["summary"] or ""),
+            rating=mapped_rating,
+            tags=record["tags"],
+            category=record["categories"][0] if record["categories"] else "Other",
+            status=map_status(record["status"]),
+            is_translated=False,
+            state=state_metrics,
+            stats=FicStats(
+                words=record["words"] or 0,
+                chapters=record["nchapters"] or 1,
+                kudos=record["kudos"] or 0,
+                hits=record["hits"] or 0,
+                comments=record["comments"] or 0,
+                bookmarks=record["bookmarks"] or 0,
+            ),
+            quote="",
+            link=record["url"],
+            tag_kinds=["freeform"] * len(record["tags"]),
+        )
+
+        print(f"✅ Successfully fetched: {fic.title} by {fic.author}")
+        return fic
+    except AO3.utils.InvalidIdError:
+        print(f"❌ Invalid work ID: {work_id}")
+        pipeline_metrics.count("work_fetch_errors")
+        return None
+    except Exception as e:
+        print(f"❌ Error fetching work {work_id}: {e}")
+        pipeline_metrics.count("work_fetch_errors")
+        return None
+
+
+# ============== Search ==============
+CAITVI_TAGS = ["Caitlyn/Vi (League of Legends)"]
+
+
+class CrawlInterrupted(Exception):
+    """A search page could not be fetched; the crawl can be resumed from it."""
+
+    def __init__(self, page: int):
+        super().__init__(f"Failed to fetch search page {page}")
+        self.page = page
+
+
+def build_search_params(
+    tags: list[str],
+    min_kudos: int = 0,
+    max_kudos: int = None,
+    days_back: int = 0,
+    sort_by: str = "revised_at",
+    kudos=None,
+) -> dict:
+    """Build AO3.Search keyword arguments (without session) for a crawl."""
+    relationship_filter = tags[0] if tags else None
+
+    revised_at_filter = ""
+    if days_back > 0:
+        revised_at_filter = f"< {days_back} days"
+
+    if kudos is None and (min_kudos or max_kudos):
+        kudos = AO3.utils.Constraint(min_kudos, max_kudos)
+
+    return dict(
+        any_field="'F/F' -'M/M' -'F/M'",
+        relationships=relationship_filter,
+        kudos=kudos,
+        revised_at=revised_at_filter,
+        sort_column=sort_by,
+        sort_direction="desc",
+    )
+
+
+# Set to False (--no-fast-parse) to always go through AO3.Search
+FAST_SEARCH_PARSE = True
+
+
+def fetch_search_page(search, params: dict, page: int) -> tuple[list[dict], int]:
+    """Fetch one search page as (records, total results).
+
+    Tries the lxml fast path first; pages it cannot parse go through
+    AO3.Search, the previous (slower) path.
+    """
+    url = search_page_url(params, page) if FAST_SEARCH_PARSE else None
+    if url:
+        session = get_session()
+        if session is None:
+            response = AO3.requester.requester.request("get", url)
+        else:
+            response = session.get(url)
+        if response.status_code in (429, 503):
+            raise RateLimited(
+                f"HTTP {response.status_code} for search page {page}",
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
+        if response.status_code != 200:
+            raise AO3.utils.UnexpectedResponseError(
+                f"HTTP {response.status_code} for search page {page}"
+            )
+        with pipeline_metrics.stage("parse_search_page"):
+            parsed = parse_search_page(response.content)
+        if parsed is not None:
+            return parsed
+        pipeline_metrics.count("search_parse_fallbacks")
+        print(f"⚠️ Unrecognized layout on search page {page}, falling back to ao3-api")
+
+    search.page = page
+    search.update()
+    return [search_result_to_record(r) for r in search.results], search.total_results
+
+
+_PAGES_DONE = object()
+
+
+def fetch_page_records(
+    search,
+    search_params: dict,
+    page: int,
+    governor: RequestGovernor,
+    stop: Optional[threading.Event] = None,
+) -> list[dict]:
+    """Fetch the records of one search page from AO3 through the governor.
+
+    Raises:
+        CrawlInterrupted: the page could not be fetched after all retries
+    """
+
+    def fetch() -> list[dict]:
+        start = time.perf_counter()
+        with pipeline_metrics.stage("search_fetch"):
+            page_results, _ = fetch_search_page(search, search_params, page)
+        pipeline_metrics.observe("page_fetch_seconds", time.perf_counter() - start)
+        return page_results
+
+    try:
+        page_results = governor.call(fetch, f"Page {page} fetch", stop)
+    except Exception as e:
+        print(f"❌ Failed to fetch page {page}: {e}")
+        raise CrawlInterrupted(page) from e
+    pipeline_metrics.count("search_pages")
+    return page_results
+
+
+def prefetch_search_pages(
+    search,
+    search_params: dict,
+    start_page: int,
+    page_limit: int,
+    governor: RequestGovernor,
+    prefetch: int = 1,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[tuple[int, list[dict]]]:
+    """Yield (page, records) while the following pages download in the background.
+
+    A producer thread fetches pages in order into a queue of at most
+    `prefetch` pages, so network waits overlap with whatever the caller
+    does with each page. The governor spaces uncached requests by their
+    start times. Fetching stops after the first page with fewer than 20
+    results, or as soon as stop is set (even mid-retry).
+    """
+    pages = queue.Queue(maxsize=max(1, prefetch))
+    # Set when the consumer goes away; ends the producer's governor waits
+    closed = threading.Event()
+
+    def put(item) -> None:
+        while not closed.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce() -> None:
+        work_cache = cache.work_cache
+        try:
+            for page in range(start_page, page_limit + 1):
+                if closed.is_set():
+                    return
+                print(f"🔍 Searching page {page}...")
+
+                key = WorkCache.search_key(search_params, page)
+                records = work_cache.get(key, work_cache.search_ttl) if work_cache else None
+                if records is not None:
+                    print(f"💾 Using cached search page {page}")
+                else:
+                    # Only real requests are paced; cached pages never touch AO3
+                    records = fetch_page_records(search, search_params, page, governor, closed)
+                    if work_cache:
+                        work_cache.set(key, records)
+
+                put((page, records))
+                if len(records) < 20:
+                    break
+            put(_PAGES_DONE)
+        except Exception as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = None
+            with pipeline_metrics.stage("prefetch_wait"):
+                while item is None:
+                    try:
+                        item = pages.get(timeout=0.1)
+                    except queue.Empty:
+                        if stop is not None and stop.is_set():
+                            break
+            if item is None or item is _PAGES_DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        closed.set()
+        producer.join()
+
+
+def iter_search_pages(
+    tags: list[str],
+    min_kudos: int = 0,
+    max_kudos: int = None,
+    page_limit: int = 1,
+    days_back: int = 0,
+    sort_by: str = "revised_at",
+    start_page: int = 1,
+    seen_ids: Optional[set] = None,
+    kudos=None,
+    governor: Optional[RequestGovernor] = None,
+    page_delay: float = 5.0,
+    listing: Optional["ListingIndex"] = None,
+    prefetch: int = 1,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[tuple[int, list[FicData]]]:
+    """Search AO3 works and yield the FicData collected from each page.
+
+    The next page is already downloading while the caller processes the
+    current one (see prefetch_search_pages).
+
+    Args:
+        tags: List of relationship tags
+        min_kudos: Minimum kudos count
+        max_kudos: Maximum kudos count
+        page_limit: Maximum number of pages to fetch
+        days_back: Number of days to look back (0 means no limit)
+        sort_by: Sort column ("revised_at" for weekly, "kudos_count" for full)
+        start_page: First page to fetch (used when resuming a crawl)
+        seen_ids: Work IDs already collected; updated in place as pages arrive
+        kudos: Explicit kudos constraint, overriding min_kudos/max_kudos
+        governor: Shared request governor; replaces page_delay
+        page_delay: Starting gap in seconds between uncached page requests
+            when no governor is given (0 disables pacing)
+        listing: Listing index that records each new work's update signature
+        prefetch: Pages fetched ahead of the one being processed
+        stop: Set by another thread to end the crawl after the current page;
+            pending fetches stop waiting on the governor
+
+    Yields:
+        (page number, FicData objects new on that page)
+    """
+
+    total = 0
+    seen_ids = set() if seen_ids is None else seen_ids
+
+    print(f"🔍 Searching for works with tags: {tags}")
+    print(f"🔍 Days back: {days_back if days_back > 0 else 'Unlimited'}")
+    if kudos is not None:
+        print(f"🔍 Kudos range: {kudos}")
+    else:
+        print(f"🔍 Kudos range: {min_kudos} - {max_kudos if max_kudos else 'Unlimited'}")
+    print(f"🔍 Page limit: {page_limit}")
+    print(f"🔍 Sort by: {sort_by}")
+
+    try:
+        search_params = build_search_params(
+            tags, min_kudos, max_kudos, days_back, sort_by, kudos=kudos
+        )
+        search = AO3.Search(**search_params, session=get_session())
+        if governor is None:
+            governor = RequestGovernor(1.0 / page_delay if page_delay else None)
+
+        for page, page_results in prefetch_search_pages(
+            search,
+            search_params,
+            start_page,
+            page_limit,
+            governor,
+            prefetch=prefetch,
+            stop=stop,
+        ):
+            if stop is not None and stop.is_set():
+                return
+            page_fics = []
+            # Timed per page rather than per result; each stage takes the metrics lock
+            with pipeline_metrics.stage("parse_search_result", items=len(page_results)):
+                for record in page_results:
+                    if record["id"] in seen_ids:
+                        continue
+                    seen_ids.add(record["id"])
+                    if listing is not None:
+                        listing.observe(record)
+
+                    fic = record_to_fic(record)
+                    if fic:
+                        page_fics.append(fic)
+
+            total += len(page_fics)
+            print(
+                f"✅ Collected {len(page_fics)} works from page {page} (Total: {total})"
+            )
+            yield page, page_fics
+
+            # Stop if this page has fewer than 20 results (last page)
+            if len(page_results) < 20:
+                print(f"📄 Last page reached (only {len(page_results)} results)")
+                break
+
+    except CrawlInterrupted:
+        raise
+    except Exception as e:
+        print(f"❌ Search failed: {e}")
+
+
+def search_and_collect(
+    tags: list[str],
+    min_kudos: int = 0,
+    max_kudos: int = None,
+    page_limit: int = 1,
+    days_back: int = 0,
+    sort_by: str = "revised_at",
+) -> Iterator[FicData]:
+    """Search AO3 works and yield FicData from search results as pages arrive.
+
+    Takes the same arguments as iter_search_pages.
+    """
+    for _, page_fics in iter_search_pages(
+        tags=tags,
+        min_kudos=min_kudos,
+        max_kudos=max_kudos,
+        page_limit=page_limit,
+        days_back=days_back,
+        sort_by=sort_by,
+    ):
+        yield from page_fics
+
+
+# ============== Batch Fetching ==============
+
+
+def fetch_batch(
+    work_ids: list[int],
+    delay: float = 5.0,
+    workers: int = 1,
+    rate: Optional[float] = None,
+    refresh: Iterable[int] = (),
+    governor: Optional[RequestGovernor] = None,
+) -> list[FicData]:
+    """Fetch a batch of works with limiting rate
+
+    Args:
+        work_ids: List of AO3 work IDs
+        delay: Seconds between requests when no rate is given
+        workers: Number of concurrent fetch workers
+        rate: Starting request rate (requests per second) shared by all workers
+        refresh: IDs fetched from AO3 even when a cached copy exists
+        governor: Shared request governor (created from rate when omitted)
+
+    Returns:
+        List of FicData objects in input order (failed IDs are skipped)
+    """
+    total = len(work_ids)
+    governor = governor or RequestGovernor(rate or 1.0 / delay)
+    refresh = set(refresh)
+    failed = []
+
+    pace = f"{governor.rate:.2f} req/s" if governor.rate else "unpaced"
+    print(f"🔍 Fetching {total} works with {workers} worker(s) at {pace}")
+
+    def fetch_one(position: int, work_id: int) -> Optional[FicData]:
+        print(f"🔍 Fetching [{position}/{total}]...")
+        fic = fetch_work(work_id, refresh=work_id in refresh, governor=governor)
+        if fic is None:
+            failed.append(work_id)
+        return fic
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        fetched = executor.map(fetch_one, range(1, total + 1), work_ids)
+        results = [fic for fic in fetched if fic]
+
+    if failed:
+        failed_ids = ", ".join(str(work_id) for work_id in work_ids if work_id in failed)
+        print(f"⚠️ {len(failed)}/{total} works failed to fetch: {failed_ids}")
+
+    return results
+
+
+# ============== Change Detection ==============
+
+DEFAULT_LISTING_INDEX = os.path.join(".etl_state", "listings.json")
+
+
+def listing_signature(record: dict) -> list:
+    """[date_updated, chapters, words] of a search listing record."""
+    return [record.get("date_updated"), record.get("nchapters"), record.get("words")]
+
+
+class ListingIndex:
+    """Listing signature of every work whose details were fetched.
+
+    Search listings already carry each work's last update date and stats, so
+    comparing them with the signature stored at the last detail fetch tells
+    which works need a full AO3.Work fetch. A work's entry only moves once
+    its detail fetch succeeded, so failed fetches are retried next run.
+    """
+
+    VERSION = 1
+
+    def __init__(self, works: Optional[dict] = None):
+        self.works: dict[str, list] = works or {}
+        self.touched: set[str] = set()
+        self._pending: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def run_entries(self) -> dict:
+        """Entries recorded during this run (persisted in checkpoints)."""
+        with self._lock:
+            return {work_id: self.works[work_id] for work_id in self.touched}
+
+    def apply(self, entries: dict) -> None:
+        """Restore entries recorded by an interrupted run."""
+        self.works.update(entries)
+        self.touched.update(entries)
+
+    @classmethod
+    def load(cls, path: str) -> "ListingIndex":
+        if not os.path.exists(path):
+            print(f"⚠️ Listing index {path} not found, fetching details of every work")
+            return cls()
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        works = data.get("works", {})
+        print(f"🗂️ Loaded listing index with {len(works)} works from {path}")
+        return cls(works)
+
+    def save(self, path: str) -> None:
+        """Write the index atomically."""
+        data = {
+            "version": self.VERSION,
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "columns": ["date_updated", "chapters", "words"],
+            "works": self.works,
+        }
+        _write_atomic(path, json.dumps(data, separators=(",", ":")))
+        print(f"🗂️ Listing index saved: {path} ({len(self.works)} works)")
+
+    def observe(self, record: dict) -> None:
+        """Remember a listing's signature until its work is classified."""
+        with self._lock:
+            self._pending[str(record["id"])] = listing_signature(record)
+
+    def classify(self, work_id: str) -> tuple[str, Optional[list]]:
+        """Compare the last observed listing of a work with the index.
+
+        Returns:
+            ("new" | "changed" | "unchanged", listing signature)
+        """
+        with self._lock:
+            signature = self._pending.pop(work_id, None)
+            previous = self.works.get(work_id)
+        if previous is None:
+            return "new", signature
+        # Without an update date the listing cannot prove nothing changed
+        if signature is None or signature[0] is None or signature != previous:
+            return "changed", signature
+        return "unchanged", signature
+
+    def commit(self, work_id: str, signature: Optional[list]) -> None:
+        """Record the signature of a work whose details were fetched."""
+        if signature is None:
+            return
+        with self._lock:
+            self.works[work_id] = signature
+            self.touched.add(work_id)
+
+
+@timed_stage("refresh_details")
+def refresh_details(
+    fics: list[FicData],
+    listing: ListingIndex,
+    workers: int = 1,
+    governor: Optional[RequestGovernor] = None,
+) -> tuple[list[FicData], list[FicData]]:
+    """Fetch full works for new or changed listings only.
+
+    Works whose listing signature matches the index keep their stored
+    details and only need the stats the listing carries. Changed works skip
+    the local cache. When a detail fetch fails, the listing data is written
+    instead, without a quote so the stored one is kept, and the work is
+    queued again on the next run.
+
+    Returns:
+        (fics to write in full, fics that only need a stats refresh)
+    """
+    queued = {}
+    refresh = []
+    for fic in fics:
+        change, signature = listing.classify(fic.id)
+        pipeline_metrics.count(f"details_{change}")
+        if change == "unchanged":
+            refresh.append(fic)
+        else:
+            queued[fic.id] = (change, signature)
+
+    if not queued:
+        print(f"🗂️ No new or changed works; refreshing stats of {len(refresh)}")
+        return [], refresh
+
+    changed = sum(1 for change, _ in queued.values() if change == "changed")
+    print(
+        f"🗂️ Fetching details of {len(queued) - changed} new and {changed} changed works "
+        f"({len(refresh)} unchanged)"
+    )
+    fetched = fetch_batch(
+        [int(work_id) for work_id in queued],
+        workers=workers,
+        refresh=[int(w) for w, (change, _) in queued.items() if change == "changed"],
+        governor=governor,
+    )
+    details = {fic.id: fic for fic in fetched}
+
+    written = []
+    for fic in fics:
+        if fic.id not in queued:
+            continue
+        detail = details.get(fic.id)
+        if detail is None:
+            fic.quote = None
+            written.append(fic)
+            continue
+        listing.commit(fic.id, queued[fic.id][1])
+        written.append(detail)
+    return written, refresh
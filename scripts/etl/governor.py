@@ -0,0 +1,218 @@
+"""Request pacing: one RequestGovernor paces and retries every AO3 request of a run."""
+
+import time
+import email.utils
+import random
+import threading
+from typing import Optional
+
+import AO3
+
+from .metrics import pipeline_metrics
+
+
+# ============== Rate Limiting ==============
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every worker talking to AO3.
+
+    Tokens refill continuously at `rate` per second up to `capacity`, so the
+    global request rate holds no matter how many workers are running.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> float:
+        """Block until a token is available (or stop is set); return the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            with pipeline_metrics.stage("rate_limit_wait"):
+                if stop is not None:
+                    if stop.wait(wait):
+                        return waited
+                else:
+                    time.sleep(wait)
+            waited += wait
+
+
+class RateLimited(AO3.utils.HTTPError):
+    """AO3 answered 429 or 503; retry_after is the wait it asked for, if any."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+# Status and Retry-After of the calling thread's last AO3 response
+_last_response = threading.local()
+
+# Errors that retrying cannot fix
+PERMANENT_ERRORS = (AO3.utils.InvalidIdError, AO3.utils.AuthError, AO3.utils.LoginError)
+
+
+class RequestGovernor(TokenBucket):
+    """Pacing, retries and a circuit breaker shared by every AO3 request.
+
+    The rate follows AIMD: each success adds `increase` requests/second up
+    to max_rate (twice the starting rate by default), each throttled
+    response (429 or 503) multiplies it by `decrease` down to min_rate.
+    Failed requests are retried after a jittered exponential backoff that is
+    never shorter than the server's Retry-After. After breaker_threshold
+    throttled responses in a row the breaker opens and every worker pauses
+    for breaker_cooldown seconds (or longer, if Retry-After says so).
+
+    With rate None requests are not paced, only retried.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        increase: Optional[float] = None,
+        decrease: float = 0.5,
+        max_attempts: int = 4,
+        base_backoff: float = 2.0,
+        max_backoff: float = 120.0,
+        breaker_threshold: int = 3,
+        breaker_cooldown: float = 60.0,
+    ):
+        super().__init__(rate or 1.0)
+        self.rate = rate
+        self.max_rate = max_rate or (rate * 2 if rate else None)
+        self.min_rate = min_rate or (rate / 10 if rate else None)
+        self.increase = increase if increase is not None else (rate or 0) * 0.05
+        self.decrease = decrease
+        self.max_attempts = max(1, max_attempts)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+        self._throttles = 0
+        self._open_until = 0.0
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> float:
+        """Wait for a closed breaker and a token; return the seconds waited."""
+        waited = self._wait_breaker(stop)
+        if self.rate is None or (stop is not None and stop.is_set()):
+            return waited
+        return waited + super().acquire(stop)
+
+    def _wait_breaker(self, stop: Optional[threading.Event] = None) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                remaining = self._open_until - time.monotonic()
+            if remaining <= 0:
+                return waited
+            with pipeline_metrics.stage("breaker_wait"):
+                if stop is not None:
+                    if stop.wait(remaining):
+                        return waited
+                else:
+                    time.sleep(remaining)
+            waited += remaining
+
+    def success(self) -> None:
+        with self._lock:
+            self._throttles = 0
+            if self.rate is not None:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        opened = False
+        with self._lock:
+            self._throttles += 1
+            if self.rate is not None:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            if self._throttles >= self.breaker_threshold:
+                cooldown = max(self.breaker_cooldown, retry_after or 0)
+                self._open_until = max(self._open_until, time.monotonic() + cooldown)
+                opened = True
+        pipeline_metrics.count("throttled")
+        if opened:
+            pipeline_metrics.count("breaker_opened")
+            print(f"🛑 AO3 keeps throttling; pausing all requests for {cooldown:.0f}s")
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Jittered exponential delay before retry number attempt + 1."""
+        ceiling = min(self.max_backoff, self.base_backoff * 2**attempt)
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        return max(delay, retry_after or 0)
+
+    def call(self, fn, description: str, stop: Optional[threading.Event] = None):
+        """Run one AO3 request through the governor and return its result.
+
+        Raises the last error once max_attempts are used up (or stop is set
+        while waiting to retry); PERMANENT_ERRORS are raised right away.
+        InterruptedError is raised when stop is set before the request starts.
+        """
+        for attempt in range(self.max_attempts):
+            self.acquire(stop)
+            if stop is not None and stop.is_set():
+                raise InterruptedError(f"{description} stopped")
+            _last_response.status = _last_response.retry_after = None
+            try:
+                result = fn()
+            except PERMANENT_ERRORS:
+                raise
+            except Exception as e:
+                retry_after = None
+                status = getattr(_last_response, "status", None)
+                if isinstance(e, AO3.utils.HTTPError) or status in (429, 503):
+                    retry_after = getattr(e, "retry_after", None) or _last_response.retry_after
+                    self.throttled(retry_after)
+                if attempt + 1 >= self.max_attempts:
+                    raise
+
+                delay = self.backoff(attempt, retry_after)
+                print(
+                    f"⚠️ {description} failed (attempt {attempt + 1}/{self.max_attempts}): "
+                    f"{e}; retrying in {delay:.1f}s"
+                )
+                pipeline_metrics.count("request_retries")
+                with pipeline_metrics.stage("retry_sleep"):
+                    if stop is not None:
+                        if stop.wait(delay):
+                            raise
+                    else:
+                        time.sleep(delay)
+                continue
+
+            self.success()
+            return result
+
+
+# Used by calls made outside run_pipeline, e.g. --mode single
+request_governor = RequestGovernor()
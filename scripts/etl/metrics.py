@@ -0,0 +1,184 @@
+"""Stage timings, counters and gauges collected while the pipeline runs."""
+
+import os
+import time
+import functools
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# ============== Pipeline Instrumentation ==============
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class PipelineMetrics:
+    """Thread-safe per-run counters, stage timers and latency histograms.
+
+    Stage times are summed across threads, so with concurrent workers a stage
+    can add up to more than the run's wall time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+            self.stages = {}
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    def add_time(self, stage: str, seconds: float, items: int = 0) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0, "items": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+            entry["items"] += items
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start, items)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.setdefault(
+                name, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def report(self) -> dict:
+        """Snapshot of every metric plus run wall time and works per second."""
+        with self._lock:
+            elapsed = time.perf_counter() - self._start
+            works = self.counters.get("works", 0)
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at).isoformat(
+                    timespec="seconds"
+                ),
+                "wall_seconds": round(elapsed, 3),
+                "works_per_second": round(works / elapsed, 3) if elapsed else 0.0,
+                "stages": {
+                    name: dict(entry, seconds=round(entry["seconds"], 6))
+                    for name, entry in sorted(self.stages.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": dict(sorted(self.gauges.items())),
+                "histograms": {
+                    name: {
+                        "buckets": dict(zip(map(str, LATENCY_BUCKETS), h["buckets"])),
+                        "sum": round(h["sum"], 6),
+                        "count": h["count"],
+                    }
+                    for name, h in sorted(self.histograms.items())
+                },
+            }
+
+    def write_json(self, path: str) -> None:
+        _write_atomic(path, json.dumps(self.report(), indent=2) + "\n")
+
+    def write_prometheus(self, path: str, prefix: str = "caitvi_etl") -> None:
+        """Write the metrics in the node_exporter textfile collector format."""
+        report = self.report()
+        lines = [
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {report['wall_seconds']}",
+            f"# TYPE {prefix}_works_per_second gauge",
+            f"{prefix}_works_per_second {report['works_per_second']}",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {int(self.started_at)}",
+        ]
+
+        lines.append(f"# TYPE {prefix}_stage_seconds gauge")
+        for name, entry in report["stages"].items():
+            lines.append(f'{prefix}_stage_seconds{{stage="{name}"}} {entry["seconds"]}')
+        lines.append(f"# TYPE {prefix}_stage_calls gauge")
+        for name, entry in report["stages"].items():
+            lines.append(f'{prefix}_stage_calls{{stage="{name}"}} {entry["calls"]}')
+
+        for name, value in report["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        for name, value in report["gauges"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+
+        for name, histogram in report["histograms"].items():
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{metric}_sum {histogram['sum']}")
+            lines.append(f"{metric}_count {histogram['count']}")
+
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+    def print_summary(self) -> None:
+        report = self.report()
+        print(
+            f"⏱️ Run took {report['wall_seconds']:.1f}s "
+            f"({report['works_per_second']:.2f} works/s)"
+        )
+        for name, entry in sorted(
+            report["stages"].items(), key=lambda item: -item[1]["seconds"]
+        ):
+            print(f"   {name:<22} {entry['seconds']:10.2f}s  {entry['calls']:>7} calls")
+        counters = report["counters"]
+        if counters:
+            print("   " + ", ".join(f"{k}={v}" for k, v in counters.items()))
+
+
+def _write_atomic(path: str, text: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+pipeline_metrics = PipelineMetrics()
+
+
+def timed_stage(name: str):
+    """Decorator adding each call's wall time to the named pipeline stage."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                pipeline_metrics.add_time(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
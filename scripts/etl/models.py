@@ -0,0 +1,65 @@
+"""Data models shared by every stage of the pipeline."""
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+# ============== Data Models ==============
+
+
+@dataclass
+class FicStats:
+    """AO3 statistics for a fic."""
+
+    words: int
+    chapters: int
+    kudos: int
+    hits: int
+    comments: int
+    bookmarks: int
+
+
+# Blind-box moods and the meter each is read from; a fic has a mood when
+# that meter reaches MOOD_THRESHOLD
+MOODS = {"fluff": "fluff", "angst": "angst", "spicy": "spice"}
+MOOD_THRESHOLD = 4
+
+
+@dataclass
+class FicState:
+    """Rating meters for a fic, and the blind-box moods they put it in."""
+
+    spice: int
+    angst: int
+    fluff: int
+    plot: int
+    romance: int
+    mood_fluff: bool = field(init=False)
+    mood_angst: bool = field(init=False)
+    mood_spicy: bool = field(init=False)
+
+    def __post_init__(self):
+        for mood, metric in MOODS.items():
+            setattr(self, f"mood_{mood}", getattr(self, metric) >= MOOD_THRESHOLD)
+
+
+@dataclass
+class FicData:
+    """Complete fic data matching the database schema."""
+
+    id: str
+    title: str
+    author: str
+    link: str
+    summary: str
+    rating: str
+    category: str
+    status: str
+    is_translated: bool
+    tags: list[str]
+    stats: FicStats
+    state: FicState
+    # None when the quote could not be fetched; sinks keep the stored one
+    quote: Optional[str]
+    # AO3 tag type of each entry of tags (see TAG_KINDS)
+    tag_kinds: list[str] = field(default_factory=list)
@@ -0,0 +1,449 @@
+"""Turning AO3 works and search pages into records and FicData."""
+
+import re
+import sys
+from datetime import datetime
+from typing import Optional
+
+import AO3
+import lxml.etree
+import lxml.html
+
+from .models import FicData, FicStats
+from .scoring import calculate_metrics
+
+
+# ========== Mapping Functions ==========
+def map_rating(ao3_rating: str) -> str:
+    """Map AO3 rating string to single letter."""
+    rating_map = {
+        "General Audiences": "G",
+        "Teen And Up Audiences": "T",
+        "Mature": "M",
+        "Explicit": "E",
+        "Not Rated": "T",
+    }
+    return rating_map.get(ao3_rating, "T")
+
+
+def map_status(ao3_status: str) -> str:
+    """Map AO3 status to our schema."""
+    if ao3_status and "complete" in ao3_status.lower():
+        return "completed"
+    return "ongoing"
+
+
+def clean_summary(summary: str) -> str:
+    """Clean HTML tags"""
+    return re.sub(r"<[^>]+>", "", summary).strip()
+
+
+# ============== Work Records ==============
+def work_to_record(work) -> dict:
+    """Extract the raw fields used by the pipeline from a loaded AO3.Work."""
+    return {
+        "title": work.title,
+        "authors": [a.username for a in work.authors],
+        "summary": work.summary,
+        "rating": work.rating,
+        "tags": list(work.tags),
+        "categories": list(work.categories),
+        "status": work.status,
+        "words": work.words,
+        "nchapters": work.nchapters,
+        "kudos": work.kudos,
+        "hits": work.hits,
+        "comments": work.comments,
+        "bookmarks": work.bookmarks,
+        "url": work.url,
+    }
+
+
+# Record fields holding tags, in tags_json order, and the kind of their tags
+TAG_KINDS = {
+    "fandoms": "fandom",
+    "characters": "character",
+    "relationships": "relationship",
+    "tags": "freeform",
+}
+
+
+def record_tags(record: dict) -> list[str]:
+    """Fandom, character, relationship and freeform tags of a record, in order.
+
+    Tag strings are interned, since the same few thousand repeat across the
+    whole corpus.
+    """
+    all_tags = []
+    for tag_attr in TAG_KINDS:
+        tags = record.get(tag_attr)
+        if tags:
+            all_tags.extend(sys.intern(str(tag)) for tag in tags)
+    return all_tags
+
+
+def record_tag_kinds(record: dict) -> list[str]:
+    """Kind of each tag returned by record_tags."""
+    kinds = []
+    for tag_attr, kind in TAG_KINDS.items():
+        kinds.extend([kind] * len(record.get(tag_attr) or ()))
+    return kinds
+
+
+# ============== Search Results ==============
+
+SEARCH_RESULT_FIELDS = (
+    "title",
+    "fandoms",
+    "characters",
+    "relationships",
+    "tags",
+    "words",
+    "chapters",
+    "kudos",
+    "hits",
+    "comments",
+    "bookmarks",
+    "rating",
+    "status",
+    "categories",
+    "summary",
+)
+
+
+def search_result_to_record(result) -> dict:
+    """Snapshot the attributes record_to_fic reads from a search result.
+
+    The record round-trips through JSON, so cached pages replay straight
+    into record_to_fic.
+    """
+    authors = getattr(result, "authors", None) or []
+    date_updated = getattr(result, "date_updated", None)
+    record = {
+        "id": result.id,
+        "authors": [a.username if hasattr(a, "username") else str(a) for a in authors],
+        "date_updated": date_updated.strftime("%Y-%m-%d") if date_updated else None,
+        "nchapters": getattr(result, "nchapters", None),
+    }
+    for field_name in SEARCH_RESULT_FIELDS:
+        value = getattr(result, field_name, None)
+        record[field_name] = list(value) if isinstance(value, list) else value
+    return record
+
+
+def record_to_fic(record: dict) -> Optional[FicData]:
+    """Build FicData from a search result record (see search_result_to_record)."""
+
+    try:
+        work_id = record["id"]
+        title = record["title"] or "Untitled"
+
+        # Author
+        authors = record["authors"]
+        author = authors[0] if authors else "Anonymous"
+
+        # Tags
+        all_tags = record_tags(record)
+
+        # Stats
+        words = record["words"] or 0
+        chapters = record["chapters"] or 1
+        kudos = record["kudos"] or 0
+        hits = record["hits"] or 0
+        comments = record["comments"] or 0
+        bookmarks = record["bookmarks"] or 0
+
+        # Rating and status
+        raw_rating = record["rating"] or "Not Rated"
+        mapped_rating = map_rating(raw_rating)
+
+        raw_status = record["status"]
+        status = map_status(raw_status) if raw_status else "ongoing"
+
+        # Category
+        categories = record["categories"] or []
+        category = categories[0] if categories else "Other"
+
+        # Summary
+        raw_summary = record["summary"] or ""
+        summary = clean_summary(raw_summary)
+
+        # URL
+        url = f"https://archiveofourown.org/works/{work_id}"
+
+        # Calculate metrics
+        state_metrics = calculate_metrics(all_tags, mapped_rating, words)
+
+        fic = FicData(
+            id=str(work_id),
+            title=title,
+            author=author,
+            link=url,
+            summary=summary,
+            rating=mapped_rating,
+            category=category,
+            status=status,
+            is_translated=False,
+            tags=all_tags,
+            stats=FicStats(
+                words=words,
+                chapters=chapters,
+                kudos=kudos,
+                hits=hits,
+                comments=comments,
+                bookmarks=bookmarks,
+            ),
+            state=state_metrics,
+            quote="",
+            tag_kinds=record_tag_kinds(record),
+        )
+
+        return fic
+
+    except Exception as e:
+        print(f"⚠️ Failed to parse result: {e}")
+        return None
+
+
+def parse_search_result(result) -> Optional[FicData]:
+    """Parse a single AO3 search result into FicData"""
+    try:
+        record = search_result_to_record(result)
+    except Exception as e:
+        print(f"⚠️ Failed to parse result: {e}")
+        return None
+    return record_to_fic(record)
+
+
+# ============== Fast Search Page Parser ==============
+
+# Search parameters the fast path can put in a URL, as ao3-api names them.
+# Any other non-empty parameter sends the page through AO3.Search instead.
+SEARCH_URL_FIELDS = {
+    "relationships": "work_search[relationship_names]",
+    "kudos": "work_search[kudos_count]",
+    "sort_column": "work_search[sort_column]",
+    "sort_direction": "work_search[sort_direction]",
+    "revised_at": "work_search[revised_at]",
+}
+
+
+_NO_RESULTS = "No results found. You may want to edit your search to make it less specific."
+
+
+def search_page_url(params: dict, page: int) -> Optional[str]:
+    """AO3 search URL for params, built the way ao3-api's search() builds it."""
+    fields = [f"work_search[query]={params.get('any_field') or ' '}"]
+    if page != 1:
+        fields.append(f"page={page}")
+    for name, value in params.items():
+        if name == "any_field" or value in (None, ""):
+            continue
+        if name not in SEARCH_URL_FIELDS:
+            return None
+    # Same field order as ao3-api
+    for name in ("relationships", "kudos", "sort_column", "sort_direction", "revised_at"):
+        value = params.get(name)
+        if value not in (None, ""):
+            fields.append(f"{SEARCH_URL_FIELDS[name]}={value}")
+    return "https://archiveofourown.org/works/search?" + "&".join(fields)
+
+
+# Blurb elements ao3-api reads, by class; the first match in document order wins
+_BLURB_CLASSES = ("fandoms", "tags", "required-tags", "stats")
+
+
+def _classes(element) -> list[str]:
+    return (element.get("class") or "").split()
+
+
+def _find_class(root, name: str, tag=lxml.etree.Element):
+    """First descendant of root with the given class, like bs4's find()."""
+    for element in root.iterdescendants(tag):
+        if name in _classes(element):
+            return element
+    return None
+
+
+# Whitespace bs4 collapses: a text node of nothing else becomes "\n" or " "
+_BS4_SPACES = " \n\t\x0c\r"
+
+
+def _bs4_node(text: Optional[str]) -> str:
+    """A text node as bs4 stores it (see _BS4_SPACES)."""
+    if not text or text.strip(_BS4_SPACES):
+        return text or ""
+    return "\n" if "\n" in text else " "
+
+
+_TEXT_NODES = lxml.etree.XPath("descendant-or-self::text()", smart_strings=False)
+
+
+def _bs4_text(element) -> str:
+    """Equivalent of BeautifulSoup's Tag.text for an lxml element (comments excluded)."""
+    return "".join(_bs4_node(text) for text in _TEXT_NODES(element))
+
+
+def _bs4_string(element) -> Optional[str]:
+    """Equivalent of BeautifulSoup's Tag.string for an lxml element."""
+    children = list(element)
+    if not children:
+        return _bs4_node(element.text) if element.text else None
+    if len(children) == 1 and not element.text and not children[0].tail:
+        return _bs4_string(children[0])
+    return None
+
+
+def _stat(stats: dict, name: str, part: Optional[int] = None) -> Optional[int]:
+    if name not in stats:
+        return None
+    text = _bs4_text(stats[name])
+    if part is not None:
+        text = text.split("/")[part]
+    text = text.replace(",", "")
+    return int(text) if text.isdigit() else None
+
+
+def _blurb_to_record(blurb) -> Optional[dict]:
+    """Search result record for one li.blurb, as search_result_to_record builds it.
+
+    Returns an empty dict for blurbs ao3-api skips, and None when the blurb
+    has no work link.
+    """
+    heading = None
+    summary = None
+    date_updated = None
+    found = {}
+    for element in blurb.iterdescendants(lxml.etree.Element):
+        if heading is None and element.tag == "h4":
+            heading = element
+        cls = element.get("class")
+        if not cls:
+            continue
+        if summary is None and cls == "userstuff summary":
+            summary = _bs4_text(element)
+        if date_updated is None and cls == "datetime" and element.tag == "p":
+            date_updated = _bs4_text(element)
+        for name in cls.split():
+            if name in _BLURB_CLASSES and name not in found:
+                if name != "fandoms" or element.tag == "h5":
+                    found[name] = element
+    if heading is None:
+        return {}
+
+    work_id = None
+    title = None
+    authors = []
+    for a in heading.iter("a"):
+        if "rel" in a.attrib:
+            if "author" in a.get("rel").split():
+                authors.append(_bs4_string(a))
+        elif a.get("href", "").startswith("/works"):
+            work_id = AO3.utils.workid_from_url(a.get("href"))
+            title = _bs4_string(a)
+    if work_id is None:
+        return None
+
+    tag_lists = {"relationships": [], "characters": [], "freeforms": []}
+    if "tags" in found:
+        for li in found["tags"].iter("li"):
+            classes = _classes(li)
+            if "warnings" in classes:
+                continue
+            for name, values in tag_lists.items():
+                if name in classes:
+                    values.append(_bs4_text(li))
+                    break
+
+    rating = categories = None
+    if "required-tags" in found:
+        element = _find_class(found["required-tags"], "rating")
+        rating = _bs4_text(element) if element is not None else None
+        element = _find_class(found["required-tags"], "category")
+        categories = _bs4_text(element).split(", ") if element is not None else None
+
+    stats = {}
+    if "stats" in found:
+        for dd in found["stats"].iter("dd"):
+            for name in _classes(dd):
+                stats.setdefault(name, dd)
+    nchapters = _stat(stats, "chapters", 0)
+    expected = _stat(stats, "chapters", -1)
+
+    # AO3.Work.status only resolves when both chapter counts are known
+    status = None
+    if nchapters is not None and expected is not None:
+        status = "Completed" if nchapters == expected else "Work in Progress"
+
+    fandoms = [_bs4_string(a) for a in found["fandoms"].iter("a")] if "fandoms" in found else []
+
+    if date_updated is not None:
+        try:
+            date_updated = datetime.strptime(date_updated, "%d %b %Y").strftime("%Y-%m-%d")
+        except ValueError:
+            date_updated = None
+
+    return {
+        "id": work_id,
+        "authors": authors,
+        "date_updated": date_updated,
+        "nchapters": nchapters,
+        "title": title,
+        "fandoms": fandoms,
+        "characters": tag_lists["characters"],
+        "relationships": tag_lists["relationships"],
+        "tags": tag_lists["freeforms"],
+        "words": _stat(stats, "words"),
+        "chapters": [],
+        "kudos": _stat(stats, "kudos"),
+        "hits": _stat(stats, "hits"),
+        "comments": _stat(stats, "comments"),
+        "bookmarks": _stat(stats, "bookmarks"),
+        "rating": rating,
+        "status": status,
+        "categories": categories,
+        "summary": summary,
+    }
+
+
+def parse_search_page(content: bytes) -> Optional[tuple[list[dict], int]]:
+    """Parse a raw AO3 search results page with lxml, one pass per blurb.
+
+    Returns:
+        (search result records, total result count), or None when the page
+        does not look like a search page this parser understands
+    """
+    try:
+        document = lxml.html.fromstring(content)
+    except (lxml.etree.ParserError, ValueError):
+        return None
+
+    listing = next(
+        (ol for ol in document.iter("ol") if {"work", "index"} <= set(_classes(ol))),
+        None,
+    )
+    if listing is None:
+        if any(_bs4_text(p) == _NO_RESULTS for p in document.iter("p")):
+            return [], 0
+        return None
+
+    main = document.get_element_by_id("main", None)
+    if main is None or "works-search" not in _classes(main):
+        return None
+    heading = _find_class(main, "heading", "h3")
+    if heading is None:
+        return None
+    count = _bs4_text(heading).replace(",", "").replace(".", "").strip().split(" ")[0]
+    if not count.isdigit():
+        return None
+
+    records = []
+    for blurb in listing.iterchildren("li"):
+        if blurb.get("role") != "article":
+            continue
+        record = _blurb_to_record(blurb)
+        if record is None:
+            return None
+        if record:
+            records.append(record)
+    return records, int(count)
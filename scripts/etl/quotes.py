@@ -0,0 +1,222 @@
+"""Quotes picked from a work's first chapter."""
+
+import re
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import AO3
+import lxml.etree
+
+from .metrics import pipeline_metrics, timed_stage
+from .models import FicData
+from .governor import RateLimited, RequestGovernor, parse_retry_after, request_governor
+from .session import get_session
+from . import cache
+from .cache import WorkCache
+from .parse import _classes
+
+
+# ============== Quote Extraction ==============
+
+# Stop reading a chapter once this many candidate sentences were found...
+QUOTE_MAX_CANDIDATES = 40
+# ...or this much HTML was read
+QUOTE_MAX_BYTES = 512 * 1024
+QUOTE_CHUNK_BYTES = 16 * 1024
+
+QUOTE_MIN_LENGTH = 40
+QUOTE_MAX_LENGTH = 220
+QUOTE_IDEAL_LENGTH = 110
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])[\"'”’)]*\s+")
+_QUOTE_NAMES = re.compile(r"\b(?:Cait(?:lyn)?|Vi|Cupcake|Piltover|Zaun|Kiramman)\b")
+_QUOTE_NOISE = re.compile(r"https?://|\bchapter\b|\ba/n\b|\bauthor'?s note\b", re.I)
+
+
+def score_sentence(sentence: str) -> float:
+    """Cheap quotability score: mid-length dialogue about the pair wins."""
+    score = 1.0 - abs(len(sentence) - QUOTE_IDEAL_LENGTH) / QUOTE_IDEAL_LENGTH
+    if sentence[0] in "\"“'‘":
+        score += 0.5
+    if _QUOTE_NAMES.search(sentence):
+        score += 0.5
+    if sentence.rstrip("\"'”’)")[-1:] in "?!":
+        score += 0.2
+    if not sentence[0].isupper() and sentence[0] not in "\"“'‘":
+        score -= 0.5
+    if _QUOTE_NOISE.search(sentence):
+        score -= 2.0
+    return score
+
+
+def quote_candidates(text: str) -> list[str]:
+    """Sentences of a paragraph that are long enough to stand alone."""
+    sentences = []
+    for sentence in _SENTENCE_END.split(" ".join(text.split())):
+        sentence = sentence.strip()
+        if (
+            QUOTE_MIN_LENGTH <= len(sentence) <= QUOTE_MAX_LENGTH
+            and len(sentence.split()) >= 6
+        ):
+            sentences.append(sentence)
+    return sentences
+
+
+class QuoteExtractor:
+    """Incremental parser collecting candidate sentences from chapter HTML.
+
+    Feed the first chapter's page chunk by chunk. Only paragraphs inside
+    the chapter text (the first div.userstuff under #chapters, not the
+    notes) are read, and finished elements are dropped from the tree as
+    soon as they are parsed, so memory stays bounded by the chunk size and
+    QUOTE_MAX_CANDIDATES however long the chapter is.
+    """
+
+    def __init__(self, max_candidates: int = QUOTE_MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self.candidates: list[str] = []
+        self.done = False
+        self._parser = lxml.etree.HTMLPullParser(events=("start", "end"))
+        self._chapters = None
+        self._text = None
+        self._paragraphs = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse a chunk; return True once enough has been read."""
+        if self.done:
+            return True
+        self._parser.feed(chunk)
+        for event, element in self._parser.read_events():
+            if event == "start":
+                self._start(element)
+            else:
+                self._end(element)
+            if self.done:
+                break
+        return self.done
+
+    def close(self) -> None:
+        if not self.done:
+            try:
+                self._parser.close()
+            except lxml.etree.XMLSyntaxError:
+                pass
+        self.done = True
+
+    def _start(self, element) -> None:
+        if self._chapters is None:
+            if element.get("id") == "chapters":
+                self._chapters = element
+        elif self._text is None:
+            if element.tag == "div" and "userstuff" in _classes(element):
+                self._text = element
+        elif element.tag == "p":
+            self._paragraphs += 1
+
+    def _end(self, element) -> None:
+        if self._text is not None and element.tag == "p":
+            self._paragraphs -= 1
+            if not self._paragraphs:
+                self.candidates.extend(quote_candidates("".join(element.itertext())))
+                if len(self.candidates) >= self.max_candidates:
+                    del self.candidates[self.max_candidates :]
+                    self.done = True
+        if element is self._text or element is self._chapters:
+            self.done = True
+
+        # Inline children are kept until their paragraph has been read
+        if not self._paragraphs:
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+def first_chapter_url(work_id) -> str:
+    """Work page showing only the first chapter, past the adult content check."""
+    return f"https://archiveofourown.org/works/{work_id}?view_adult=true"
+
+
+def stream_first_chapter(work_id, max_bytes: int = QUOTE_MAX_BYTES) -> list[str]:
+    """Stream a work's first chapter and return its candidate sentences."""
+    url = first_chapter_url(work_id)
+    session = get_session()
+    if session is None:
+        response = AO3.requester.requester.request("get", url, stream=True)
+    else:
+        response = session.session.get(url, stream=True)
+
+    with response:
+        if response.status_code in (429, 503):
+            raise RateLimited(
+                f"HTTP {response.status_code} for work {work_id}",
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
+        if response.status_code == 404:
+            raise AO3.utils.InvalidIdError(f"Cannot find work {work_id}")
+        if response.status_code != 200:
+            raise AO3.utils.UnexpectedResponseError(
+                f"HTTP {response.status_code} for work {work_id}"
+            )
+
+        extractor = QuoteExtractor()
+        received = 0
+        for chunk in response.iter_content(QUOTE_CHUNK_BYTES):
+            received += len(chunk)
+            if extractor.feed(chunk) or received >= max_bytes:
+                break
+        extractor.close()
+    pipeline_metrics.count("bytes_received", received)
+    pipeline_metrics.count("quote_fetches")
+    return extractor.candidates
+
+
+def extract_quote(
+    work_id, chapters: int, governor: Optional[RequestGovernor] = None
+) -> Optional[str]:
+    """Quote picked from a work's first chapter, cached by ID and chapter count.
+
+    Returns None when the chapter could not be fetched.
+    """
+    key = WorkCache.quote_key(work_id, chapters)
+    work_cache = cache.work_cache
+    if work_cache:
+        cached = work_cache.get(key, math.inf)
+        if cached is not None:
+            return cached["quote"]
+
+    try:
+        candidates = (governor or request_governor).call(
+            lambda: stream_first_chapter(work_id), f"Quote for work {work_id}"
+        )
+    except Exception as e:
+        print(f"⚠️ Could not extract a quote for work {work_id}: {e}")
+        pipeline_metrics.count("quote_errors")
+        return None
+
+    # Highest score wins; the earliest sentence on ties
+    quote = max(candidates, key=score_sentence) if candidates else ""
+    if work_cache:
+        work_cache.set(key, {"quote": quote})
+    return quote
+
+
+@timed_stage("extract_quotes")
+def attach_quotes(
+    fics: list[FicData], governor: Optional[RequestGovernor] = None, workers: int = 1
+) -> None:
+    """Fill in fic.quote for fics without one, in place.
+
+    Fics whose quote is None are left alone, so their stored quote is kept.
+    """
+    pending = [fic for fic in fics if fic.quote == ""]
+    if not pending:
+        return
+
+    def attach(fic: FicData) -> None:
+        fic.quote = extract_quote(fic.id, fic.stats.chapters, governor)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(attach, pending))
@@ -0,0 +1,164 @@
+"""Recomputing meters from an export of the fics table, without touching AO3."""
+
+import json
+import sqlite3
+from datetime import datetime
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .metrics import pipeline_metrics
+from .scoring import METRICS, score_matrix
+from .sql import SCHEMA_PATH, DeltaSnapshot, SqlWriter, mood_columns, sql_literal
+
+
+# ============== Offline Rescoring ==============
+
+SCORE_COLUMNS = tuple(f"base_{metric}" for metric in METRICS)
+RESCORE_COLUMNS = ("id", "tags_json", "rating", "words") + SCORE_COLUMNS
+
+
+def _query_fics(conn: sqlite3.Connection) -> list[dict]:
+    conn.row_factory = sqlite3.Row
+    cursor = conn.execute(f"SELECT {','.join(RESCORE_COLUMNS)} FROM fics")
+    return [dict(row) for row in cursor]
+
+
+def load_fics_export(path: str) -> list[dict]:
+    """Read the rescoring columns of every fic from a local fics export.
+
+    Accepts a SQLite database, a .sql dump (`wrangler d1 export` or this
+    script's own output) or the JSON printed by
+    `wrangler d1 execute --json --command "SELECT * FROM fics"`.
+    """
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        # wrangler prints a list of result sets; a bare row list also works
+        if data and isinstance(data[0], dict) and "results" in data[0]:
+            rows = [row for result in data for row in result["results"]]
+        else:
+            rows = data
+        return [{c: row.get(c) for c in RESCORE_COLUMNS} for row in rows]
+
+    if path.endswith(".sql"):
+        with open(path, encoding="utf-8") as f:
+            dump = f.read()
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.executescript(dump)
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            # Data-only dump: create the table from schema.sql first
+            conn.close()
+            conn = sqlite3.connect(":memory:")
+            with open(SCHEMA_PATH, encoding="utf-8") as f:
+                conn.executescript(f.read())
+            conn.executescript(dump)
+    else:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    try:
+        return _query_fics(conn)
+    finally:
+        conn.close()
+
+
+def rescore_rows(rows: list[dict], batch_size: int = 50_000) -> Iterator[tuple[dict, dict]]:
+    """Recompute the meters of exported rows in vectorized batches.
+
+    Yields:
+        (row, {score column: new value}) for rows whose scores changed
+    """
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+        tag_lists = []
+        for row in batch:
+            tags = json.loads(row["tags_json"]) if row["tags_json"] else []
+            tag_lists.append(tags if isinstance(tags, list) else [])
+
+        old = np.array(
+            [[row[c] if row[c] is not None else 0 for c in SCORE_COLUMNS] for row in batch],
+            dtype=np.int32,
+        ).reshape(len(batch), len(SCORE_COLUMNS))
+        new = score_matrix(
+            tag_lists,
+            [row["rating"] or "T" for row in batch],
+            [row["words"] or 0 for row in batch],
+        )
+
+        for i in np.flatnonzero((old != new).any(axis=1)):
+            changed = {
+                c: int(new[i, j]) for j, c in enumerate(SCORE_COLUMNS) if old[i, j] != new[i, j]
+            }
+            yield batch[i], changed
+
+
+def run_rescore(source: str, output: Optional[str] = None, **kwargs) -> int:
+    """Rescore an exported fics table with the current TAG_RULES, offline.
+
+    Writes narrow UPDATEs of the changed base_* columns and the mood_*
+    flags derived from them to output (nothing is written when output is
+    None). With delta_against, the snapshot is
+    updated too so the next delta crawl does not emit the same changes.
+
+    Returns:
+        Number of fics whose scores changed
+    """
+    print("=" * 60)
+    print("🚀 CaitVi Hub ETL Pipeline - Mode: RESCORE")
+    print("=" * 60)
+
+    with pipeline_metrics.stage("load_export"):
+        rows = load_fics_export(source)
+    print(f"📥 Loaded {len(rows)} fics from {source}")
+
+    delta_against = kwargs.get("delta_against")
+    snapshot = DeltaSnapshot.load(delta_against) if delta_against else None
+
+    writer = None
+    if output:
+        writer = SqlWriter(
+            output,
+            kwargs.get("sql_options"),
+            header=(
+                f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                f"-- Mode: Rescore\n"
+            ),
+        )
+
+    changed_count = 0
+    column_counts = {c: 0 for c in SCORE_COLUMNS}
+    try:
+        with pipeline_metrics.stage("rescore", len(rows)):
+            for row, changed in rescore_rows(rows):
+                changed_count += 1
+                for column in changed:
+                    column_counts[column] += 1
+                # Moods follow the new scores
+                scores = {c: changed.get(c, row[c] or 0) for c in SCORE_COLUMNS}
+                changed.update(mood_columns(scores))
+                if writer:
+                    assignments = ",".join(f"{c}={v}" for c, v in changed.items())
+                    writer.statement(
+                        f"UPDATE fics SET {assignments},updated_at=CURRENT_TIMESTAMP "
+                        f"WHERE id={sql_literal(row['id'])};"
+                    )
+                if snapshot is not None:
+                    snapshot.update_columns(str(row["id"]), changed)
+    finally:
+        paths = writer.close() if writer else []
+
+    pipeline_metrics.count("works", changed_count)
+    print(f"🔁 {changed_count} of {len(rows)} fics changed scores")
+    for column, count in column_counts.items():
+        if count:
+            print(f"   {column}: {count}")
+    if paths:
+        print(f"✅ SQL file generated: {', '.join(paths)}")
+
+    if snapshot is not None and output:
+        snapshot.save(kwargs.get("snapshot_out") or delta_against)
+
+    return changed_count
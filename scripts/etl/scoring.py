@@ -0,0 +1,385 @@
+"""Tag scoring rules and the meters (spice, angst, fluff, plot, romance) computed from them."""
+
+from collections import deque
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .metrics import pipeline_metrics
+from .models import FicState
+
+
+# ============== Tag Scoring Rules ==============
+
+# Rules Dictionary:
+# Keys are lowercase keywords and default to partial matches
+# Values include:
+# - "{metric}_add": increment or decrement score.
+# - "{metric}": force set score.
+
+TAG_RULES = {
+    # --- SPICE ---
+    "explicit": {"spice": 5},
+    "mature": {"spice": 3},
+    "smut": {"spice_add": 2},
+    "porn": {"spice_add": 2},
+    "sex": {"spice_add": 1},
+    "sexual tension": {"spice_add": 1},
+    "knotting": {"spice_add": 1},
+    "alpha/beta/omega dynamics": {"spice_add": 2},
+    "fade to black": {"spice": 1},
+    "flirting": {"spice_add": 1, "romance_add": 1},
+    "slow burn": {"spice_add": -1},
+    # --- ANGST ---
+    "major character death": {"angst": 5, "fluff": 1},
+    "dead dove: do not eat": {"angst": 5},
+    "hurt no comfort": {"angst_add": 3, "fluff": 1},
+    "hurt/comfort": {"angst_add": 2, "fluff_add": 1},
+    "angst": {"angst_add": 2},
+    "grief": {"angst_add": 2},
+    "trauma": {"angst_add": 2},
+    "ptsd": {"angst_add": 2},
+    "heavy angst": {"angst_add": 3},
+    "canon compliant": {"angst_add": 1},
+    "light angst": {"angst_add": 1},
+    "happy ending": {"angst_add": -1},
+    # --- FLUFF ---
+    "tooth-rotting fluff": {"fluff": 5},
+    "no angst": {"fluff": 5},
+    "domestic": {"fluff_add": 3},
+    "fluff": {"fluff_add": 2},
+    "modern au": {"fluff_add": 1},
+    "coffee shop": {"fluff_add": 1},
+    "flower shop": {"fluff_add": 1},
+    "soft caitlyn": {"fluff_add": 1, "romance_add": 1},
+    "soft vi": {"fluff_add": 1, "romance_add": 1},
+    "protective vi": {"fluff_add": 1},
+    "jealous caitlyn": {"fluff_add": 1},
+    "mutual pining": {"fluff_add": 1, "romance_add": 1},
+    # --- PLOT ---
+    "canon divergence": {"plot_add": 1},
+    "fix-it": {"plot_add": 1, "romance_min": 4},
+    "time travel": {"plot_add": 1, "romance_min": 4},
+    "mystery": {"plot_add": 2},
+    "case fic": {"plot_add": 2},
+    "detective": {"plot_add": 2},
+    "politics": {"plot_add": 2},
+    "investigation": {"plot_add": 2},
+    "post-canon": {"plot_add": 1},
+    "pwp": {"plot": 1},
+    "porn without plot": {"plot": 1},
+    "chatfic": {"plot": 1},
+    # --- ROMANCE ---
+    "slow burn": {"romance": 5},
+    "established relationship": {"romance_min": 4},
+    "soulmates": {"romance_add": 1},
+    "enemies to lovers": {"romance_add": 1},
+    "first time": {"romance_add": 1},
+    "first kiss": {"romance_add": 1},
+    "confessions": {"romance_add": 1},
+    "pre-canon": {"romance_add": -1},
+    "friends to lovers": {"romance_add": 1},
+    "friendship": {"romance": 1},
+    "platonic": {"romance": 1},
+}
+
+# ============== Tag Rule Matcher ==============
+
+
+class TagMatcher:
+    """Aho-Corasick automaton that finds every keyword contained in a string.
+
+    All keywords are scanned in a single pass over the input, so the cost per
+    tag no longer grows with the number of rules.
+    """
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = list(patterns)
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+
+        # Build the keyword trie
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = child
+            self._out[node] += (index,)
+
+        # Failure links (breadth first), merging outputs of suffix matches
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] += self._out[self._fail[child]]
+
+    def search(self, text: str) -> tuple[int, ...]:
+        """Return the sorted indices of all patterns found in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(out[0])
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found.update(out[node])
+        return tuple(sorted(found))
+
+
+class CompiledTagRules:
+    """TAG_RULES compiled into a matcher plus pre-parsed actions.
+
+    Rule indices follow the dict order of the rules, so applying matches in
+    index order gives the same result as iterating TAG_RULES directly.
+    """
+
+    def __init__(self, rules: dict, cache_size: int = 65536):
+        self.keys = list(rules)
+        self.actions: list[tuple[tuple[str, str, int], ...]] = []
+        for rule in rules.values():
+            parsed = []
+            for action, value in rule.items():
+                if action.endswith("_add"):
+                    parsed.append(("add", action[:-4], value))
+                elif action.endswith("_min"):
+                    parsed.append(("min", action[:-4], value))
+                else:
+                    parsed.append(("set", action, value))
+            self.actions.append(tuple(parsed))
+
+        # "comfort" is matched alongside the rules for the hurt/comfort check
+        self.comfort_index = len(self.keys)
+        self.matcher = TagMatcher(self.keys + ["comfort"])
+
+        self._cache: dict[str, tuple[int, ...]] = {}
+        self._cache_size = cache_size
+
+    def match(self, tag: str) -> tuple[int, ...]:
+        """Indices of rules (and comfort_index) matching a lowercased tag."""
+        hit = self._cache.get(tag)
+        if hit is None:
+            hit = self.matcher.search(tag)
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[tag] = hit
+        return hit
+
+
+COMPILED_TAG_RULES = CompiledTagRules(TAG_RULES)
+
+
+# ============== Metrics Calculation ==============
+
+METRICS = ("spice", "angst", "fluff", "plot", "romance")
+BASE_SCORES = {"spice": 1, "angst": 1, "fluff": 1, "plot": 1, "romance": 3}
+
+# Spice floor set by the AO3 rating
+RATING_SPICE = {"E": 5, "M": 3}
+
+# (exclusive word count lower bound, plot score), checked in order
+PLOT_WORD_THRESHOLDS = ((50000, 5), (20000, 4), (10000, 3), (5000, 2))
+
+
+def calculate_metrics(
+    tags: list[str],
+    rating: str,
+    word_count: int,
+    rules: Optional["CompiledTagRules"] = None,
+) -> FicState:
+    """Based on the Tags, Rating and Word Count, calculate the 5 basic metrics."""
+
+    rules = rules or COMPILED_TAG_RULES
+
+    # BaseLine
+    scores = dict(BASE_SCORES)
+    forced_values = {}
+    min_values = {}
+
+    # Hardcoded Rules for Spice
+    if rating in RATING_SPICE:
+        scores["spice"] = RATING_SPICE[rating]
+
+    # Hardcoded Rules for Plot base on word count
+    for threshold, plot in PLOT_WORD_THRESHOLDS:
+        if word_count > threshold:
+            scores["plot"] = plot
+            break
+
+    # Process Tags: matched rules come back in TAG_RULES order for each tag
+    has_comfort = False
+    actions = rules.actions
+    comfort_index = rules.comfort_index
+
+    for tag in tags:
+        for index in rules.match(tag.lower()):
+            if index == comfort_index:
+                has_comfort = True
+                continue
+
+            for kind, metric, value in actions[index]:
+                if kind == "add":
+                    scores[metric] += value
+                elif kind == "min":
+                    min_values[metric] = max(min_values.get(metric, 0), value)
+                elif metric not in forced_values or value in (1, 5):
+                    forced_values[metric] = value
+
+    for metric, min_val in min_values.items():
+        scores[metric] = max(scores[metric], min_val)
+
+    scores.update(forced_values)
+
+    if scores["angst"] >= 4 and not has_comfort:
+        scores["fluff"] -= 1
+
+    for k in scores:
+        scores[k] = max(1, min(5, scores[k]))
+
+    return FicState(**scores)
+
+
+def calculate_metrics_many(
+    items: Iterable[tuple[list[str], str, int]],
+    rules: Optional["CompiledTagRules"] = None,
+) -> list[FicState]:
+    """Score many fics at once.
+
+    Args:
+        items: Iterable of (tags, rating, word_count) tuples
+        rules: Compiled rules to use (defaults to the module's TAG_RULES)
+
+    Returns:
+        One FicState per item, in input order
+    """
+    rules = rules or COMPILED_TAG_RULES
+    items = list(items)
+    with pipeline_metrics.stage("calculate_metrics", items=len(items)):
+        return [
+            calculate_metrics(tags, rating, word_count, rules)
+            for tags, rating, word_count in items
+        ]
+
+
+class RuleMatrix:
+    """CompiledTagRules as per-rule action matrices (rule x metric).
+
+    Row comfort_index stays empty: "comfort" only feeds the hurt/comfort
+    check and never applies actions.
+    """
+
+    def __init__(self, rules: "CompiledTagRules"):
+        self.rules = rules
+        self.comfort_index = rules.comfort_index
+        shape = (len(rules.keys) + 1, len(METRICS))
+        self.add = np.zeros(shape, dtype=np.int32)
+        self.min = np.zeros(shape, dtype=np.int32)
+        self.set = np.zeros(shape, dtype=np.int32)
+        self.has_set = np.zeros(shape, dtype=bool)
+
+        for index, actions in enumerate(rules.actions):
+            for kind, metric, value in actions:
+                column = METRICS.index(metric)
+                if kind == "add":
+                    self.add[index, column] += value
+                elif kind == "min":
+                    self.min[index, column] = max(self.min[index, column], value)
+                else:
+                    self.set[index, column] = value
+                    self.has_set[index, column] = True
+
+
+def score_matrix(
+    tag_lists: list[list[str]],
+    ratings: list[str],
+    word_counts: list[int],
+    rules: Optional["CompiledTagRules"] = None,
+):
+    """Vectorized calculate_metrics over many fics.
+
+    Each tag is matched once; the (fic, rule) match sequence then drives
+    NumPy reductions. Additive rules go through a fic x rule incidence
+    matrix. Forced values depend on match order (the last 1 or 5 wins,
+    otherwise the first), so they are resolved from the ordered sequence.
+
+    Returns:
+        int array of shape (len(tag_lists), 5), columns in METRICS order
+    """
+    rules = rules or COMPILED_TAG_RULES
+    matrix = RuleMatrix(rules)
+    n = len(tag_lists)
+
+    # Ordered (fic, rule) match sequence: tag order, then rule order per tag
+    fic_index = []
+    rule_index = []
+    for i, tags in enumerate(tag_lists):
+        for tag in tags:
+            matched = rules.match(tag.lower())
+            if matched:
+                fic_index.extend([i] * len(matched))
+                rule_index.extend(matched)
+    fic_index = np.asarray(fic_index, dtype=np.int64)
+    rule_index = np.asarray(rule_index, dtype=np.int64)
+
+    n_rules = matrix.add.shape[0]
+    incidence = np.bincount(
+        fic_index * n_rules + rule_index, minlength=n * n_rules
+    ).reshape(n, n_rules)
+
+    # BaseLine, rating and word count
+    scores = np.tile(np.array([BASE_SCORES[m] for m in METRICS], dtype=np.int32), (n, 1))
+    spice, plot = METRICS.index("spice"), METRICS.index("plot")
+    ratings = np.asarray(ratings, dtype=object)
+    for rating, value in RATING_SPICE.items():
+        scores[ratings == rating, spice] = value
+    words = np.asarray(word_counts, dtype=np.int64)
+    plot_scores = scores[:, plot]
+    for threshold, value in reversed(PLOT_WORD_THRESHOLDS):
+        plot_scores[words > threshold] = value
+
+    scores += (incidence @ matrix.add).astype(np.int32)
+
+    present = incidence > 0
+    for column in range(len(METRICS)):
+        min_rules = np.flatnonzero(matrix.min[:, column])
+        if len(min_rules):
+            floor = (present[:, min_rules] * matrix.min[min_rules, column]).max(axis=1)
+            scores[:, column] = np.where(
+                floor > 0, np.maximum(scores[:, column], floor), scores[:, column]
+            )
+
+    for column in range(len(METRICS)):
+        setting = matrix.has_set[rule_index, column]
+        if not setting.any():
+            continue
+        fics = fic_index[setting]
+        values = matrix.set[rule_index[setting], column]
+
+        # First forced value per fic...
+        first = np.r_[True, fics[1:] != fics[:-1]]
+        scores[fics[first], column] = values[first]
+
+        # ...unless a later 1 or 5 overrides it; the last one wins
+        extreme = (values == 1) | (values == 5)
+        fics, values = fics[extreme], values[extreme]
+        if len(fics):
+            last = np.r_[fics[1:] != fics[:-1], True]
+            scores[fics[last], column] = values[last]
+
+    angst, fluff = METRICS.index("angst"), METRICS.index("fluff")
+    has_comfort = present[:, matrix.comfort_index]
+    scores[(scores[:, angst] >= 4) & ~has_comfort, fluff] -= 1
+
+    return np.clip(scores, 1, 5)
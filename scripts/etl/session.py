@@ -0,0 +1,202 @@
+"""AO3 sessions shared by worker threads, with saved logins."""
+
+import os
+import time
+import json
+import threading
+from typing import Optional
+
+import AO3
+from dotenv import load_dotenv
+
+from .metrics import pipeline_metrics
+from .governor import _last_response, parse_retry_after
+
+
+# ============== AO3 Session Management ==============
+
+# Saved login cookies; kept out of the cache directory, which CI persists
+DEFAULT_SESSION_FILE = ".ao3_session.json"
+
+
+class CookieSession(AO3.Session):
+    """AO3.Session logged in with saved cookies instead of a password.
+
+    AO3.Session.__init__ always posts the login form, so this starts from the
+    guest session state and adds the logged-in user. It is meant for fetching
+    works and searches; the user page helpers (bookmarks, subscriptions,
+    history) need a session that logged in with a password.
+    """
+
+    def __init__(self, username: str, cookies: list[dict]):
+        AO3.GuestSession.__init__(self)
+        self.is_authed = True
+        self.username = username
+        self.url = f"https://archiveofourown.org/users/{username}"
+        for cookie in cookies:
+            self.session.cookies.set(**cookie)
+
+
+class SessionPool:
+    """Lazily created AO3 sessions shared by worker threads.
+
+    Nothing touches the network until the first get(). An authenticated
+    session logs in once, saves its cookies to cookie_path and reuses them on
+    later runs until they expire or are older than max_age_hours. The other
+    sessions in the pool copy the first session's cookies instead of logging
+    in again, so each worker thread gets its own connection pool.
+
+    adapters maps URL prefixes to requests transport adapters mounted on every
+    session, e.g. to point the pipeline at a local stand-in for AO3.
+    """
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 1,
+        cookie_path: Optional[str] = None,
+        max_age_hours: float = 24,
+        adapters: Optional[dict] = None,
+    ):
+        self.username = username
+        self.password = password
+        self.size = max(1, size)
+        self.cookie_path = cookie_path
+        self.max_age = max_age_hours * 3600
+        self.adapters = adapters or {}
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions = []
+        self._next = 0
+
+    def get(self):
+        """Return the session assigned to the calling thread."""
+        session = getattr(self._local, "session", None)
+        if session is not None:
+            return session
+
+        with self._lock:
+            index = self._next % self.size
+            self._next += 1
+            if index < len(self._sessions):
+                session = self._sessions[index]
+            else:
+                session = self._create()
+                if session is not None:
+                    session.session.hooks["response"].append(self._record_response)
+                    for prefix, adapter in self.adapters.items():
+                        session.session.mount(prefix, adapter)
+                self._sessions.append(session)
+
+        self._local.session = session
+        return session
+
+    @staticmethod
+    def _record_response(response, *args, **kwargs) -> None:
+        pipeline_metrics.count("http_requests")
+        # Streamed bodies are counted by their reader as they arrive
+        if not kwargs.get("stream"):
+            pipeline_metrics.count("bytes_received", len(response.content))
+        if response.status_code == 429:
+            pipeline_metrics.count("http_429")
+        # Read by RequestGovernor.call, which runs the request in this thread
+        _last_response.status = response.status_code
+        _last_response.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+    def _create(self):
+        if not self._sessions:
+            return self._open()
+
+        base = self._sessions[0]
+        if base is None or not base.is_authed:
+            return AO3.GuestSession() if base is not None else None
+        return self._clone(base)
+
+    def _open(self):
+        if not (self.username and self.password):
+            print("❌ AO3 credentials not found. Using anonymous session.")
+            return AO3.GuestSession()
+
+        session = self._restore()
+        if session is not None:
+            print(f"✅ Reusing saved login for {self.username}")
+            return session
+
+        try:
+            session = AO3.Session(self.username, self.password)
+            print(f"✅ Successfully logged in as {self.username}")
+        except Exception as e:
+            print(f"❌ Error logging in: {e}")
+            return None
+
+        self._save(session)
+        return session
+
+    def _clone(self, base):
+        return CookieSession(self.username, self._dump_cookies(base))
+
+    @staticmethod
+    def _dump_cookies(session) -> list[dict]:
+        return [
+            {
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "expires": c.expires,
+                "secure": c.secure,
+            }
+            for c in session.session.cookies
+        ]
+
+    def _restore(self):
+        if not self.cookie_path or not os.path.exists(self.cookie_path):
+            return None
+        try:
+            with open(self.cookie_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        now = time.time()
+        if saved.get("username") != self.username:
+            return None
+        if now - saved.get("saved_at", 0) > self.max_age:
+            return None
+        cookies = saved.get("cookies") or []
+        if not cookies or any(c["expires"] and c["expires"] <= now for c in cookies):
+            return None
+        return CookieSession(self.username, cookies)
+
+    def _save(self, session) -> None:
+        if not self.cookie_path:
+            return
+        directory = os.path.dirname(self.cookie_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.cookie_path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "username": self.username,
+                    "saved_at": time.time(),
+                    "cookies": self._dump_cookies(session),
+                },
+                f,
+            )
+        os.replace(tmp_path, self.cookie_path)
+
+
+# Load environment variables
+load_dotenv()
+
+session_pool = SessionPool(os.environ.get("AO3_USERNAME"), os.environ.get("AO3_PASSWORD"))
+
+
+def get_session():
+    """AO3 session for the calling thread, logging in on first use."""
+    return session_pool.get()
@@ -0,0 +1,170 @@
+"""Static JSON shards of the discover listings and fic details."""
+
+import os
+import base64
+import json
+import shutil
+import sqlite3
+
+from .metrics import timed_stage
+from .sql import FIC_COLUMNS
+
+
+# ============== JSON Shards ==============
+
+# /api/fics sort options as (sort column, ascending); ties break on id.
+# created_at is when a row was first written to *this* database, not to D1,
+# so default listings hand over to the API by offset rather than by cursor
+SHARD_SORTS = {
+    "default": ("created_at", False),
+    "kudos": ("kudos", False),
+    "words_desc": ("words", False),
+    "words_asc": ("words", True),
+}
+SHARD_RATINGS = ("G", "T", "M", "E")
+SHARD_STATUSES = ("completed", "ongoing")
+
+# Page size of the discover page, and pages pre-rendered per listing
+SHARD_PAGE_SIZE = 24
+SHARD_MAX_PAGES = 5
+
+
+def fic_to_api_json(row: dict) -> str:
+    """A fics row as /api/fics renders it (dbFicToFic in src/lib/fic-transform.ts)."""
+    def default(value, fallback):
+        return fallback if value is None else value
+
+    fic = {
+        "id": row["id"],
+        "title": row["title"],
+        "author": row["author"],
+        "summary": default(row["summary"], ""),
+        "rating": default(row["rating"], "G"),
+        "tags": json.loads(row["tags_json"]) if row["tags_json"] else [],
+        "category": default(row["category"], ""),
+        "status": default(row["status"], "ongoing"),
+        "isTranslated": bool(row["is_translated"]),
+        "state": {
+            "spice": default(row["base_spice"], 1),
+            "angst": default(row["base_angst"], 1),
+            "fluff": default(row["base_fluff"], 1),
+            "plot": default(row["base_plot"], 1),
+            "romance": default(row["base_romance"], 1),
+        },
+        "stats": {
+            "words": default(row["words"], 0),
+            "chapters": default(row["chapters"], 1),
+            "kudos": default(row["kudos"], 0),
+            "hits": default(row["hits"], 0),
+            "comments": default(row["comments"], 0),
+            "bookmarks": default(row["bookmarks"], 0),
+        },
+        "quote": default(row["quote"], ""),
+        "link": row["link"],
+    }
+    return json.dumps(fic, ensure_ascii=False, separators=(",", ":"))
+
+
+def listing_cursor(value, fic_id: str) -> str:
+    """The /api/fics nextCursor for a row: base64 of the JSON [sort value, id]."""
+    return base64.b64encode(
+        json.dumps([value, fic_id], separators=(",", ":")).encode("utf-8")
+    ).decode("ascii")
+
+
+def write_shard(path: str, text: str) -> None:
+    """Write one pre-rendered JSON file."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@timed_stage("export_json_shards")
+def export_json_shards(
+    db_path: str,
+    output_dir: str,
+    page_size: int = SHARD_PAGE_SIZE,
+    max_pages: int = SHARD_MAX_PAGES,
+) -> list[str]:
+    """Pre-render /api/fics responses from a local SQLite database.
+
+    For every sort and rating/status filter ('all' when unset), the first
+    max_pages pages are written to
+    {output_dir}/listing/{sort}/{rating}/{status}/{offset}.json in the
+    {items, total, hasMore, nextOffset, nextCursor} shape of /api/fics, so
+    later pages continue against the API (the default sort only by offset,
+    see SHARD_SORTS). Each fic is also written to
+    {output_dir}/fics/{id}.json, like /api/fics/[id]. Items are rendered
+    once and each sort is a single ordered scan.
+
+    Listings and totals are those of db_path, so it should hold the same
+    fics as D1 (a database kept across runs, not a single weekly run).
+
+    Returns:
+        [output_dir]
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    listing_dir = os.path.join(output_dir, "listing")
+    fics_dir = os.path.join(output_dir, "fics")
+    # Listings are replaced wholesale; fics are never deleted, so detail files are
+    # just overwritten
+    shutil.rmtree(listing_dir, ignore_errors=True)
+    os.makedirs(fics_dir, exist_ok=True)
+
+    items = {}
+    try:
+        for row in conn.execute(f"SELECT {','.join(FIC_COLUMNS)} FROM fics"):
+            items[row["id"]] = fic_to_api_json(row)
+            write_shard(os.path.join(fics_dir, f"{row['id']}.json"), items[row["id"]])
+
+        limit = page_size * max_pages
+        pages = 0
+        for sort, (column, ascending) in SHARD_SORTS.items():
+            direction = "ASC" if ascending else "DESC"
+            # Filter combination -> (total, first limit + 1 rows)
+            listings: dict[tuple, list] = {}
+            for fic_id, rating, status, value in conn.execute(
+                f"SELECT id, rating, status, {column} FROM fics "
+                f"ORDER BY {column} {direction}, id {direction}"
+            ):
+                rating = rating if rating in SHARD_RATINGS else None
+                status = status if status in SHARD_STATUSES else None
+                for key in {(None, None), (rating, None), (None, status), (rating, status)}:
+                    listing = listings.setdefault(key, [0, []])
+                    listing[0] += 1
+                    if len(listing[1]) <= limit:
+                        listing[1].append((fic_id, value))
+
+            for rating in (None,) + SHARD_RATINGS:
+                for status in (None,) + SHARD_STATUSES:
+                    total, rows = listings.get((rating, status), (0, []))
+                    directory = os.path.join(
+                        listing_dir, sort, rating or "all", status or "all"
+                    )
+                    os.makedirs(directory, exist_ok=True)
+                    for offset in range(0, max(len(rows), 1), page_size):
+                        if offset >= limit:
+                            break
+                        page = rows[offset : offset + page_size]
+                        has_more = len(rows) > offset + page_size
+                        meta = {}
+                        if offset == 0:
+                            meta["total"] = total
+                        meta["hasMore"] = has_more
+                        meta["nextOffset"] = offset + len(page)
+                        last_id, last_value = page[-1] if page else (None, None)
+                        if has_more and last_value is not None and sort != "default":
+                            meta["nextCursor"] = listing_cursor(last_value, last_id)
+                        text = (
+                            '{"items":['
+                            + ",".join(items[fic_id] for fic_id, _ in page)
+                            + "],"
+                            + json.dumps(meta, separators=(",", ":"))[1:]
+                        )
+                        write_shard(os.path.join(directory, f"{offset}.json"), text)
+                        pages += 1
+    finally:
+        conn.close()
+
+    print(f"✅ JSON shards generated: {output_dir} ({pages} pages, {len(items)} fics)")
+    return [output_dir]
@@ -0,0 +1,808 @@
+"""Streaming output sinks: SQL, JSON, JSONL, SQLite and Parquet."""
+
+import os
+import json
+import sqlite3
+from collections import Counter
+from dataclasses import asdict
+from datetime import datetime
+from typing import Optional
+
+from .metrics import pipeline_metrics, timed_stage
+from .models import FicData
+from .sql import (
+    FACET_INSERT_PREFIX,
+    FACET_SOURCE_COLUMNS,
+    FACET_UPSERT_SUFFIX,
+    FIC_COLUMNS,
+    FIC_FACETS_REBUILD_SQL,
+    FIC_INSERT_COLUMNS,
+    FIC_UPDATE_SUFFIX,
+    FIC_UPSERT_SUFFIX,
+    FIC_UPSERT_VALUES,
+    FTS_COLUMNS,
+    FTS_INSERT_PREFIX,
+    FTS_SOURCE_COLUMNS,
+    MOOD_COLUMNS,
+    RAND_KEY_SQL,
+    SCHEMA_PATH,
+    STATS_REFRESH_COLUMNS,
+    TAG_INDEX_BATCH,
+    DeltaSnapshot,
+    SqlOutputOptions,
+    SqlWriter,
+    facet_removal_sql,
+    facet_values,
+    fic_tag_rows,
+    fic_to_row,
+    finish_load_sql,
+    fts_values,
+    prepare_load_sql,
+    row_values_sql,
+    sql_literal,
+    write_facet_removal_sql,
+    write_facet_sql,
+    write_fts_sql,
+    write_tag_index_sql,
+)
+from .shards import SHARD_MAX_PAGES, export_json_shards
+
+
+# ============== Output Sinks ==============
+
+
+class SqlSink:
+    """Streaming SQL sink; each page is appended and flushed to disk.
+
+    With a snapshot, only new fics are inserted and changed fics get narrow
+    UPDATEs of the columns that differ; unchanged fics are skipped.
+    Stats-only refreshes are always written as narrow UPDATEs. Each page's
+    fics rows are followed by the fics_fts and tags/fic_tags rows of the fics
+    whose indexed columns were written, and are bracketed by the fic_facets
+    updates of the fics whose facet columns were. With rebuild_tag_index,
+    every fic's tags/fic_tags rows are rewritten, changed or not, and
+    fic_facets is recounted on close. The first page that writes anything
+    is preceded by prepare_load_sql().
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        snapshot: Optional[DeltaSnapshot] = None,
+        options: Optional[SqlOutputOptions] = None,
+        resume: Optional[dict] = None,
+        rebuild_tag_index: bool = False,
+    ):
+        self.snapshot = snapshot
+        self.rebuild_tag_index = rebuild_tag_index
+        self.inserted = self.updated = self.unchanged = self.refreshed = 0
+        # Tag ids inserted so far (re-inserting after a resume is harmless)
+        self.written_tags: set[int] = set()
+        # prepare_load_sql() is idempotent, so a resumed run repeats it
+        self.prepared = False
+        if resume:
+            counts = list(resume["counts"]) + [0]
+            self.inserted, self.updated, self.unchanged, self.refreshed = counts[:4]
+
+        mode = "Delta" if snapshot is not None else "Upsert (INSERT OR REPLACE)"
+        self.writer = SqlWriter(
+            output_path,
+            options,
+            header=(
+                f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                f"-- Mode: {mode}\n"
+            ),
+            resume=resume["writer"] if resume else None,
+        )
+        print(f"⚙️ Generating SQL file: {output_path}...")
+
+    def state(self) -> dict:
+        return {
+            "writer": self.writer.state(),
+            "counts": [self.inserted, self.updated, self.unchanged, self.refreshed],
+        }
+
+    def diff(self, row: dict) -> Optional[list[str]]:
+        """Columns of a fics row to write; None writes the whole row."""
+        if self.snapshot is None:
+            return None
+        return self.snapshot.diff(row)
+
+    def write(self, row: dict, changed: Optional[list[str]]) -> list[str]:
+        """Queue a fics row, given its diff().
+
+        Returns:
+            The columns written, so indexes over those columns can follow
+        """
+        values = f"({row_values_sql(row)},{RAND_KEY_SQL},CURRENT_TIMESTAMP,CURRENT_TIMESTAMP)"
+
+        if self.snapshot is None:
+            self.writer.insert(
+                f"INSERT OR REPLACE INTO fics ({FIC_INSERT_COLUMNS}) VALUES", values
+            )
+            self.inserted += 1
+            return list(FIC_COLUMNS)
+
+        if changed is None:
+            # Upserts keep created_at, even if a stale snapshot marks a fic as new
+            self.writer.insert(
+                f"INSERT INTO fics ({FIC_INSERT_COLUMNS}) VALUES",
+                values,
+                FIC_UPSERT_SUFFIX,
+            )
+            self.inserted += 1
+            return list(FIC_COLUMNS)
+        if changed:
+            assignments = ",".join(f"{c}={sql_literal(row[c])}" for c in changed)
+            self.writer.statement(
+                f"UPDATE fics SET {assignments},{FIC_UPDATE_SUFFIX} "
+                f"WHERE id={sql_literal(row['id'])};"
+            )
+            self.updated += 1
+        else:
+            self.unchanged += 1
+        return changed
+
+    def write_page(self, fics: list[FicData]) -> None:
+        rows = [fic_to_row(fic) for fic in fics]
+        changes = [self.diff(row) for row in rows]
+        if not self.prepared and (self.rebuild_tag_index or any(c != [] for c in changes)):
+            for statement in prepare_load_sql():
+                self.writer.statement(statement)
+            self.prepared = True
+        faceted = [
+            i
+            for i, changed in enumerate(changes)
+            if changed is None or any(c in FACET_SOURCE_COLUMNS for c in changed)
+        ]
+        # Before the fics rows, while D1 still holds the values being replaced
+        write_facet_removal_sql(self.writer, [rows[i]["id"] for i in faceted])
+
+        fts_rows = []
+        fic_tags = {}
+        for fic, row, changed in zip(fics, rows, changes):
+            written = self.write(row, changed)
+            if any(c in written for c in FTS_SOURCE_COLUMNS):
+                fts_rows.append(row)
+            if "tags_json" in written or self.rebuild_tag_index:
+                fic_tags[fic.id] = fic_tag_rows(fic)
+        # After the fics rows, so the indexes never reference a missing fic
+        write_fts_sql(self.writer, fts_rows)
+        write_tag_index_sql(self.writer, fic_tags, self.written_tags)
+
+        facets = Counter()
+        for i in faceted:
+            facets.update(facet_values(rows[i], fic_tag_rows(fics[i])))
+        write_facet_sql(self.writer, facets)
+        self.writer.flush()
+
+    def refresh_stats(self, fics: list[FicData]) -> None:
+        """Update only STATS_REFRESH_COLUMNS of fics whose details are current."""
+        for fic in fics:
+            row = fic_to_row(fic)
+            columns = list(STATS_REFRESH_COLUMNS)
+            if self.snapshot is not None:
+                changed = self.snapshot.update_columns(
+                    row["id"], {c: row[c] for c in columns}
+                )
+                if changed == []:
+                    self.unchanged += 1
+                    continue
+                columns = changed or columns
+
+            assignments = ",".join(f"{c}={sql_literal(row[c])}" for c in columns)
+            self.writer.statement(
+                f"UPDATE fics SET {assignments},{FIC_UPDATE_SUFFIX} "
+                f"WHERE id={sql_literal(row['id'])};"
+            )
+            self.refreshed += 1
+        self.writer.flush()
+
+    def abort(self) -> None:
+        """Close the files of a failed run, without the end-of-load statements."""
+        self.writer.close()
+
+    def close(self) -> list[str]:
+        if self.rebuild_tag_index:
+            # Unchanged fics got fic_tags without passing through the counts
+            for statement in FIC_FACETS_REBUILD_SQL:
+                self.writer.statement(statement)
+        if self.writer.rows:
+            for statement in finish_load_sql():
+                self.writer.statement(statement)
+        paths = self.writer.close()
+        if self.snapshot is not None:
+            counts = f"{self.inserted} new, {self.updated} changed, {self.unchanged} unchanged"
+        else:
+            counts = f"{self.inserted} rows"
+        if self.refreshed:
+            counts += f", {self.refreshed} stats refreshed"
+        print(f"✅ SQL file generated: {', '.join(paths)} ({counts})")
+        return paths
+
+
+class JsonSink:
+    """Streaming JSON array sink, byte-compatible with json.dump(indent=2)."""
+
+    def __init__(self, output_path: str, resume: Optional[dict] = None):
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.output_path = output_path
+        self.count = 0
+
+        if resume:
+            self.count = resume["count"]
+            self._file = open(output_path, "r+", encoding="utf-8")
+            self._file.truncate(resume["offset"])
+            self._file.seek(resume["offset"])
+        else:
+            self._file = open(output_path, "w", encoding="utf-8")
+            self._file.write("[")
+
+    def state(self) -> dict:
+        return {"offset": self._file.tell(), "count": self.count}
+
+    def write_page(self, fics: list[FicData]) -> None:
+        for fic in fics:
+            item = json.dumps(asdict(fic), ensure_ascii=False, indent=2)
+            self._file.write(",\n  " if self.count else "\n  ")
+            self._file.write(item.replace("\n", "\n  "))
+            self.count += 1
+        self._file.flush()
+
+    def abort(self) -> None:
+        # The partial array is still terminated; a resume truncates it again
+        self.close()
+
+    def close(self) -> list[str]:
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        print(f"\n📁 Results saved to: {self.output_path}")
+        return [self.output_path]
+
+
+class JsonlSink:
+    """Streaming JSON Lines sink; one compact FicData object per line."""
+
+    def __init__(self, output_path: str, resume: Optional[dict] = None):
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.output_path = output_path
+
+        if resume:
+            self._file = open(output_path, "r+", encoding="utf-8")
+            self._file.truncate(resume["offset"])
+            self._file.seek(resume["offset"])
+        else:
+            self._file = open(output_path, "w", encoding="utf-8")
+
+    def state(self) -> dict:
+        return {"offset": self._file.tell()}
+
+    def write_page(self, fics: list[FicData]) -> None:
+        for fic in fics:
+            self._file.write(json.dumps(asdict(fic), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def abort(self) -> None:
+        self._file.close()
+
+    def close(self) -> list[str]:
+        self._file.close()
+        print(f"\n📁 Results saved to: {self.output_path}")
+        return [self.output_path]
+
+
+def sqlite_literal(value) -> str:
+    """Render a value as a SQLite literal, keeping the text exactly as stored."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# Conflicting rows are only rewritten (and their updated_at bumped) when a
+# column actually changed, so updated_at marks the rows a run touched
+SQLITE_UPSERT_SQL = (
+    f"INSERT INTO fics ({FIC_INSERT_COLUMNS}) "
+    f"VALUES ({','.join('?' for _ in FIC_COLUMNS)},{RAND_KEY_SQL},CURRENT_TIMESTAMP,CURRENT_TIMESTAMP) "
+    f"{FIC_UPSERT_SUFFIX} "
+    f"WHERE ({','.join(f'fics.{c}' for c in FIC_COLUMNS[1:])}) "
+    f"IS NOT ({','.join(FIC_UPSERT_VALUES.values())})"
+)
+
+
+SQLITE_REFRESH_SQL = (
+    f"UPDATE fics SET {','.join(f'{c}=?' for c in STATS_REFRESH_COLUMNS)},"
+    f"{FIC_UPDATE_SUFFIX} WHERE id=? "
+    f"AND ({','.join(STATS_REFRESH_COLUMNS)}) "
+    f"IS NOT ({','.join('?' for _ in STATS_REFRESH_COLUMNS)})"
+)
+
+
+SQLITE_FTS_SQL = f"{FTS_INSERT_PREFIX} ({','.join('?' for _ in range(len(FTS_COLUMNS) + 1))})"
+SQLITE_TAG_SQL = "INSERT OR IGNORE INTO tags (id,name,kind) VALUES (?,?,?)"
+SQLITE_FIC_TAG_SQL = "INSERT OR IGNORE INTO fic_tags (fic_id,tag_id) VALUES (?,?)"
+SQLITE_FACET_SQL = f"{FACET_INSERT_PREFIX} (?,?,?) {FACET_UPSERT_SUFFIX}"
+
+
+class SqliteSink:
+    """Streaming sink that upserts straight into a local SQLite database.
+
+    The tables come from scripts/schema.sql (or the drizzle migration) when
+    missing. Each page is written in its own transaction, so a checkpoint
+    never points past uncommitted rows, and replaces the fics_fts and
+    fic_tags rows and the fic_facets counts of its fics. With export_path, rows inserted or changed
+    during the run are dumped on close as D1-importable SQL; with shards_dir,
+    the whole database is pre-rendered as static JSON shards.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        schema_path: Optional[str] = None,
+        export_path: Optional[str] = None,
+        export_all: bool = False,
+        options: Optional[SqlOutputOptions] = None,
+        resume: Optional[dict] = None,
+        shards_dir: Optional[str] = None,
+        shard_pages: Optional[int] = None,
+    ):
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.output_path = output_path
+        self.export_path = export_path
+        self.export_all = export_all
+        self.options = options
+        self.shards_dir = shards_dir
+        self.shard_pages = shard_pages or SHARD_MAX_PAGES
+
+        self._conn = sqlite3.connect(output_path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        # Facets of existing rows are counted once, when the table is created
+        count_facets = self._has_table("fics") and not self._has_table("fic_facets")
+        if not self._has_table("fics"):
+            with open(schema_path or SCHEMA_PATH, encoding="utf-8") as f:
+                self._conn.executescript(f.read())
+        # Databases created before the mood/rand_key columns and the indexes
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(fics)")}
+        for column in MOOD_COLUMNS + ("rand_key",):
+            if column not in columns:
+                self._conn.execute(
+                    f"ALTER TABLE fics ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+                )
+        with open(SCHEMA_PATH, encoding="utf-8") as f:
+            self._conn.executescript(f.read())
+        if count_facets:
+            self._conn.executescript("\n".join(FIC_FACETS_REBUILD_SQL))
+
+        if resume:
+            self.started_at = resume["started_at"]
+            self.rows = resume["rows"]
+        else:
+            self.started_at = self._conn.execute("SELECT CURRENT_TIMESTAMP").fetchone()[0]
+            self.rows = 0
+        print(f"⚙️ Writing SQLite database: {output_path}...")
+
+    def _has_table(self, name: str) -> bool:
+        return bool(
+            self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+            ).fetchone()
+        )
+
+    def state(self) -> dict:
+        return {"started_at": self.started_at, "rows": self.rows}
+
+    def write_page(self, fics: list[FicData]) -> None:
+        rows = []
+        fts_rows = []
+        tags = {}
+        fic_tags = []
+        facets = Counter()
+        for fic in fics:
+            row = fic_to_row(fic)
+            rows.append(tuple(row[c] for c in FIC_COLUMNS))
+            fts_rows.append(fts_values(row))
+            tag_rows = fic_tag_rows(fic)
+            for tid, name, kind in tag_rows:
+                tags[tid] = (tid, name, kind)
+                fic_tags.append((fic.id, tid))
+            facets.update(facet_values(row, tag_rows))
+        with self._conn:
+            self._conn.execute(
+                facet_removal_sql(",".join("?" for _ in fics)), [fic.id for fic in fics]
+            )
+            self._conn.executemany(SQLITE_UPSERT_SQL, rows)
+            self._conn.executemany(SQLITE_FTS_SQL, fts_rows)
+            self._conn.executemany(SQLITE_TAG_SQL, tags.values())
+            self._conn.executemany(
+                "DELETE FROM fic_tags WHERE fic_id = ?", [(fic.id,) for fic in fics]
+            )
+            self._conn.executemany(SQLITE_FIC_TAG_SQL, fic_tags)
+            self._conn.executemany(
+                SQLITE_FACET_SQL, [(f, v, n) for (f, v), n in facets.items()]
+            )
+        self.rows += len(rows)
+
+    def refresh_stats(self, fics: list[FicData]) -> None:
+        """Update only STATS_REFRESH_COLUMNS of fics whose details are current."""
+        rows = []
+        for fic in fics:
+            row = fic_to_row(fic)
+            values = tuple(row[c] for c in STATS_REFRESH_COLUMNS)
+            rows.append(values + (row["id"],) + values)
+        with self._conn:
+            self._conn.executemany(SQLITE_REFRESH_SQL, rows)
+        self.rows += len(rows)
+
+    def abort(self) -> None:
+        """Close the database of a failed run; its pages are already committed."""
+        self._conn.close()
+
+    def close(self) -> list[str]:
+        with pipeline_metrics.stage("finish_load"), self._conn:
+            for statement in finish_load_sql():
+                self._conn.execute(statement)
+        self._conn.close()
+        print(f"\n📁 Results saved to: {self.output_path} ({self.rows} rows written)")
+        paths = [self.output_path]
+        if self.export_path:
+            paths += export_sqlite_dump(
+                self.output_path,
+                self.export_path,
+                self.options,
+                since=None if self.export_all else self.started_at,
+            )
+        if self.shards_dir:
+            paths += export_json_shards(
+                self.output_path, self.shards_dir, max_pages=self.shard_pages
+            )
+        return paths
+
+
+def export_sqlite_dump(
+    db_path: str,
+    output_path: str,
+    options: Optional[SqlOutputOptions] = None,
+    since: Optional[str] = None,
+) -> list[str]:
+    """Dump fics from a local SQLite database as compact D1-importable SQL.
+
+    Rows become batched multi-row upserts, split across files like the sql
+    format, each batch followed by the fics_fts and tags/fic_tags rows of
+    its fics and bracketed by its fic_facets updates. A non-empty dump
+    starts with prepare_load_sql() and ends with finish_load_sql().
+    Values are written exactly as stored (no newline escaping).
+
+    Args:
+        since: Only export rows with updated_at at or after this timestamp
+
+    Returns:
+        Paths of the written SQL files, in import order
+    """
+    conn = sqlite3.connect(db_path)
+    # Rows keep the rand_key drawn when they were written locally
+    columns = FIC_COLUMNS + ("rand_key",)
+    query = f"SELECT {','.join(columns)} FROM fics"
+    params = ()
+    if since:
+        query += " WHERE updated_at >= ?"
+        params = (since,)
+
+    writer = SqlWriter(
+        output_path,
+        options,
+        header=(
+            f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"-- Mode: Export from {os.path.basename(db_path)}"
+            f"{f' (updated since {since})' if since else ''}\n"
+        ),
+    )
+    written_tags = set()
+
+    def write_batch(rows: list[dict]) -> None:
+        if not writer.rows:
+            for statement in prepare_load_sql():
+                writer.statement(statement)
+        fic_ids = [row["id"] for row in rows]
+        write_facet_removal_sql(writer, fic_ids, sqlite_literal)
+        for row in rows:
+            writer.insert(
+                f"INSERT INTO fics ({FIC_INSERT_COLUMNS}) VALUES",
+                f"({','.join(sqlite_literal(row[c]) for c in columns)},"
+                "CURRENT_TIMESTAMP,CURRENT_TIMESTAMP)",
+                FIC_UPSERT_SUFFIX,
+            )
+
+        write_fts_sql(writer, rows, sqlite_literal)
+        fic_tags = {fic_id: [] for fic_id in fic_ids}
+        tag_rows = conn.execute(
+            "SELECT fic_tags.fic_id, tags.id, tags.name, tags.kind FROM fic_tags "
+            "JOIN tags ON tags.id = fic_tags.tag_id "
+            f"WHERE fic_tags.fic_id IN ({','.join('?' for _ in fic_ids)})",
+            fic_ids,
+        )
+        for fic_id, tid, name, kind in tag_rows:
+            fic_tags[fic_id].append((tid, name, kind))
+        write_tag_index_sql(writer, fic_tags, written_tags)
+
+        facets = Counter()
+        for row in rows:
+            facets.update(facet_values(row, fic_tags[row["id"]]))
+        write_facet_sql(writer, facets, sqlite_literal)
+
+    try:
+        batch = []
+        for row in conn.execute(query + " ORDER BY id", params):
+            batch.append(dict(zip(columns, row)))
+            if len(batch) >= TAG_INDEX_BATCH:
+                write_batch(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+        if writer.rows:
+            for statement in finish_load_sql():
+                writer.statement(statement)
+    finally:
+        conn.close()
+        paths = writer.close()
+
+    print(f"✅ SQL export generated: {', '.join(paths)} ({writer.rows} rows)")
+    return paths
+
+
+@timed_stage("generate_sql_file")
+def generate_sql_file(
+    fics: list[FicData],
+    output_path: str,
+    snapshot: Optional[DeltaSnapshot] = None,
+    options: Optional[SqlOutputOptions] = None,
+) -> list[str]:
+    """Generate INSERT SQL for Cloudflare D1
+
+    Returns:
+        Paths of the written SQL files, in import order
+    """
+    sink = SqlSink(output_path, snapshot, options)
+    sink.write_page(fics)
+    return sink.close()
+
+
+def open_sink(
+    output_format: str, output: str, sink_state: Optional[dict] = None, **kwargs
+):
+    """Create the streaming sink for an output format.
+
+    With sink_state (from a checkpoint) the sink reopens its files at the
+    recorded position instead of starting over.
+    """
+    if output_format == "sql":
+        return SqlSink(
+            output,
+            kwargs.get("snapshot"),
+            kwargs.get("sql_options"),
+            resume=sink_state,
+            rebuild_tag_index=kwargs.get("rebuild_tag_index", False),
+        )
+    if output_format == "sqlite":
+        return SqliteSink(
+            output,
+            schema_path=kwargs.get("sqlite_schema"),
+            export_path=kwargs.get("sqlite_export"),
+            export_all=kwargs.get("sqlite_export_all", False),
+            options=kwargs.get("sql_options"),
+            resume=sink_state,
+            shards_dir=kwargs.get("shards_dir"),
+            shard_pages=kwargs.get("shard_pages"),
+        )
+    if output_format == "jsonl":
+        return JsonlSink(output, resume=sink_state)
+    if output_format == "parquet":
+        return ParquetSink(output, resume=sink_state)
+    return JsonSink(output, resume=sink_state)
+
+
+# ============== Columnar Snapshots ==============
+
+SNAPSHOT_TABLE = "caitvi.fics"
+
+# Rows per Parquet row group, and roughly per data file, of a snapshot
+SNAPSHOT_ROW_GROUP_ROWS = 65_536
+SNAPSHOT_FILE_ROWS = 1_048_576
+
+# Low-cardinality columns written with Parquet dictionary encoding
+SNAPSHOT_DICTIONARY_COLUMNS = ("author", "rating", "category", "status", "tags.list.element")
+
+SNAPSHOT_INT_COLUMNS = (
+    "words",
+    "chapters",
+    "kudos",
+    "hits",
+    "comments",
+    "bookmarks",
+    "base_spice",
+    "base_angst",
+    "base_fluff",
+    "base_plot",
+    "base_romance",
+)
+
+
+def fic_to_snapshot_row(fic: FicData, run_at: datetime) -> dict:
+    """Flatten a FicData into snapshot columns; tags stay a list."""
+    row = fic_to_row(fic)
+    del row["tags_json"]
+    row["is_translated"] = fic.is_translated
+    for column in MOOD_COLUMNS:
+        row[column] = bool(row[column])
+    row["tags"] = fic.tags
+    row["run_at"] = run_at
+    return row
+
+
+class ParquetSink:
+    """Columnar sink appending every run to an Iceberg table of fic snapshots.
+
+    output is the warehouse directory; its SQLite catalog (catalog.db) and
+    the caitvi.fics table are created on first use. Rows have FicStats and
+    FicState flattened into columns and tags dictionary-encoded. Each page is
+    staged as its own Parquet part (so checkpoints stay exact); on close the
+    parts are compacted into zstd data files with large row groups and added
+    to the table in one commit, so each run is one Iceberg snapshot whose
+    rows share the run's run_at.
+    """
+
+    def __init__(self, output_path: str, resume: Optional[dict] = None):
+        # Only this format needs pyarrow/pyiceberg, and importing them is slow
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from pyiceberg.catalog.sql import SqlCatalog
+
+        self._pa = pa
+        self._pq = pq
+        self.output_path = output_path
+        self._staging_dir = os.path.join(output_path, "staging")
+        os.makedirs(self._staging_dir, exist_ok=True)
+        warehouse = os.path.abspath(output_path)
+        self._catalog = SqlCatalog(
+            "caitvi",
+            uri=f"sqlite:///{os.path.join(warehouse, 'catalog.db')}",
+            warehouse=f"file://{warehouse}",
+        )
+        self._catalog.create_namespace_if_not_exists(SNAPSHOT_TABLE.split(".")[0])
+        self.schema = self.arrow_schema()
+        self._table = self._catalog.create_table_if_not_exists(
+            SNAPSHOT_TABLE, schema=self.schema
+        )
+
+        if resume:
+            self.run_at = datetime.fromisoformat(resume["run_at"])
+            self.parts = resume["parts"]
+            self.rows = resume["rows"]
+        else:
+            self.run_at = datetime.now().astimezone().replace(microsecond=0)
+            self.parts = []
+            self.rows = 0
+        # Drop parts of an interrupted run, or written after the checkpoint
+        for name in os.listdir(self._staging_dir):
+            if name not in self.parts:
+                os.remove(os.path.join(self._staging_dir, name))
+        print(f"⚙️ Writing Iceberg snapshot: {output_path} ({SNAPSHOT_TABLE})...")
+
+    def arrow_schema(self):
+        """Arrow schema of the snapshot table, in FIC_COLUMNS order."""
+        pa = self._pa
+        fields = []
+        for column in FIC_COLUMNS:
+            if column == "tags_json":
+                fields.append(pa.field("tags", pa.list_(pa.string())))
+            elif column == "is_translated" or column in MOOD_COLUMNS:
+                fields.append(pa.field(column, pa.bool_()))
+            elif column in SNAPSHOT_INT_COLUMNS:
+                fields.append(pa.field(column, pa.int32()))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        fields.append(pa.field("run_at", pa.timestamp("us", tz="UTC")))
+        return pa.schema(fields)
+
+    def state(self) -> dict:
+        return {"run_at": self.run_at.isoformat(), "parts": self.parts, "rows": self.rows}
+
+    def write_page(self, fics: list[FicData]) -> None:
+        if not fics:
+            return
+        table = self._pa.Table.from_pylist(
+            [fic_to_snapshot_row(fic, self.run_at) for fic in fics], schema=self.schema
+        )
+        name = f"part-{len(self.parts):06d}.parquet"
+        # Staged parts are rewritten on close, so skip compressing them
+        self._pq.write_table(
+            table, os.path.join(self._staging_dir, name), compression="none"
+        )
+        self.parts.append(name)
+        self.rows += len(fics)
+
+    def _compact(self) -> list[str]:
+        """Rewrite the staged parts into the table's data directory.
+
+        Returns:
+            Paths of the written data files
+        """
+        data_dir = os.path.join(self._table.location().removeprefix("file://"), "data")
+        os.makedirs(data_dir, exist_ok=True)
+        # Random suffix: two runs in the same second must not share file names
+        prefix = os.path.join(
+            data_dir, f"run-{self.run_at.strftime('%Y%m%dT%H%M%S')}-{os.urandom(4).hex()}"
+        )
+
+        paths = []
+        writer = None
+        buffered = []
+        buffered_rows = 0
+        file_rows = 0
+
+        def write_group() -> None:
+            nonlocal writer, file_rows
+            if writer is None:
+                paths.append(f"{prefix}-{len(paths):05d}.parquet")
+                writer = self._pq.ParquetWriter(
+                    paths[-1],
+                    self.schema,
+                    compression="zstd",
+                    use_dictionary=list(SNAPSHOT_DICTIONARY_COLUMNS),
+                )
+            writer.write_table(
+                self._pa.concat_tables(buffered), row_group_size=SNAPSHOT_ROW_GROUP_ROWS
+            )
+            file_rows += buffered_rows
+            if file_rows >= SNAPSHOT_FILE_ROWS:
+                writer.close()
+                writer = None
+                file_rows = 0
+
+        try:
+            for name in self.parts:
+                part = self._pq.read_table(
+                    os.path.join(self._staging_dir, name), schema=self.schema
+                )
+                buffered.append(part)
+                buffered_rows += part.num_rows
+                if buffered_rows >= SNAPSHOT_ROW_GROUP_ROWS:
+                    write_group()
+                    buffered, buffered_rows = [], 0
+            if buffered:
+                write_group()
+        finally:
+            if writer is not None:
+                writer.close()
+        return paths
+
+    def abort(self) -> None:
+        """Keep the staged parts of a failed run for --resume; nothing is committed."""
+        if self.parts:
+            print(f"⚠️ {len(self.parts)} staged parts kept in {self._staging_dir}")
+
+    def close(self) -> list[str]:
+        if self.parts:
+            with pipeline_metrics.stage("compact_snapshot", self.rows):
+                paths = self._compact()
+            self._table.add_files(
+                [f"file://{path}" for path in paths],
+                snapshot_properties={"run_at": self.run_at.isoformat()},
+            )
+            for name in self.parts:
+                os.remove(os.path.join(self._staging_dir, name))
+            print(
+                f"\n📁 Results saved to: {self.output_path} ({self.rows} rows in "
+                f"{len(paths)} files, snapshot {self._table.current_snapshot().snapshot_id})"
+            )
+        return [self.output_path]
@@ -0,0 +1,723 @@
+"""SQL for Cloudflare D1: fics rows, delta snapshots, statement batching and derived tables."""
+
+import os
+import functools
+import hashlib
+import json
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from .models import MOOD_THRESHOLD, MOODS, FicData
+
+
+# ============== SQL Output ==============
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schema.sql"
+)
+
+
+# fics columns written by the pipeline, in table order
+FIC_COLUMNS = (
+    "id",
+    "title",
+    "author",
+    "link",
+    "summary",
+    "rating",
+    "category",
+    "status",
+    "is_translated",
+    "words",
+    "chapters",
+    "kudos",
+    "hits",
+    "comments",
+    "bookmarks",
+    "tags_json",
+    "quote",
+    "base_spice",
+    "base_angst",
+    "base_fluff",
+    "base_plot",
+    "base_romance",
+    "mood_fluff",
+    "mood_angst",
+    "mood_spicy",
+)
+
+MOOD_COLUMNS = tuple(f"mood_{mood}" for mood in MOODS)
+
+# Columns a search listing can refresh without a detail fetch
+STATS_REFRESH_COLUMNS = ("kudos", "hits", "comments", "bookmarks")
+
+
+def fic_to_row(fic: FicData) -> dict:
+    """Flatten a FicData into fics column values."""
+    return {
+        "id": fic.id,
+        "title": fic.title,
+        "author": fic.author,
+        "link": fic.link,
+        "summary": fic.summary,
+        "rating": fic.rating,
+        "category": fic.category,
+        "status": fic.status,
+        "is_translated": 1 if fic.is_translated else 0,
+        "words": fic.stats.words,
+        "chapters": fic.stats.chapters,
+        "kudos": fic.stats.kudos,
+        "hits": fic.stats.hits,
+        "comments": fic.stats.comments,
+        "bookmarks": fic.stats.bookmarks,
+        "tags_json": json.dumps(fic.tags, ensure_ascii=False),
+        "quote": fic.quote,
+        "base_spice": fic.state.spice,
+        "base_angst": fic.state.angst,
+        "base_fluff": fic.state.fluff,
+        "base_plot": fic.state.plot,
+        "base_romance": fic.state.romance,
+        "mood_fluff": 1 if fic.state.mood_fluff else 0,
+        "mood_angst": 1 if fic.state.mood_angst else 0,
+        "mood_spicy": 1 if fic.state.mood_spicy else 0,
+    }
+
+
+def mood_columns(scores: dict) -> dict:
+    """mood_* column values for a row's base_* scores."""
+    return {
+        f"mood_{mood}": 1 if scores[f"base_{metric}"] >= MOOD_THRESHOLD else 0
+        for mood, metric in MOODS.items()
+    }
+
+
+# rand_key is uniform in [0, RAND_KEY_RANGE), so a random pick is one index
+# seek from a random start key. Every fics row a run writes gets a fresh key;
+# unwritten rows keep theirs, so a delta stays as small as its changes
+RAND_KEY_RANGE = 2**31
+RAND_KEY_SQL = f"abs(random() % {RAND_KEY_RANGE})"
+
+# Covering indexes for the /api/fics listing. Each sort's index leads with its
+# (column, id) keyset cursor and carries the filter columns, so a filtered
+# page is one index range scan; the last one serves filter-only counts
+LISTING_INDEXES = {
+    "fics_created_at_id_idx": ("created_at", "id", "rating", "status", "words"),
+    "fics_kudos_id_idx": ("kudos", "id", "rating", "status", "words"),
+    "fics_words_id_idx": ("words", "id", "rating", "status"),
+    "fics_rating_status_words_idx": ("rating", "status", "words"),
+}
+
+# Word count filter buckets (WORD_COUNT_RANGES in src/types/filters.ts), as
+# (name, exclusive upper bound)
+WORD_BUCKETS = (
+    ("short", 5000),
+    ("medium", 20000),
+    ("long", 50000),
+    ("epic", 100000),
+    ("legendary", None),
+)
+
+
+def word_bucket_sql(column: str = "words") -> str:
+    """CASE expression mapping a word count column to its WORD_BUCKETS name."""
+    cases = " ".join(
+        f"WHEN ifnull({column},0) < {upper} THEN '{name}'"
+        for name, upper in WORD_BUCKETS
+        if upper is not None
+    )
+    return f"CASE {cases} ELSE '{WORD_BUCKETS[-1][0]}' END"
+
+
+FIC_COUNTS_DDL = (
+    "CREATE TABLE IF NOT EXISTS fic_counts ("
+    "rating TEXT NOT NULL,status TEXT NOT NULL,word_bucket TEXT NOT NULL,"
+    "count INTEGER NOT NULL,PRIMARY KEY (rating,status,word_bucket));"
+)
+
+# Listing totals per filter combination; missing rating/status become ''
+FIC_COUNTS_SQL = (
+    "DELETE FROM fic_counts;",
+    "INSERT INTO fic_counts (rating,status,word_bucket,count) "
+    f"SELECT ifnull(rating,''),ifnull(status,''),{word_bucket_sql()},count(*) "
+    "FROM fics GROUP BY 1,2,3;",
+)
+
+
+def prepare_load_sql() -> list[str]:
+    """Statements that start every load into fics that writes rows.
+
+    Creates the derived tables the load keeps current, if the database does
+    not have them yet, and fills them from the fics rows already there.
+    """
+    return list(FTS_SETUP_SQL) + list(FIC_FACETS_SETUP_SQL)
+
+
+def finish_load_sql() -> list[str]:
+    """Statements that end every load into fics.
+
+    Creates the listing indexes (a no-op once they exist, and cheaper after
+    a bulk load than during it), rebuilds the fic_counts listing totals and
+    drops fic_facets rows counted down to 0. Loads that wrote nothing skip
+    them, so an empty delta stays empty.
+    """
+    statements = [
+        f"CREATE INDEX IF NOT EXISTS {name} ON fics ({','.join(columns)});"
+        for name, columns in LISTING_INDEXES.items()
+    ]
+    statements.append(FIC_COUNTS_DDL)
+    statements += FIC_COUNTS_SQL
+    statements.append("DELETE FROM fic_facets WHERE count <= 0;")
+    return statements
+
+
+def escape_sql(text: str) -> str:
+    """Escape special characters for SQL insertion."""
+    if not text:
+        return ""
+    return text.replace("'", "''").replace("\n", "\\n").replace("\r", "")
+
+
+def sql_literal(value) -> str:
+    """Render a Python value as a SQL literal."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return f"'{escape_sql(str(value))}'"
+
+
+# ============== Delta Snapshots ==============
+
+
+def column_digest(value) -> str:
+    """Short, stable digest of a single column value."""
+    encoded = json.dumps(value, ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class DeltaSnapshot:
+    """Per-fic content hashes from a previous run, used to emit only changes.
+
+    Each fic keeps a hash over all of its content columns plus one digest per
+    column, so changed rows can be written as narrow UPDATEs.
+    """
+
+    VERSION = 1
+
+    def __init__(self, fics: Optional[dict] = None):
+        self.fics: dict[str, dict] = fics or {}
+        self.touched: set[str] = set()
+
+    def run_entries(self) -> dict:
+        """Entries recorded during this run (persisted in checkpoints)."""
+        return {fic_id: self.fics[fic_id] for fic_id in self.touched}
+
+    def apply(self, entries: dict) -> None:
+        """Restore entries recorded by an interrupted run."""
+        self.fics.update(entries)
+        self.touched.update(entries)
+
+    @classmethod
+    def load(cls, path: str) -> "DeltaSnapshot":
+        if not os.path.exists(path):
+            print(f"⚠️ Snapshot {path} not found, treating every fic as new")
+            return cls()
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        columns = data.get("columns", [])
+        fics = {}
+        for fic_id, entry in data.get("fics", {}).items():
+            fics[fic_id] = {
+                "hash": entry["hash"],
+                "columns": dict(zip(columns, entry["columns"])),
+            }
+        print(f"📸 Loaded snapshot with {len(fics)} fics from {path}")
+        return cls(fics)
+
+    def save(self, path: str) -> None:
+        """Write the snapshot atomically."""
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        data = {
+            "version": self.VERSION,
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "columns": list(FIC_COLUMNS),
+            "fics": {
+                fic_id: {
+                    "hash": entry["hash"],
+                    "columns": [entry["columns"].get(c, "") for c in FIC_COLUMNS],
+                }
+                for fic_id, entry in self.fics.items()
+            },
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        print(f"📸 Snapshot saved: {path} ({len(self.fics)} fics)")
+
+    def update_columns(self, fic_id: str, values: dict) -> Optional[list[str]]:
+        """Re-hash a known fic after some of its columns changed out of band.
+
+        Returns the columns whose values differ from the snapshot, or None
+        for a fic that is not in the snapshot.
+        """
+        entry = self.fics.get(fic_id)
+        if entry is None:
+            return None
+        changed = []
+        for column, value in values.items():
+            digest = column_digest(value)
+            if entry["columns"].get(column) != digest:
+                changed.append(column)
+            entry["columns"][column] = digest
+        entry["hash"] = hashlib.blake2b(
+            "".join(entry["columns"].get(c, "") for c in FIC_COLUMNS).encode("ascii"),
+            digest_size=16,
+        ).hexdigest()
+        self.touched.add(fic_id)
+        return changed
+
+    def diff(self, row: dict) -> Optional[list[str]]:
+        """Record row and return the columns that changed.
+
+        Returns None for a fic that is not in the snapshot, and an empty list
+        when nothing changed. A None quote was not fetched, so the snapshot's
+        quote is kept and never reported as changed.
+        """
+        previous = self.fics.get(row["id"])
+        digests = {c: column_digest(row[c]) for c in FIC_COLUMNS}
+        if row["quote"] is None and previous is not None:
+            digests["quote"] = previous["columns"].get("quote", digests["quote"])
+        content_hash = hashlib.blake2b(
+            "".join(digests[c] for c in FIC_COLUMNS).encode("ascii"), digest_size=16
+        ).hexdigest()
+
+        self.fics[row["id"]] = {"hash": content_hash, "columns": digests}
+        self.touched.add(row["id"])
+
+        if previous is None:
+            return None
+        if previous["hash"] == content_hash:
+            return []
+        return [c for c in FIC_COLUMNS if previous["columns"].get(c) != digests[c]]
+
+
+@dataclass
+class SqlOutputOptions:
+    """How SQL output is batched and split across files."""
+
+    batch_size: int = 100
+    max_file_rows: Optional[int] = None
+    max_file_bytes: Optional[int] = None
+    transactions: bool = False
+
+
+# D1 rejects statements longer than 100 KB; leave headroom for the prefix
+MAX_STATEMENT_BYTES = 90_000
+
+
+class SqlWriter:
+    """Compact SQL writer that batches rows into multi-row statements.
+
+    Rows are grouped into chunks of `batch_size`. Consecutive rows sharing an
+    INSERT prefix become one multi-row VALUES statement, capped at
+    MAX_STATEMENT_BYTES. With a row or byte cap, chunks are spread over
+    numbered files (import.001.sql, import.002.sql, ...) that are imported in
+    order. Explicit transactions are opt-in because D1 rejects BEGIN/COMMIT in
+    imported files.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        options: Optional[SqlOutputOptions] = None,
+        header: str = "",
+        resume: Optional[dict] = None,
+    ):
+        self.output_path = output_path
+        self.options = options or SqlOutputOptions()
+        self.header = header
+        self.paths: list[str] = []
+        self.rows = 0
+
+        self._split = bool(self.options.max_file_rows or self.options.max_file_bytes)
+        self._file = None
+        self._file_rows = 0
+        self._file_bytes = 0
+
+        self._chunk: list[str] = []
+        self._chunk_rows = 0
+        self._insert_key: Optional[tuple[str, str]] = None
+        self._insert_values: list[str] = []
+        self._insert_bytes = 0
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        if resume and resume["paths"]:
+            # Reopen the last file and drop anything written after the checkpoint
+            self.paths = list(resume["paths"])
+            self.rows = resume["rows"]
+            self._file = open(self.paths[-1], "r+", encoding="utf-8")
+            self._file.truncate(resume["offset"])
+            self._file.seek(resume["offset"])
+            self._file_rows = resume["file_rows"]
+            self._file_bytes = resume["file_bytes"]
+            for stale in self._numbered_paths()[len(self.paths) :]:
+                os.remove(stale)
+        else:
+            # Numbered parts left over from an earlier run would be imported too
+            for stale in self._numbered_paths():
+                os.remove(stale)
+
+    def state(self) -> dict:
+        """Resumable position of the writer; call after flush()."""
+        return {
+            "paths": list(self.paths),
+            "rows": self.rows,
+            "offset": self._file.tell() if self._file else 0,
+            "file_rows": self._file_rows,
+            "file_bytes": self._file_bytes,
+        }
+
+    def _numbered_paths(self) -> list[str]:
+        if not self._split:
+            return []
+        base, ext = os.path.splitext(self.output_path)
+        paths = []
+        while os.path.exists(f"{base}.{len(paths) + 1:03d}{ext or '.sql'}"):
+            paths.append(f"{base}.{len(paths) + 1:03d}{ext or '.sql'}")
+        return paths
+
+    def insert(self, prefix: str, values: str, suffix: str = "") -> None:
+        """Queue one VALUES tuple for the INSERT statement starting with prefix."""
+        key = (prefix, suffix)
+        size = len(values.encode("utf-8")) + 2
+        if self._insert_key != key or (
+            self._insert_values
+            and self._insert_bytes + size + len(prefix) + len(suffix)
+            > MAX_STATEMENT_BYTES
+        ):
+            self._end_insert()
+        self._insert_key = key
+        self._insert_values.append(values)
+        self._insert_bytes += size
+        self._add_row()
+
+    def statement(self, sql: str) -> None:
+        """Queue a standalone statement (counts as one row)."""
+        self._end_insert()
+        self._chunk.append(sql)
+        self._add_row()
+
+    def flush(self) -> None:
+        """Write the pending chunk to the current output file."""
+        self._end_insert()
+        if not self._chunk:
+            return
+
+        text = "\n".join(self._chunk) + "\n"
+        if self.options.transactions:
+            text = f"BEGIN TRANSACTION;\n{text}COMMIT;\n"
+        size = len(text.encode("utf-8"))
+
+        if self._file is None or self._should_rotate(self._chunk_rows, size):
+            self._open_next()
+
+        self._file.write(text)
+        self._file.flush()
+        self._file_rows += self._chunk_rows
+        self._file_bytes += size
+        self._chunk = []
+        self._chunk_rows = 0
+
+    def close(self) -> list[str]:
+        """Flush everything and return the written file paths in import order."""
+        self.flush()
+        if self._file is None:
+            self._open_next()
+        self._file.close()
+        return self.paths
+
+    def _add_row(self) -> None:
+        self.rows += 1
+        self._chunk_rows += 1
+        if self._chunk_rows >= self.options.batch_size:
+            self.flush()
+
+    def _end_insert(self) -> None:
+        if not self._insert_values:
+            return
+        prefix, suffix = self._insert_key
+        sql = prefix + "\n" + ",\n".join(self._insert_values)
+        if suffix:
+            sql += "\n" + suffix
+        self._chunk.append(sql + ";")
+        self._insert_key = None
+        self._insert_values = []
+        self._insert_bytes = 0
+
+    def _should_rotate(self, rows: int, size: int) -> bool:
+        if not self._split or self._file_rows == 0:
+            return False
+        max_rows = self.options.max_file_rows
+        max_bytes = self.options.max_file_bytes
+        return bool(
+            (max_rows and self._file_rows + rows > max_rows)
+            or (max_bytes and self._file_bytes + size > max_bytes)
+        )
+
+    def _open_next(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+        if self._split:
+            base, ext = os.path.splitext(self.output_path)
+            path = f"{base}.{len(self.paths) + 1:03d}{ext or '.sql'}"
+        else:
+            path = self.output_path
+
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(self.header)
+        if self._split:
+            self._file.write(f"-- Part: {len(self.paths) + 1}\n")
+        self._file.write("\n")
+        self._file_rows = 0
+        self._file_bytes = 0
+        self.paths.append(path)
+
+
+def row_values_sql(row: dict, columns=FIC_COLUMNS) -> str:
+    """Render row values as a compact VALUES tuple (without timestamps)."""
+    return ",".join(sql_literal(row[c]) for c in columns)
+
+
+FIC_INSERT_COLUMNS = ",".join(FIC_COLUMNS) + ",rand_key,created_at,updated_at"
+# Value each column takes on conflict. A NULL quote was not fetched (see
+# FicData.quote), so the stored one is kept
+FIC_UPSERT_VALUES = {
+    c: "ifnull(excluded.quote,fics.quote)" if c == "quote" else f"excluded.{c}"
+    for c in FIC_COLUMNS[1:]
+}
+FIC_UPSERT_SUFFIX = (
+    "ON CONFLICT(id) DO UPDATE SET "
+    + ",".join(f"{c}={v}" for c, v in FIC_UPSERT_VALUES.items())
+    + ",rand_key=excluded.rand_key,updated_at=CURRENT_TIMESTAMP"
+)
+# Columns every UPDATE of a fics row sets after its changed columns
+FIC_UPDATE_SUFFIX = f"rand_key={RAND_KEY_SQL},updated_at=CURRENT_TIMESTAMP"
+
+
+# ============== Tag Index ==============
+
+TAG_INSERT_PREFIX = "INSERT OR IGNORE INTO tags (id,name,kind) VALUES"
+FIC_TAG_INSERT_PREFIX = "INSERT OR IGNORE INTO fic_tags (fic_id,tag_id) VALUES"
+
+# Fics per DELETE of stale fic_tags rows
+TAG_INDEX_BATCH = 500
+
+
+@functools.lru_cache(maxsize=65536)
+def tag_id(name: str) -> int:
+    """Stable id of a tag name.
+
+    Derived from the name alone, so every run, sink and database agree on it
+    without a lookup. 52 bits keep it exact as a JavaScript number.
+    """
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 12
+
+
+def fic_tag_rows(fic: FicData) -> list[tuple[int, str, str]]:
+    """(tag id, name, kind) of each distinct tag of a fic."""
+    kinds = fic.tag_kinds if len(fic.tag_kinds) == len(fic.tags) else []
+    rows = {}
+    for i, name in enumerate(fic.tags):
+        rows.setdefault(tag_id(name), (name, kinds[i] if kinds else "freeform"))
+    return [(tid, name, kind) for tid, (name, kind) in rows.items()]
+
+
+def write_tag_index_sql(
+    writer: "SqlWriter", fic_tags: dict[str, list[tuple]], written: set[int]
+) -> None:
+    """Queue statements replacing the fic_tags rows of some fics.
+
+    Args:
+        fic_tags: {fic id: fic_tag_rows(...)}
+        written: Tag ids already inserted by this writer; updated in place
+    """
+    if not fic_tags:
+        return
+    for rows in fic_tags.values():
+        for tid, name, kind in rows:
+            if tid not in written:
+                writer.insert(TAG_INSERT_PREFIX, f"({tid},{sql_literal(name)},{sql_literal(kind)})")
+                written.add(tid)
+
+    fic_ids = list(fic_tags)
+    for start in range(0, len(fic_ids), TAG_INDEX_BATCH):
+        batch = fic_ids[start : start + TAG_INDEX_BATCH]
+        writer.statement(
+            f"DELETE FROM fic_tags WHERE fic_id IN ({','.join(sql_literal(f) for f in batch)});"
+        )
+    for fic_id, rows in fic_tags.items():
+        for tid, _, _ in rows:
+            writer.insert(FIC_TAG_INSERT_PREFIX, f"({sql_literal(fic_id)},{tid})")
+
+
+# ============== Full-Text Index ==============
+
+# fics_fts columns and the fics columns they are built from
+FTS_COLUMNS = ("title", "author", "summary", "tags")
+FTS_SOURCE_COLUMNS = ("title", "author", "summary", "tags_json")
+
+# rowid is the numeric AO3 work id, so rows are replaced without a lookup
+FTS_INSERT_PREFIX = f"INSERT OR REPLACE INTO fics_fts (rowid,{','.join(FTS_COLUMNS)}) VALUES"
+
+# As in schema.sql and drizzle/0002_fics_fts.sql. A database without the
+# index gets it built from its fics rows before a load writes to it
+FTS_SETUP_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS fics_fts USING fts5({','.join(FTS_COLUMNS)},"
+    "tokenize = 'porter unicode61 remove_diacritics 2',prefix = '2 3');",
+    f"INSERT INTO fics_fts (rowid,{','.join(FTS_COLUMNS)}) "
+    "SELECT CAST(id AS INTEGER),title,author,summary,"
+    "(SELECT group_concat(value,'; ') FROM json_each(fics.tags_json)) FROM fics "
+    "WHERE NOT EXISTS (SELECT 1 FROM fics_fts);",
+)
+
+
+def fts_tags_text(tags: list[str]) -> str:
+    """Flatten tags into one searchable text column."""
+    return "; ".join(tags)
+
+
+def fts_values(row: dict) -> tuple:
+    """fics_fts rowid and column values for a fics row."""
+    tags = json.loads(row["tags_json"]) if row["tags_json"] else []
+    return (
+        int(row["id"]),
+        row["title"],
+        row["author"],
+        row["summary"],
+        fts_tags_text(tags if isinstance(tags, list) else []),
+    )
+
+
+def write_fts_sql(writer: "SqlWriter", rows: list[dict], literal=sql_literal) -> None:
+    """Queue fics_fts rows replacing the indexed text of some fics rows.
+
+    Args:
+        literal: Renders values, matching how the fics rows were written
+    """
+    for row in rows:
+        writer.insert(FTS_INSERT_PREFIX, f"({','.join(literal(v) for v in fts_values(row))})")
+
+
+# ============== Facet Counts ==============
+
+# fic_facets holds (facet, value, count) for the filter UI: 'rating', 'status'
+# and 'words' (WORD_BUCKETS) per fic, plus one row per tag under its kind.
+# Loads keep it current incrementally: the facets of fics about to be
+# rewritten are subtracted as stored, then re-added from the new rows
+FACET_SOURCE_COLUMNS = ("rating", "status", "words", "tags_json")
+
+FACET_INSERT_PREFIX = "INSERT INTO fic_facets (facet,value,count) VALUES"
+FACET_UPSERT_SUFFIX = "ON CONFLICT (facet,value) DO UPDATE SET count = count + excluded.count"
+
+
+def word_bucket(words: Optional[int]) -> str:
+    """WORD_BUCKETS name of a word count (see word_bucket_sql)."""
+    for name, upper in WORD_BUCKETS:
+        if upper is None or (words or 0) < upper:
+            return name
+    return WORD_BUCKETS[-1][0]
+
+
+def facet_values(row: dict, tag_rows: list[tuple[int, str, str]]) -> list[tuple[str, str]]:
+    """(facet, value) pairs of a fics row and its fic_tag_rows(...)."""
+    return [
+        ("rating", row["rating"] or ""),
+        ("status", row["status"] or ""),
+        ("words", word_bucket(row["words"])),
+    ] + [(kind, name) for _, name, kind in tag_rows]
+
+
+def facet_select_sql(source: str, sign: str = "") -> str:
+    """SELECT of (facet, value, count) over the fics rows of a table or CTE.
+
+    Mirrors facet_values, with tags read back from fic_tags/tags.
+    """
+    return (
+        f"SELECT facet,value,{sign}count(*) FROM ("
+        f"SELECT 'rating' AS facet,ifnull(rating,'') AS value FROM {source} "
+        f"UNION ALL SELECT 'status',ifnull(status,'') FROM {source} "
+        f"UNION ALL SELECT 'words',{word_bucket_sql()} FROM {source} "
+        "UNION ALL SELECT tags.kind,tags.name FROM fic_tags "
+        "JOIN tags ON tags.id = fic_tags.tag_id "
+        f"WHERE fic_tags.fic_id IN (SELECT id FROM {source})"
+        # WHERE true keeps ON CONFLICT from parsing as a join constraint
+        ") WHERE true GROUP BY facet,value"
+    )
+
+
+# Recount every facet from scratch (new tables, or after the counts drifted)
+FIC_FACETS_REBUILD_SQL = (
+    "DELETE FROM fic_facets;",
+    f"INSERT INTO fic_facets (facet,value,count) {facet_select_sql('fics')};",
+)
+
+# As in schema.sql and drizzle/0005_fic_facets.sql. A database without the
+# table gets it counted from its fics rows before a load adjusts the counts
+FIC_FACETS_SETUP_SQL = (
+    "CREATE TABLE IF NOT EXISTS fic_facets (facet TEXT NOT NULL,value TEXT NOT NULL,"
+    "count INTEGER NOT NULL,PRIMARY KEY (facet,value));",
+    "CREATE INDEX IF NOT EXISTS fic_facets_facet_count_idx ON fic_facets (facet,count);",
+    f"INSERT INTO fic_facets (facet,value,count) SELECT * FROM ({facet_select_sql('fics')}) "
+    "WHERE NOT EXISTS (SELECT 1 FROM fic_facets);",
+)
+
+
+def facet_removal_sql(ids_sql: str) -> str:
+    """Statement subtracting the stored facets of the fics with the listed ids.
+
+    Must run before those fics' rows and fic_tags are rewritten.
+
+    Args:
+        ids_sql: Comma-separated id literals or placeholders
+    """
+    return (
+        "INSERT INTO fic_facets (facet,value,count) "
+        f"WITH old AS (SELECT id,rating,status,words FROM fics WHERE id IN ({ids_sql})) "
+        f"{facet_select_sql('old', '-')} {FACET_UPSERT_SUFFIX};"
+    )
+
+
+def write_facet_removal_sql(writer: "SqlWriter", fic_ids: list[str], literal=sql_literal) -> None:
+    """Queue facet_removal_sql for some fics, in batches of TAG_INDEX_BATCH."""
+    for i in range(0, len(fic_ids), TAG_INDEX_BATCH):
+        batch = fic_ids[i : i + TAG_INDEX_BATCH]
+        writer.statement(facet_removal_sql(",".join(literal(f) for f in batch)))
+
+
+def write_facet_sql(writer: "SqlWriter", counts: Counter, literal=sql_literal) -> None:
+    """Queue upserts adding facet counts, tallied from the rows just written.
+
+    Args:
+        literal: Renders values, matching how the tags rows were written
+    """
+    for (facet, value), count in counts.items():
+        writer.insert(
+            FACET_INSERT_PREFIX,
+            f"({literal(facet)},{literal(value)},{count})",
+            FACET_UPSERT_SUFFIX,
+        )
@@ -10,648 +10,330 @@ Usage:
 
     # Weekly Update: Fetch all works from the past 7 days
     python etl_pipeline.py --mode weekly
-"""
-
-import os
-import re
-import time
-import argparse
-import json
-from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
-from typing import List, Optional
-from dotenv import load_dotenv
-
-import AO3
-
-# Load environment variables
-load_dotenv()
-
-# ============== AO3 Session Management ==============
-username = os.environ.get("AO3_USERNAME")
-password = os.environ.get("AO3_PASSWORD")
-session = None
-
-if username and password:
-    try:
-        session = AO3.Session(username, password)
-        print(f"✅ Successfully logged in as {username}")
-    except Exception as e:
-        print(f"❌ Error logging in: {e}")
-        session = None
-else:
-    print("❌ AO3 credentials not found. Using anonymous session.")
-    session = AO3.GuestSession()
-
-# ============== Tag Scoring Rules ==============
-
-# Rules Dictionary:
-# Keys are lowercase keywords and default to partial matches
-# Values include:
-# - "{metric}_add": increment or decrement score.
-# - "{metric}": force set score.
-
-TAG_RULES = {
-    # --- SPICE ---
-    "explicit": {"spice": 5},
-    "mature": {"spice": 3},
-    "smut": {"spice_add": 2},
-    "porn": {"spice_add": 2},
-    "sex": {"spice_add": 1},
-    "sexual tension": {"spice_add": 1},
-    "knotting": {"spice_add": 1},
-    "alpha/beta/omega dynamics": {"spice_add": 2},
-    "fade to black": {"spice": 1},
-    "flirting": {"spice_add": 1, "romance_add": 1},
-    "slow burn": {"spice_add": -1},
-    # --- ANGST ---
-    "major character death": {"angst": 5, "fluff": 1},
-    "dead dove: do not eat": {"angst": 5},
-    "hurt no comfort": {"angst_add": 3, "fluff": 1},
-    "hurt/comfort": {"angst_add": 2, "fluff_add": 1},
-    "angst": {"angst_add": 2},
-    "grief": {"angst_add": 2},
-    "trauma": {"angst_add": 2},
-    "ptsd": {"angst_add": 2},
-    "heavy angst": {"angst_add": 3},
-    "canon compliant": {"angst_add": 1},
-    "light angst": {"angst_add": 1},
-    "happy ending": {"angst_add": -1},
-    # --- FLUFF ---
-    "tooth-rotting fluff": {"fluff": 5},
-    "no angst": {"fluff": 5},
-    "domestic": {"fluff_add": 3},
-    "fluff": {"fluff_add": 2},
-    "modern au": {"fluff_add": 1},
-    "coffee shop": {"fluff_add": 1},
-    "flower shop": {"fluff_add": 1},
-    "soft caitlyn": {"fluff_add": 1, "romance_add": 1},
-    "soft vi": {"fluff_add": 1, "romance_add": 1},
-    "protective vi": {"fluff_add": 1},
-    "jealous caitlyn": {"fluff_add": 1},
-    "mutual pining": {"fluff_add": 1, "romance_add": 1},
-    # --- PLOT ---
-    "canon divergence": {"plot_add": 1},
-    "fix-it": {"plot_add": 1, "romance_min": 4},
-    "time travel": {"plot_add": 1, "romance_min": 4},
-    "mystery": {"plot_add": 2},
-    "case fic": {"plot_add": 2},
-    "detective": {"plot_add": 2},
-    "politics": {"plot_add": 2},
-    "investigation": {"plot_add": 2},
-    "post-canon": {"plot_add": 1},
-    "pwp": {"plot": 1},
-    "porn without plot": {"plot": 1},
-    "chatfic": {"plot": 1},
-    # --- ROMANCE ---
-    "slow burn": {"romance": 5},
-    "established relationship": {"romance_min": 4},
-    "soulmates": {"romance_add": 1},
-    "enemies to lovers": {"romance_add": 1},
-    "first time": {"romance_add": 1},
-    "first kiss": {"romance_add": 1},
-    "confessions": {"romance_add": 1},
-    "pre-canon": {"romance_add": -1},
-    "friends to lovers": {"romance_add": 1},
-    "friendship": {"romance": 1},
-    "platonic": {"romance": 1},
-}
-
-# ============== Data Models ==============
-
-
-@dataclass
-class FicStats:
-    """AO3 statistics for a fic."""
-
-    words: int
-    chapters: int
-    kudos: int
-    hits: int
-    comments: int
-    bookmarks: int
-
-
-@dataclass
-class FicState:
-    """Rating meters for a fic."""
-
-    spice: int
-    angst: int
-    fluff: int
-    plot: int
-    romance: int
-
-
-@dataclass
-class FicData:
-    """Complete fic data matching the database schema."""
-
-    id: str
-    title: str
-    author: str
-    link: str
-    summary: str
-    rating: str
-    category: str
-    status: str
-    is_translated: bool
-    tags: list[str]
-    stats: FicStats
-    state: FicState
-    quote: str
-
-
-# ============== Metrics Calculation ==============
-
-
-def calculate_metrics(tags: list[str], rating: str, word_count: int) -> FicState:
-    """Based on the Tags, Rating and Word Count, calculate the 5 basic metrics."""
-
-    # BaseLine
-    scores = {"spice": 1, "angst": 1, "fluff": 1, "plot": 1, "romance": 3}
-    forced_values = {}
-    min_values = {}
-
-    # Hardcoded Rules for Spice
-    if rating == "E":
-        scores["spice"] = 5
-    elif rating == "M":
-        scores["spice"] = 3
-
-    # Hardcoded Rules for Plot base on word count
-    if word_count > 50000:
-        scores["plot"] = 5
-    elif word_count > 20000:
-        scores["plot"] = 4
-    elif word_count > 10000:
-        scores["plot"] = 3
-    elif word_count > 5000:
-        scores["plot"] = 2
-
-    # Process Tags
-    lower_tags = [t.lower() for t in tags]
-
-    for tag in lower_tags:
-        for rule_key, rules in TAG_RULES.items():
-            if rule_key not in tag:
-                continue
-
-            for action, value in rules.items():
-                if action.endswith("_add"):
-                    metric = action[:-4]
-                    scores[metric] += value
-                elif action.endswith("_min"):
-                    metric = action[:-4]
-                    min_values[metric] = max(min_values.get(metric, 0), value)
-                else:
-                    metric = action
-                    if metric not in forced_values or value in (1, 5):
-                        forced_values[metric] = value
-
-    for metric, min_val in min_values.items():
-        scores[metric] = max(scores[metric], min_val)
-
-    scores.update(forced_values)
-
-    has_comfort = any("comfort" in t for t in lower_tags)
-    if scores["angst"] >= 4 and not has_comfort:
-        scores["fluff"] -= 1
-
-    for k in scores:
-        scores[k] = max(1, min(5, scores[k]))
-
-    return FicState(**scores)
-
-
-# ========== Mapping Functions ==========
-def map_rating(ao3_rating: str) -> str:
-    """Map AO3 rating string to single letter."""
-    rating_map = {
-        "General Audiences": "G",
-        "Teen And Up Audiences": "T",
-        "Mature": "M",
-        "Explicit": "E",
-        "Not Rated": "T",
-    }
-    return rating_map.get(ao3_rating, "T")
-
-
-def map_status(ao3_status: str) -> str:
-    """Map AO3 status to our schema."""
-    if ao3_status and "complete" in ao3_status.lower():
-        return "completed"
-    return "ongoing"
-
-
-def clean_summary(summary: str) -> str:
-    """Clean HTML tags"""
-    return re.sub(r"<[^>]+>", "", summary).strip()
-
-
-def escape_sql(text: str) -> str:
-    """Escape special characters for SQL insertion."""
-    if not text:
-        return ""
-    return text.replace("'", "''").replace("\n", "\\n").replace("\r", "")
 
+    # Full crawl split into kudos bands, 4 bands crawled in parallel
+    python etl_pipeline.py --mode full --sharded --workers 4 --min-kudos 100
 
-# ============== AO3 Data Fetcher ==============
-def fetch_work(work_id: int) -> Optional[FicData]:
-    """Fetch a single work from ao3
+    # Backfill: Fetch a list of work IDs with 4 workers at 0.5 req/s overall
+    python etl_pipeline.py --mode batch --work-ids-file ids.txt --workers 4 --rate 0.5
 
-    Args:
-        work_id (int): work id
-
-    Returns:
-        Optional[FicData]: FicData object or None if fetch failed
-    """
-    try:
-        print(f"🔍 Fetching AO3 Work ID: {work_id}...")
-
-        # Call the AO3 API
-        work = AO3.Work(work_id, session=session)
-
-        # Calculate Metrics
-        mapped_rating = map_rating(work.rating)
-        state_metrics = calculate_metrics(work.tags, mapped_rating, work.words or 0)
-
-        # Build FicData object
-        fic = FicData(
-            id=f"{work_id}",
-            title=work.title,
-            author=work.authors[0].username if work.authors else "Anonymous",
-            summary=clean_summary(work.summary or ""),
-            rating=map_rating(work.rating),
-            tags=work.tags,
-            category=work.categories[0] if work.categories else "Other",
-            status=map_status(work.status),
-            is_translated=False,
-            state=state_metrics,
-            stats=FicStats(
-                words=work.words or 0,
-                chapters=work.nchapters or 1,
-                kudos=work.kudos or 0,
-                hits=work.hits or 0,
-                comments=work.comments or 0,
-                bookmarks=work.bookmarks or 0,
-            ),
-            quote="",
-            link=work.url,
-        )
-
-        print(f"✅ Successfully fetched: {fic.title} by {fic.author}")
-        return fic
-    except AO3.utils.InvalidIdError:
-        print(f"❌ Invalid work ID: {work_id}")
-        return None
-    except Exception as e:
-        print(f"❌ Error fetching work {work_id}: {e}")
-        return None
+    # Weekly update that fetches full works (and a quote) only for new or updated listings
+    python etl_pipeline.py --mode weekly --details --quotes
 
+    # Weekly update into a local SQLite database, plus a D1 dump of what changed
+    python etl_pipeline.py --mode weekly --format sqlite --output caitvi.sqlite --sqlite-export import.sql
 
-# ============== Search & Pipeline Functions ==============
-CAITVI_TAGS = ["Caitlyn/Vi (League of Legends)"]
+    # ... and pre-render the discover listings and fic details as static JSON
+    python etl_pipeline.py --mode weekly --format sqlite --output caitvi.sqlite --shards-dir shards
 
+    # One-off: write tags/fic_tags for every crawled fic, even unchanged ones
+    # (databases loaded before the tag index), and recount fic_facets
+    python etl_pipeline.py --mode full --min-kudos 0 --pages 1000 --delta-against .etl_state/snapshot.json --rebuild-tag-index
 
-def parse_search_result(result) -> Optional[FicData]:
-    """Parse a single AO3 search result into FicData"""
+    # Full crawl appended as one snapshot to a local Iceberg table of Parquet files
+    python etl_pipeline.py --mode full --format parquet --output warehouse
 
-    try:
-        work_id = result.id
-        title = result.title or "Untitled"
-
-        # Author
-        authors = getattr(result, "authors", None)
-        if authors and len(authors) > 0:
-            author = (
-                authors[0].username
-                if hasattr(authors[0], "username")
-                else str(authors[0])
-            )
-        else:
-            author = "Anonymous"
-
-        # Tags
-        all_tags = []
-        for tag_attr in ["fandoms", "characters", "relationships", "tags"]:
-            tags = getattr(result, tag_attr, None)
-            if tags:
-                all_tags.extend(tags)
-
-        # Stats
-        words = getattr(result, "words", 0) or 0
-        chapters = getattr(result, "chapters", 1) or 1
-        kudos = getattr(result, "kudos", 0) or 0
-        hits = getattr(result, "hits", 0) or 0
-        comments = getattr(result, "comments", 0) or 0
-        bookmarks = getattr(result, "bookmarks", 0) or 0
-
-        # Rating and status
-        raw_rating = getattr(result, "rating", "Not Rated") or "Not Rated"
-        mapped_rating = map_rating(raw_rating)
-
-        raw_status = getattr(result, "status", None)
-        status = map_status(raw_status) if raw_status else "ongoing"
-
-        # Category
-        categories = getattr(result, "categories", None) or []
-        category = categories[0] if categories else "Other"
-
-        # Summary
-        raw_summary = getattr(result, "summary", "") or ""
-        summary = clean_summary(raw_summary)
-
-        # URL
-        url = f"https://archiveofourown.org/works/{work_id}"
-
-        # Calculate metrics
-        state_metrics = calculate_metrics(all_tags, mapped_rating, words)
-
-        fic = FicData(
-            id=str(work_id),
-            title=title,
-            author=author,
-            link=url,
-            summary=summary,
-            rating=mapped_rating,
-            category=category,
-            status=status,
-            is_translated=False,
-            tags=all_tags,
-            stats=FicStats(
-                words=words,
-                chapters=chapters,
-                kudos=kudos,
-                hits=hits,
-                comments=comments,
-                bookmarks=bookmarks,
-            ),
-            state=state_metrics,
-            quote="",
-        )
-
-        return fic
+    # Rescore: Recompute meters after TAG_RULES changes, without touching AO3
+    python etl_pipeline.py --mode rescore --export fics.sql --output rescore.sql
 
-    except Exception as e:
-        print(f"⚠️ Failed to parse result: {e}")
-        return None
+The stages live in the etl package next to this script; this module is the
+command line, and re-exports the pipeline's public names.
+"""
 
+import os
+import pstats
+import argparse
+import cProfile
+import json
+import sys
+import threading
+import tracemalloc
+from dataclasses import asdict
+from typing import Iterable, Optional
+
+from etl import cache, crawl, session
+from etl.bands import iter_sharded_pages, plan_kudos_bands
+from etl.cache import WorkCache
+from etl.checkpoint import Checkpoint
+from etl.crawl import (
+    CAITVI_TAGS,
+    DEFAULT_LISTING_INDEX,
+    CrawlInterrupted,
+    ListingIndex,
+    fetch_batch,
+    fetch_search_page,
+    fetch_work,
+    iter_search_pages,
+    refresh_details,
+    search_and_collect,
+)
+from etl.governor import RequestGovernor, TokenBucket, parse_retry_after
+from etl.metrics import PipelineMetrics, pipeline_metrics, timed_stage
+from etl.models import FicData, FicState, FicStats
+from etl.parse import (
+    clean_summary,
+    map_rating,
+    map_status,
+    parse_search_page,
+    parse_search_result,
+    record_to_fic,
+    search_result_to_record,
+)
+from etl.quotes import (
+    QUOTE_CHUNK_BYTES,
+    QuoteExtractor,
+    attach_quotes,
+    extract_quote,
+    score_sentence,
+)
+from etl.rescore import SCORE_COLUMNS, run_rescore
+from etl.scoring import (
+    METRICS,
+    TAG_RULES,
+    CompiledTagRules,
+    TagMatcher,
+    calculate_metrics,
+    score_matrix,
+)
+from etl.session import DEFAULT_SESSION_FILE, CookieSession, SessionPool, get_session
+from etl.shards import SHARD_MAX_PAGES, SHARD_SORTS, export_json_shards
+from etl.sinks import (
+    SNAPSHOT_TABLE,
+    JsonlSink,
+    JsonSink,
+    ParquetSink,
+    SqliteSink,
+    SqlSink,
+    export_sqlite_dump,
+    generate_sql_file,
+    open_sink,
+)
+from etl.sql import (
+    FIC_COLUMNS,
+    FIC_UPDATE_SUFFIX,
+    MAX_STATEMENT_BYTES,
+    SCHEMA_PATH,
+    DeltaSnapshot,
+    SqlOutputOptions,
+    SqlWriter,
+    facet_select_sql,
+    fic_to_row,
+)
+
+
+# ============== Pipeline ==============
 
-def search_and_collect(
-    tags: list[str],
-    min_kudos: int = 0,
-    max_kudos: int = None,
-    page_limit: int = 1,
-    days_back: int = 0,
-    sort_by: str = "revised_at",
-) -> list[FicData]:
-    """Search AO3 works and directly collect FicData from search results.
 
-    Args:
-        tags: List of relationship tags
-        min_kudos: Minimum kudos count
-        max_kudos: Maximum kudos count
-        page_limit: Maximum number of pages to fetch
-        days_back: Number of days to look back (0 means no limit)
-        sort_by: Sort column ("revised_at" for weekly, "kudos_count" for full)
+def run_pipeline(
+    mode: str, output: str = None, output_format: str = "json", **kwargs
+) -> int:
+    """Pipeline runner for both weekly and full update.
+
+    Pages are streamed into the output sink as they arrive, so memory stays
+    bounded and everything written before a failure is kept on disk (the
+    sink is aborted rather than closed). Search
+    modes save a checkpoint after every page; with resume=True an interrupted
+    crawl continues after the last completed page. With details=True (sql and
+    sqlite formats), new or changed works are fetched in full and unchanged
+    ones only get their listing stats refreshed (see refresh_details). With
+    quotes=True (which search modes only allow with details=True), works
+    written in full get a quote from their first chapter.
 
     Returns:
-        List of FicData objects
+        Number of fics collected
     """
 
-    results = []
-    seen_ids = set()
-
-    print(f"🔍 Searching for works with tags: {tags}")
-    print(f"🔍 Days back: {days_back if days_back > 0 else 'Unlimited'}")
-    print(f"🔍 Kudos range: {min_kudos} - {max_kudos if max_kudos else 'Unlimited'}")
-    print(f"🔍 Page limit: {page_limit}")
-    print(f"🔍 Sort by: {sort_by}")
-
-    try:
-        relationship_filter = tags[0] if tags else None
-
-        revised_at_filter = ""
-        if days_back > 0:
-            revised_at_filter = f"< {days_back} days"
-
-        search = AO3.Search(
-            any_field="'F/F' -'M/M' -'F/M'",
-            relationships=relationship_filter,
-            kudos=AO3.utils.Constraint(min_kudos, max_kudos)
-            if min_kudos or max_kudos
-            else None,
-            revised_at=revised_at_filter,
-            sort_column=sort_by,
-            sort_direction="desc",
-            session=session,
-        )
-
-        for page in range(1, page_limit + 1):
-            print(f"🔍 Searching page {page}...")
-
-            max_retries = 3
-            retry_count = 0
-            page_success = False
-
-            while retry_count < max_retries:
-                try:
-                    search.page = page
-                    search.update()
-
-                    if not search.results and page == 1:
-                        page_success = True
-                        break
-
-                    page_success = True
-                    break
-
-                except Exception as e:
-                    print(
-                        f"⚠️ Page {page} fetch failed (attempt {retry_count}/{max_retries}): {e}"
-                    )
-                    retry_count += 1
-
-                    if retry_count < max_retries:
-                        time.sleep(30 * (2 ** (retry_count - 1)))
-                    else:
-                        print(
-                            f"❌ Failed to fetch page {page} after {max_retries} retries: {e}"
-                        )
-
-            if not page_success:
-                break
-
-            page_count = 0
-            for result in search.results:
-                if result.id in seen_ids:
-                    continue
-                seen_ids.add(result.id)
-
-                fic = parse_search_result(result)
-                if fic:
-                    results.append(fic)
-                    page_count += 1
-
-            print(
-                f"✅ Collected {page_count} works from page {page} (Total: {len(results)})"
-            )
-
-            # Stop if this page has fewer than 20 results (last page)
-            if len(search.results) < 20:
-                print(f"📄 Last page reached (only {len(search.results)} results)")
-                break
-
-            time.sleep(5.0)
-
-    except Exception as e:
-        print(f"❌ Search failed: {e}")
-
-    return results
-
-
-def fetch_batch(work_ids: list[int], delay: float = 5.0) -> list[FicData]:
-    """Fetch a batch of works with limiting rate"""
-    results = []
-    total = len(work_ids)
-
-    for i, work_id in enumerate(work_ids, 1):
-        print(f"🔍 Fetching [{i}/{total}]...")
-        fic = fetch_work(work_id)
-        if fic:
-            results.append(fic)
-
-        if i < total:
-            time.sleep(delay)
-
-    return results
-
-
-def generate_sql_file(fics: list[FicData], output_path: str) -> None:
-    """Generate INSERT SQL for Cloudflare D1"""
-
-    print(f"⚙️ Generating SQL file: {output_path}...")
-
-    # Create directory if path contains subdirectories
-    output_dir = os.path.dirname(output_path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(f"-- Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("-- Mode: Upsert (INSERT OR REPLACE)\n\n")
-
-        for fic in fics:
-            category_str = (
-                fic.category[0]
-                if isinstance(fic.category, list)
-                else (fic.category or "Other")
-            )
-
-            tags_json = json.dumps(fic.tags, ensure_ascii=False).replace("'", "''")
-
-            sql = f"""INSERT OR REPLACE INTO fics (
-                id, title, author, link, summary, 
-                rating, category, status, is_translated, 
-                words, chapters, kudos, hits, comments, bookmarks,
-                tags_json, quote,
-                base_spice, base_angst, base_fluff, base_plot, base_romance,
-                created_at, updated_at
-            ) VALUES (
-                '{fic.id}', 
-                '{escape_sql(fic.title)}', 
-                '{escape_sql(fic.author)}', 
-                '{escape_sql(fic.link)}', 
-                '{escape_sql(fic.summary)}', 
-                '{fic.rating}', 
-                '{fic.category}', 
-                '{fic.status}', 
-                {1 if fic.is_translated else 0}, 
-                {fic.stats.words}, 
-                {fic.stats.chapters}, 
-                {fic.stats.kudos}, 
-                {fic.stats.hits}, 
-                {fic.stats.comments}, 
-                {fic.stats.bookmarks}, 
-                '{tags_json}', 
-                '{escape_sql(fic.quote)}', 
-                {fic.state.spice}, 
-                {fic.state.angst}, 
-                {fic.state.fluff}, 
-                {fic.state.plot}, 
-                {fic.state.romance}, 
-                CURRENT_TIMESTAMP, 
-                CURRENT_TIMESTAMP
-            );
-            """
-            f.write(sql + "\n")
-
-    print(f"✅ SQL file generated: {output_path}")
-
-
-def run_pipeline(
-    mode: str, output: str = None, output_format: str = "json", **kwargs
-) -> list[FicData]:
-    """Pipeline runner for both weekly and full update."""
-
     print("=" * 60)
     print(f"🚀 CaitVi Hub ETL Pipeline - Mode: {mode.upper()}")
     print("=" * 60)
 
-    results = []
+    search_kwargs = None
+    sharded = False
+    pages: Iterable[tuple[int, list[FicData]]] = []
 
     if mode == "weekly":
         # Weekly: Past N days, sort by revised_at
-        days = kwargs.get("days", 7)
-        min_kudos = kwargs.get("min_kudos", 0)
-        max_kudos = kwargs.get("max_kudos", None)
-
-        results = search_and_collect(
+        search_kwargs = dict(
             tags=CAITVI_TAGS,
-            days_back=days,
-            min_kudos=min_kudos,
-            max_kudos=max_kudos,
+            days_back=kwargs.get("days", 7),
+            min_kudos=kwargs.get("min_kudos", 0),
+            max_kudos=kwargs.get("max_kudos", None),
             page_limit=5,
             sort_by="revised_at",
         )
     elif mode == "full":
         # Full: No date limit, sort by kudos_count to get high quality works
-        min_kudos = kwargs.get("min_kudos", 500)
-        max_kudos = kwargs.get("max_kudos", None)
-        page_limit = kwargs.get("page_limit", 20)
-
-        results = search_and_collect(
+        search_kwargs = dict(
             tags=CAITVI_TAGS,
-            min_kudos=min_kudos,
-            max_kudos=max_kudos,
-            page_limit=page_limit,
+            min_kudos=kwargs.get("min_kudos", 500),
+            max_kudos=kwargs.get("max_kudos", None),
+            page_limit=kwargs.get("page_limit", 20),
             sort_by="kudos_count",
         )
+        sharded = kwargs.get("sharded", False)
+
+    # One governor paces and retries every AO3 request of the run
+    rate = kwargs.get("rate")
+    if rate is None:
+        if sharded:
+            rate = 0.2 * kwargs.get("workers", 4)
+        elif mode == "batch":
+            rate = 0.2
+        else:
+            page_delay = kwargs.get("page_delay", 5.0)
+            rate = 1.0 / page_delay if page_delay else None
+    governor = RequestGovernor(rate, max_rate=kwargs.get("max_rate"))
+
+    if mode == "batch":
+        # Batch: Fetch an explicit list of work IDs concurrently
+        pages = [
+            (
+                1,
+                fetch_batch(
+                    kwargs.get("work_ids", []),
+                    workers=kwargs.get("workers", 1),
+                    governor=governor,
+                ),
+            )
+        ]
+
+    delta_against = kwargs.get("delta_against")
+    snapshot = None
+    if delta_against and output_format == "sql":
+        snapshot = DeltaSnapshot.load(delta_against)
+
+    listing = None
+    listing_path = kwargs.get("listing_index") or DEFAULT_LISTING_INDEX
+    if kwargs.get("details") and search_kwargs is not None:
+        if output_format not in ("sql", "sqlite"):
+            raise ValueError("Detail refresh needs the sql or sqlite output format")
+        listing = ListingIndex.load(listing_path)
+    if kwargs.get("quotes") and search_kwargs is not None and listing is None:
+        # Without details, every crawled work would fetch its first chapter
+        raise ValueError("Quotes in weekly/full mode need details=True")
+
+    # Checkpoint search crawls so a failed run can pick up where it stopped
+    checkpoint = None
+    resume_state = None
+    seen_ids = set()
+    total = 0
+    checkpoint_path = kwargs.get("checkpoint") or (
+        f"{output}.checkpoint.json" if output else None
+    )
+    if search_kwargs is not None and checkpoint_path:
+        params = {"mode": mode, "output": output, "format": output_format}
+        params.update(search_kwargs)
+        if sharded:
+            params.update(sharded=True, band_pages=kwargs.get("band_pages", 10))
+        if listing is not None:
+            params.update(details=True)
+        checkpoint = Checkpoint(checkpoint_path, params)
+        if kwargs.get("resume"):
+            resume_state = checkpoint.load()
+
+    shard_progress = {}
+    if resume_state:
+        seen_ids = set(resume_state["seen_ids"])
+        total = resume_state["total"]
+        shard_progress = resume_state.get("shards") or {}
+        if snapshot is not None:
+            snapshot.apply(resume_state["snapshot_entries"])
+        if listing is not None:
+            listing.apply(resume_state.get("listing_entries") or {})
+
+    if sharded:
+        pages = iter_sharded_pages(
+            search_kwargs,
+            workers=kwargs.get("workers", 4),
+            band_pages=kwargs.get("band_pages", 10),
+            seen_ids=seen_ids,
+            progress=shard_progress,
+            listing=listing,
+            governor=governor,
+        )
+    elif search_kwargs is not None:
+        pages = iter_search_pages(
+            **search_kwargs,
+            start_page=resume_state["last_page"] + 1 if resume_state else 1,
+            seen_ids=seen_ids,
+            governor=governor,
+            listing=listing,
+            prefetch=kwargs.get("prefetch", 1),
+        )
 
-    if not results:
-        print("\n⚠️ No works found matching criteria.")
-        return []
+    # Sinks are opened on the first non-empty page so no file means no works
+    sink = None
+    if resume_state and resume_state["sink"] and output:
+        sink = open_sink(
+            output_format,
+            output,
+            sink_state=resume_state["sink"],
+            snapshot=snapshot,
+            **kwargs,
+        )
 
-    # Save to output
-    if output and results:
-        if output_format == "sql":
-            generate_sql_file(results, output)
-        else:
-            # Create output directory if it doesn't exist
-            output_dir = os.path.dirname(output)
-            if output_dir:
-                os.makedirs(output_dir, exist_ok=True)
+    completed = False
+    try:
+        for page, page_fics in pages:
+            refresh = []
+            if listing is not None and page_fics:
+                page_fics, refresh = refresh_details(
+                    page_fics,
+                    listing,
+                    workers=kwargs.get("workers", 1),
+                    governor=governor,
+                )
+            if kwargs.get("quotes") and page_fics:
+                attach_quotes(page_fics, governor, workers=kwargs.get("workers", 1))
+
+            if page_fics or refresh:
+                if output and sink is None:
+                    sink = open_sink(output_format, output, snapshot=snapshot, **kwargs)
+                if sink:
+                    with pipeline_metrics.stage(
+                        "write_output", len(page_fics) + len(refresh)
+                    ):
+                        sink.write_page(page_fics)
+                        if refresh:
+                            sink.refresh_stats(refresh)
+                total += len(page_fics) + len(refresh)
+                pipeline_metrics.count("works", len(page_fics) + len(refresh))
+
+            if checkpoint:
+                checkpoint.save(
+                    page,
+                    seen_ids,
+                    total,
+                    sink.state() if sink else None,
+                    snapshot.run_entries() if snapshot is not None else None,
+                    shards=shard_progress if sharded else None,
+                    listing_entries=listing.run_entries() if listing is not None else None,
+                )
+        completed = True
+    finally:
+        # A failed run only releases the sink; end-of-run work (and the
+        # parquet commit) happens once, when the resumed run completes
+        if sink and completed:
+            sink.close()
+        elif sink:
+            sink.abort()
+
+    if checkpoint:
+        checkpoint.clear()
+
+    if not total:
+        print("\n⚠️ No works found matching criteria.")
+        return 0
 
-            output_data = [asdict(fic) for fic in results]
-            with open(output, "w", encoding="utf-8") as f:
-                json.dump(output_data, f, ensure_ascii=False, indent=2)
-            print(f"\n📁 Results saved to: {output}")
+    if snapshot is not None and sink is not None:
+        snapshot.save(kwargs.get("snapshot_out") or delta_against)
+    if listing is not None and sink is not None:
+        listing.save(listing_path)
 
     print("=" * 60)
     print("\n✅ Pipeline completed successfully!")
     print("=" * 60)
-    return results
+    return total
 
 
 # ============== Output Formatting ==============
@@ -668,6 +350,8 @@ def print_summary(fic: FicData) -> None:
     print(
         f"📐 Meters: S={fic.state.spice} A={fic.state.angst} F={fic.state.fluff} P={fic.state.plot} R={fic.state.romance}"
     )
+    if fic.quote:
+        print(f"💬 {fic.quote}")
 
 
 def save_to_json(fic: FicData, output_path: str) -> None:
@@ -681,7 +365,7 @@ def save_to_json(fic: FicData, output_path: str) -> None:
     print(f"📁 Results saved to: {output_path}")
 
 
-def main():
+def main(argv: Optional[list[str]] = None):
     print("🚀 Staring AO3 Data Fetcher...")
 
     # Parsing command line arguments
@@ -694,14 +378,46 @@ def main():
     parser.add_argument(
         "--mode",
         type=str,
-        choices=["single", "weekly", "full"],
+        choices=["single", "weekly", "full", "batch", "rescore"],
         default="single",
-        help="Run mode: 'single' for one work, 'weekly' for last 7 days, 'full' for full database update",
+        help="Run mode: 'single' for one work, 'weekly' for last 7 days, 'full' for full database update, 'batch' for a list of work IDs, 'rescore' to recompute meters from --export",
     )
 
     # Single Work Mode
     parser.add_argument("--work-id", type=int, help="Single AO3 work ID to fetch")
 
+    # Batch Mode
+    parser.add_argument(
+        "--work-ids", type=str, help="Comma-separated AO3 work IDs (batch mode)"
+    )
+    parser.add_argument(
+        "--work-ids-file", type=str, help="File with one AO3 work ID per line (batch mode)"
+    )
+    parser.add_argument(
+        "--export",
+        type=str,
+        help="Local fics export for rescore mode: SQLite database, .sql dump or wrangler --json output",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Concurrent fetch workers (batch mode, sharded full mode)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Starting AO3 request rate in requests/second (default 0.2, sharded: 0.2 per worker); "
+        "adapts to throttling between a tenth of it and --max-rate",
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=float,
+        default=None,
+        help="Highest AO3 request rate reached on healthy runs (default: twice the starting rate)",
+    )
+
     # Pipeline args
     parser.add_argument(
         "--days", type=int, default=7, help="Days to look back (weekly mode)"
@@ -711,37 +427,365 @@ def main():
         "--max-kudos", type=int, default=None, help="Maximum kudos filter"
     )
     parser.add_argument("--pages", type=int, default=10, help="Max pages (full mode)")
-    parser.add_argument("--output", type=str, help="Output JSON file path")
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        help="Full mode: split the kudos range into bands crawled by --workers in parallel",
+    )
+    parser.add_argument(
+        "--band-pages",
+        type=int,
+        default=10,
+        help="Page budget per kudos band (sharded full mode)",
+    )
+    parser.add_argument("--output", type=str, help="Output file path")
+    parser.add_argument(
+        "--no-fast-parse",
+        action="store_true",
+        help="Parse search pages with ao3-api instead of the lxml fast path",
+    )
+
+    # Checkpoints
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted weekly/full crawl from its checkpoint",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="Checkpoint file path (defaults to <output>.checkpoint.json)",
+    )
+
+    # Cache
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=".ao3_cache",
+        help="Directory of the local AO3 cache",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Always fetch from AO3"
+    )
+    parser.add_argument(
+        "--cache-ttl", type=float, default=168, help="Cached work TTL in hours"
+    )
+    parser.add_argument(
+        "--search-cache-ttl",
+        type=float,
+        default=12,
+        help="Cached search page TTL in hours",
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=256, help="Cache size cap in MB"
+    )
+
+    # Session
+    parser.add_argument(
+        "--session-file",
+        type=str,
+        default=None,
+        help=f"Saved AO3 login cookies (default: $AO3_SESSION_FILE or {DEFAULT_SESSION_FILE}; "
+        "'' keeps them in memory only)",
+    )
+    parser.add_argument(
+        "--session-max-age",
+        type=float,
+        default=24,
+        help="Hours before saved login cookies are replaced by a fresh login",
+    )
+    parser.add_argument(
+        "--session-pool",
+        type=int,
+        default=None,
+        help="AO3 sessions shared by workers (default: --workers, at most 4)",
+    )
 
     # Format
     parser.add_argument(
         "--format",
         default="sql",
-        choices=["json", "sql"],
-        help="Output format: json or sql",
-    )
-
-    args = parser.parse_args()
-
-    if args.mode == "single":
-        work_id = args.work_id or 64163587  # Default demo ID
-        print(f"🚀 Fetching single work: {work_id}")
-        fic = fetch_work(work_id)
-        if fic:
-            print_summary(fic)
-            if args.output:
-                save_to_json(fic, args.output)
-
-    else:
-        run_pipeline(
-            mode=args.mode,
-            output=args.output,
-            output_format=args.format,
-            days=args.days,
-            min_kudos=args.min_kudos,
-            max_kudos=args.max_kudos,
-            page_limit=args.pages,
+        choices=["json", "jsonl", "sql", "sqlite", "parquet"],
+        help="Output format: json, jsonl, sql, sqlite (local database) or parquet "
+        "(--output is an Iceberg warehouse; each run appends one snapshot)",
+    )
+
+    # SQLite output
+    parser.add_argument(
+        "--sqlite-schema",
+        type=str,
+        default=None,
+        help="Schema for a new SQLite database (default: scripts/schema.sql; "
+        "drizzle/0000_tiny_unicorn.sql also works)",
+    )
+    parser.add_argument(
+        "--sqlite-export",
+        type=str,
+        default=None,
+        help="After the run, dump rows inserted or changed in the SQLite database to this D1-importable SQL file",
+    )
+    parser.add_argument(
+        "--sqlite-export-all",
+        action="store_true",
+        help="Dump every row for --sqlite-export, not only this run's changes",
+    )
+    parser.add_argument(
+        "--shards-dir",
+        type=str,
+        default=None,
+        help="After the run, pre-render /api/fics listings (per sort and rating/status) "
+        "and per-fic details from the SQLite database as static JSON in this directory; "
+        "the database should hold every fic in D1",
+    )
+    parser.add_argument(
+        "--shard-pages",
+        type=int,
+        default=SHARD_MAX_PAGES,
+        help="Listing pages pre-rendered per sort and filter (--shards-dir); later pages use the API",
+    )
+
+    # SQL batching
+    parser.add_argument(
+        "--sql-batch-size",
+        type=int,
+        default=100,
+        help="Rows per multi-row INSERT chunk (sql format)",
+    )
+    parser.add_argument(
+        "--sql-max-file-rows",
+        type=int,
+        default=None,
+        help="Split SQL output into numbered files of at most this many rows",
+    )
+    parser.add_argument(
+        "--sql-max-file-mb",
+        type=float,
+        default=None,
+        help="Split SQL output into numbered files of at most this size",
+    )
+    parser.add_argument(
+        "--sql-transactions",
+        action="store_true",
+        help="Wrap each chunk in BEGIN/COMMIT (not accepted by remote D1 imports)",
+    )
+
+    # Detail refresh
+    parser.add_argument(
+        "--details",
+        action="store_true",
+        help="Weekly/full mode: fetch full works for new or changed listings only, "
+        "refresh just the stats of the rest (sql/sqlite format)",
+    )
+    parser.add_argument(
+        "--listing-index",
+        type=str,
+        default=DEFAULT_LISTING_INDEX,
+        help="Listing signatures of detail-fetched works (--details)",
+    )
+    parser.add_argument(
+        "--rebuild-tag-index",
+        action="store_true",
+        help="Write tags/fic_tags for every crawled fic, unchanged ones included, "
+        "and recount fic_facets (one-off, for databases loaded before the tag index)",
+    )
+
+    parser.add_argument(
+        "--quotes",
+        action="store_true",
+        help="Pick a quote from the first chapter of works fetched in full "
+        "(single and batch mode, or weekly/full with --details)",
+    )
+
+    # Delta output
+    parser.add_argument(
+        "--delta-against",
+        type=str,
+        default=None,
+        help="Snapshot of the previous run; only new/changed fics are written (sql format)",
+    )
+    parser.add_argument(
+        "--snapshot-out",
+        type=str,
+        default=None,
+        help="Where to write the updated snapshot (defaults to --delta-against)",
+    )
+
+    # Instrumentation
+    parser.add_argument(
+        "--metrics-out",
+        type=str,
+        default=None,
+        help="Write per-stage timings, counters and latency histograms as JSON",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        type=str,
+        default=None,
+        help="Write the same metrics as a Prometheus textfile (node_exporter format)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Save a cProfile dump (all threads) here and record the tracemalloc peak",
+    )
+
+    args = parser.parse_args(argv)
+    if args.mode == "rescore" and not args.export:
+        parser.error("--mode rescore requires --export")
+    if args.shards_dir and args.format != "sqlite":
+        parser.error("--shards-dir requires --format sqlite")
+    if args.details and args.format not in ("sql", "sqlite"):
+        parser.error("--details requires --format sql or sqlite")
+    if args.rebuild_tag_index and (
+        args.format != "sql" or args.details or args.mode in ("single", "rescore")
+    ):
+        parser.error(
+            "--rebuild-tag-index requires a weekly/full/batch crawl to --format sql, without --details"
         )
+    if args.quotes and args.mode in ("weekly", "full") and not args.details:
+        parser.error("--quotes in weekly/full mode requires --details")
+
+    crawl.FAST_SEARCH_PARSE = not args.no_fast_parse
+    session_file = args.session_file
+    if session_file is None:
+        session_file = os.environ.get("AO3_SESSION_FILE", DEFAULT_SESSION_FILE)
+    session.session_pool = SessionPool(
+        os.environ.get("AO3_USERNAME"),
+        os.environ.get("AO3_PASSWORD"),
+        size=args.session_pool or min(args.workers, 4),
+        cookie_path=session_file,
+        max_age_hours=args.session_max_age,
+    )
+
+    work_cache = None
+    if not args.no_cache:
+        work_cache = cache.work_cache = WorkCache(
+            args.cache_dir,
+            work_ttl_hours=args.cache_ttl,
+            search_ttl_hours=args.search_cache_ttl,
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+        )
+
+    sql_options = SqlOutputOptions(
+        batch_size=args.sql_batch_size,
+        max_file_rows=args.sql_max_file_rows,
+        max_file_bytes=int(args.sql_max_file_mb * 1024 * 1024)
+        if args.sql_max_file_mb
+        else None,
+        transactions=args.sql_transactions,
+    )
+
+    profiler = cProfile.Profile() if args.profile else None
+    thread_profilers = []
+    # Before 3.12 cProfile only sees the thread that enabled it, so each worker
+    # thread gets its own profiler. From 3.12 it is built on sys.monitoring:
+    # one profiler sees every thread, and a second one cannot be enabled
+    per_thread_profiles = profiler is not None and sys.version_info < (3, 12)
+    if profiler:
+        if per_thread_profiles:
+
+            def profile_thread(*_):
+                # Runs once in each new worker thread, then hands over to cProfile
+                thread_profiler = cProfile.Profile()
+                thread_profilers.append(thread_profiler)
+                thread_profiler.enable()
+
+            threading.setprofile(profile_thread)
+        tracemalloc.start()
+        profiler.enable()
+
+    try:
+        if args.mode == "single":
+            work_id = args.work_id or 64163587  # Default demo ID
+            print(f"🚀 Fetching single work: {work_id}")
+            fic = fetch_work(work_id)
+            if fic and args.quotes:
+                attach_quotes([fic])
+            if fic:
+                print_summary(fic)
+                if args.output:
+                    save_to_json(fic, args.output)
+
+        elif args.mode == "rescore":
+            run_rescore(
+                args.export,
+                args.output,
+                delta_against=args.delta_against,
+                snapshot_out=args.snapshot_out,
+                sql_options=sql_options,
+            )
+
+        else:
+            work_ids = []
+            if args.work_ids:
+                work_ids.extend(int(w) for w in args.work_ids.split(",") if w.strip())
+            if args.work_ids_file:
+                with open(args.work_ids_file, encoding="utf-8") as f:
+                    work_ids.extend(int(line) for line in f if line.strip())
+
+            try:
+                run_pipeline(
+                    mode=args.mode,
+                    output=args.output,
+                    output_format=args.format,
+                    days=args.days,
+                    min_kudos=args.min_kudos,
+                    max_kudos=args.max_kudos,
+                    page_limit=args.pages,
+                    sharded=args.sharded,
+                    band_pages=args.band_pages,
+                    work_ids=work_ids,
+                    workers=args.workers,
+                    rate=args.rate,
+                    max_rate=args.max_rate,
+                    delta_against=args.delta_against,
+                    snapshot_out=args.snapshot_out,
+                    resume=args.resume,
+                    checkpoint=args.checkpoint,
+                    sql_options=sql_options,
+                    sqlite_schema=args.sqlite_schema,
+                    sqlite_export=args.sqlite_export,
+                    sqlite_export_all=args.sqlite_export_all,
+                    shards_dir=args.shards_dir,
+                    shard_pages=args.shard_pages,
+                    details=args.details,
+                    listing_index=args.listing_index,
+                    quotes=args.quotes,
+                    rebuild_tag_index=args.rebuild_tag_index,
+                )
+            except CrawlInterrupted as e:
+                print(f"❌ {e}. Partial output kept; rerun with --resume to continue.")
+                sys.exit(1)
+    finally:
+        if profiler:
+            profiler.disable()
+            if per_thread_profiles:
+                threading.setprofile(None)
+            stats = pstats.Stats(profiler)
+            for thread_profiler in thread_profilers:
+                stats.add(thread_profiler)
+            stats.dump_stats(args.profile)
+            pipeline_metrics.set_gauge(
+                "tracemalloc_peak_bytes", tracemalloc.get_traced_memory()[1]
+            )
+            tracemalloc.stop()
+            print(f"🔬 Profile saved to: {args.profile}")
+
+        if work_cache:
+            print(f"💾 Cache: {work_cache.hits} hits, {work_cache.misses} misses")
+            pipeline_metrics.set_gauge("cache_hits", work_cache.hits)
+            pipeline_metrics.set_gauge("cache_misses", work_cache.misses)
+            work_cache.close()
+
+        pipeline_metrics.print_summary()
+        if args.metrics_out:
+            pipeline_metrics.write_json(args.metrics_out)
+            print(f"📊 Metrics saved to: {args.metrics_out}")
+        if args.metrics_prom:
+            pipeline_metrics.write_prometheus(args.metrics_prom)
+            print(f"📊 Prometheus metrics saved to: {args.metrics_prom}")
 
 
 if __name__ == "__main__":
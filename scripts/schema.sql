@@ -22,5 +22,69 @@ CREATE TABLE IF NOT EXISTS fics (
     base_plot INTEGER,
     base_romance INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    mood_fluff INTEGER NOT NULL DEFAULT 0,
+    mood_angst INTEGER NOT NULL DEFAULT 0,
+    mood_spicy INTEGER NOT NULL DEFAULT 0,
+    rand_key INTEGER NOT NULL DEFAULT 0
 );
+
+-- Random pick: seek to the first rand_key at or after a random start
+CREATE INDEX IF NOT EXISTS fics_rand_key_idx ON fics (rand_key);
+CREATE INDEX IF NOT EXISTS fics_mood_fluff_rand_key_idx ON fics (mood_fluff, rand_key);
+CREATE INDEX IF NOT EXISTS fics_mood_angst_rand_key_idx ON fics (mood_angst, rand_key);
+CREATE INDEX IF NOT EXISTS fics_mood_spicy_rand_key_idx ON fics (mood_spicy, rand_key);
+
+-- The /api/fics listing indexes (one per sort, keyed on (column, id) for
+-- keyset paging) are created by the ETL after each load; see LISTING_INDEXES
+-- in etl/sql.py
+
+-- Listing totals per rating/status/word bucket, rebuilt by the ETL after each
+-- load so filtered listings never count(*) the table ('' = missing value)
+CREATE TABLE IF NOT EXISTS fic_counts (
+    rating TEXT NOT NULL,
+    status TEXT NOT NULL,
+    word_bucket TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (rating, status, word_bucket)
+);
+
+-- Tag index: tags interned by the ETL (ids derive from the name) and the
+-- fic <-> tag pairs of each fic, replaced whenever its tags are written
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS tags_name_idx ON tags (name);
+CREATE INDEX IF NOT EXISTS tags_kind_name_idx ON tags (kind, name);
+
+CREATE TABLE IF NOT EXISTS fic_tags (
+    fic_id TEXT NOT NULL,
+    tag_id INTEGER NOT NULL,
+    PRIMARY KEY (fic_id, tag_id)
+);
+CREATE INDEX IF NOT EXISTS fic_tags_tag_id_idx ON fic_tags (tag_id, fic_id);
+
+-- Full-text index over title, author, summary and flattened tags; rowid is
+-- the numeric fic id. Tags are split on '/', '&', '(' etc. so relationship
+-- and character tags match by name; porter folds plurals ("lovers"), and
+-- remove_diacritics folds accents
+CREATE VIRTUAL TABLE IF NOT EXISTS fics_fts USING fts5(
+    title,
+    author,
+    summary,
+    tags,
+    tokenize = 'porter unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+-- Filter facet counts: one row per rating, status, word bucket and tag (under
+-- its kind), kept current by each load; top tags come off facet_count_idx
+CREATE TABLE IF NOT EXISTS fic_facets (
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (facet, value)
+);
+CREATE INDEX IF NOT EXISTS fic_facets_facet_count_idx ON fic_facets (facet, count);
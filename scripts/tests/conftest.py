@@ -0,0 +1,28 @@
+import functools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402
+import etl_pipeline as etl  # noqa: E402
+
+
+@pytest.fixture
+def corpus():
+    return benchmark.make_corpus(60)
+
+
+@pytest.fixture
+def stand_in(corpus, monkeypatch):
+    """Local AO3 stand-in; every SessionPool (including main()'s) talks to it."""
+    with benchmark.AO3StandIn(corpus) as server:
+        adapters = {benchmark.AO3_URL: server.adapter()}
+        monkeypatch.setattr(
+            etl, "SessionPool", functools.partial(etl.SessionPool, adapters=adapters)
+        )
+        monkeypatch.setattr("etl.session.session_pool", etl.SessionPool(size=2))
+        monkeypatch.setattr("etl.cache.work_cache", None)
+        yield server
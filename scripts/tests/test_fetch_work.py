@@ -0,0 +1,38 @@
+import AO3
+import pytest
+
+import etl_pipeline as etl
+
+
+def test_fetch_work_scores_freeform_tags(stand_in, corpus, monkeypatch):
+    def load_chapters(self):
+        raise AssertionError("chapter text parsed")
+
+    monkeypatch.setattr(AO3.Work, "load_chapters", load_chapters)
+    work = max(corpus, key=lambda w: len(w["tags"]))
+
+    fic = etl.fetch_work(work["id"], governor=etl.RequestGovernor(rate=None))
+
+    assert fic.tags == work["tags"]
+    assert fic.tag_kinds == ["freeform"] * len(work["tags"])
+    rating = etl.map_rating(work["rating"])
+    assert fic.state == etl.calculate_metrics(work["tags"], rating, work["words"])
+    assert fic.stats.chapters == work["chapters"]
+
+
+def test_failed_detail_fetch_leaves_the_quote_unset(stand_in, corpus, monkeypatch):
+    governor = etl.RequestGovernor(rate=None)
+    fics = [etl.fetch_work(work["id"], governor=governor) for work in corpus[:3]]
+    monkeypatch.setattr("etl.crawl.fetch_batch", lambda work_ids, **kwargs: [])
+
+    written, refresh = etl.refresh_details(fics, etl.ListingIndex())
+
+    assert written == fics and refresh == []
+    assert [fic.quote for fic in written] == [None] * 3
+    etl.attach_quotes(written, governor)
+    assert [fic.quote for fic in written] == [None] * 3
+
+
+def test_search_quotes_need_details(tmp_path):
+    with pytest.raises(ValueError, match="details=True"):
+        etl.run_pipeline("weekly", str(tmp_path / "import.sql"), "sql", quotes=True)
@@ -0,0 +1,189 @@
+import email.utils
+import random
+import threading
+
+import AO3
+import pytest
+import requests
+
+import etl_pipeline as etl
+
+
+class FakeClock:
+    """Stands in for the time module in etl.governor; sleeping advances it."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def time(self):
+        return 1_700_000_000.0 + self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("etl.governor.time", clock)
+    # Backoff jitter at its midpoint: delay = 3/4 of the ceiling
+    monkeypatch.setattr(random, "uniform", lambda low, high: (low + high) / 2)
+    return clock
+
+
+def fake_response(status: int, retry_after=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = b""
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+def failing(*statuses, result="ok", retry_after=None):
+    """A request that gets the given responses first, recorded as SessionPool does."""
+    remaining = list(statuses)
+    calls = []
+
+    def fn():
+        calls.append(len(calls))
+        if remaining:
+            etl.SessionPool._record_response(fake_response(remaining.pop(0), retry_after))
+            raise RuntimeError("AO3 said no")
+        etl.SessionPool._record_response(fake_response(200))
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+def test_parse_retry_after_seconds_and_http_date(clock):
+    assert etl.parse_retry_after("120") == 120.0
+    assert etl.parse_retry_after(" 5 ") == 5.0
+    later = email.utils.formatdate(clock.time() + 90, usegmt=True)
+    assert etl.parse_retry_after(later) == pytest.approx(90, abs=1)
+    earlier = email.utils.formatdate(clock.time() - 90, usegmt=True)
+    assert etl.parse_retry_after(earlier) == 0.0
+    assert etl.parse_retry_after("soon") is None
+    assert etl.parse_retry_after("") is None
+    assert etl.parse_retry_after(None) is None
+
+
+def test_token_bucket_paces_requests(clock):
+    bucket = etl.TokenBucket(rate=2.0)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.5)
+    clock.now += 10
+    # Capacity 1: idle time does not bank a burst
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.5)
+
+
+def test_aimd_rate(clock):
+    governor = etl.RequestGovernor(rate=1.0)
+    assert (governor.max_rate, governor.min_rate) == (2.0, 0.1)
+
+    governor.success()
+    assert governor.rate == pytest.approx(1.05)
+    governor.throttled()
+    assert governor.rate == pytest.approx(0.525)
+    for _ in range(10):
+        governor.throttled()
+    assert governor.rate == pytest.approx(0.1)
+    for _ in range(100):
+        governor.success()
+    assert governor.rate == pytest.approx(2.0)
+
+
+def test_backoff_is_exponential_capped_and_honours_retry_after(clock):
+    governor = etl.RequestGovernor(base_backoff=2.0, max_backoff=20.0)
+    assert [governor.backoff(attempt) for attempt in range(5)] == [1.5, 3.0, 6.0, 12.0, 15.0]
+    assert governor.backoff(0, retry_after=30) == 30
+    assert governor.backoff(3, retry_after=1) == 12.0
+
+
+def test_call_retries_throttled_requests_after_retry_after(clock):
+    governor = etl.RequestGovernor(base_backoff=2.0, breaker_threshold=10)
+    fn = failing(429, 503, retry_after="7")
+
+    assert governor.call(fn, "Page 1 fetch") == "ok"
+    assert len(fn.calls) == 3
+    # Retry-After (7s) beats the 1.5s/3s backoff
+    assert clock.sleeps == [7.0, 7.0]
+    assert governor._throttles == 0
+
+
+def test_call_backs_off_on_plain_errors_without_throttling(clock):
+    governor = etl.RequestGovernor(rate=None, base_backoff=2.0)
+    fn = failing(500, 500)
+
+    assert governor.call(fn, "Work 1") == "ok"
+    assert clock.sleeps == [1.5, 3.0]
+    assert governor._throttles == 0
+
+
+def test_call_gives_up_after_max_attempts(clock):
+    governor = etl.RequestGovernor(max_attempts=3, breaker_threshold=10)
+    fn = failing(500, 500, 500, 500)
+    with pytest.raises(RuntimeError):
+        governor.call(fn, "Work 1")
+    assert len(fn.calls) == 3
+
+
+def test_call_does_not_retry_permanent_errors(clock):
+    governor = etl.RequestGovernor()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise AO3.utils.InvalidIdError("gone")
+
+    with pytest.raises(AO3.utils.InvalidIdError):
+        governor.call(fn, "Work 1")
+    assert calls == [1]
+    assert clock.sleeps == []
+
+
+def test_breaker_opens_after_consecutive_throttles(clock):
+    governor = etl.RequestGovernor(breaker_threshold=3, breaker_cooldown=60.0)
+    governor.throttled()
+    governor.throttled(retry_after=5)
+    assert governor.acquire() == 0
+
+    governor.throttled(retry_after=5)
+    # Open: every caller waits out the cooldown before its next request
+    assert governor.acquire() == pytest.approx(60.0)
+    assert governor.acquire() == 0
+
+    # A longer Retry-After keeps it open for longer
+    governor.success()
+    for _ in range(3):
+        governor.throttled(retry_after=300)
+    assert governor.acquire() == pytest.approx(300.0)
+
+
+def test_success_resets_the_breaker_count(clock):
+    governor = etl.RequestGovernor(breaker_threshold=3)
+    for _ in range(5):
+        governor.throttled()
+        governor.throttled()
+        governor.success()
+    assert governor.acquire() == 0
+
+
+def test_stop_ends_breaker_and_retry_waits(clock):
+    governor = etl.RequestGovernor(breaker_threshold=1, breaker_cooldown=3600.0)
+    governor.throttled()
+    stop = threading.Event()
+    stop.set()
+
+    with pytest.raises(InterruptedError):
+        governor.call(failing(), "Page 2 fetch", stop)
+    assert clock.sleeps == []
@@ -0,0 +1,71 @@
+import base64
+import json
+import sqlite3
+
+import pytest
+
+import etl_pipeline as etl
+
+
+def api_page(conn, sort, rating=None, status=None, offset=0, cursor=None, limit=10):
+    """The rows of an /api/fics page, as src/pages/api/fics/index.ts queries them."""
+    column, ascending = etl.SHARD_SORTS[sort]
+    direction, seek = ("ASC", ">") if ascending else ("DESC", "<")
+    where, args = [], []
+    if rating:
+        where.append("rating = ?")
+        args.append(rating)
+    if status:
+        where.append("status = ?")
+        args.append(status)
+    total = conn.execute(
+        f"SELECT count(*) FROM fics {'WHERE ' + ' AND '.join(where) if where else ''}", args
+    ).fetchone()[0]
+    if cursor:
+        where.append(f"({column}, id) {seek} (?, ?)")
+        args += json.loads(base64.b64decode(cursor))
+        offset = 0
+    rows = conn.execute(
+        f"SELECT id FROM fics {'WHERE ' + ' AND '.join(where) if where else ''} "
+        f"ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?",
+        args + [limit, offset],
+    ).fetchall()
+    return total, [row[0] for row in rows]
+
+
+@pytest.fixture
+def shards(stand_in, tmp_path):
+    db_path = str(tmp_path / "caitvi.sqlite")
+    etl.run_pipeline("full", db_path, "sqlite", min_kudos=0, page_limit=3, page_delay=0)
+    etl.export_json_shards(db_path, str(tmp_path / "shards"), page_size=10, max_pages=2)
+    conn = sqlite3.connect(db_path)
+    yield tmp_path / "shards", conn
+    conn.close()
+
+
+@pytest.mark.parametrize("sort", etl.SHARD_SORTS)
+@pytest.mark.parametrize("rating,status", [(None, None), ("E", None), (None, "ongoing"), ("M", "completed")])
+def test_shards_hand_over_to_the_api(shards, sort, rating, status):
+    shard_dir, conn = shards
+    listing = shard_dir / "listing" / sort / (rating or "all") / (status or "all")
+    total, expected = api_page(conn, sort, rating, status, limit=1000)
+
+    # Shard pages, then the API from the last shard's cursor or offset, as the hook does
+    seen, offset, cursor, has_more = [], 0, None, True
+    while (listing / f"{offset}.json").exists():
+        page = json.loads((listing / f"{offset}.json").read_text())
+        if offset == 0:
+            assert page["total"] == total
+        assert [fic["id"] for fic in page["items"]] == api_page(conn, sort, rating, status, offset)[1]
+        seen += [fic["id"] for fic in page["items"]]
+        offset, cursor, has_more = page["nextOffset"], page.get("nextCursor"), page["hasMore"]
+    if sort == "default":
+        assert cursor is None
+    while has_more:
+        ids = api_page(conn, sort, rating, status, offset, cursor, limit=11)[1]
+        has_more = len(ids) > 10
+        seen += ids[:10]
+        offset += len(ids[:10])
+        cursor = None
+
+    assert seen == expected
@@ -0,0 +1,103 @@
+import glob
+import os
+import sqlite3
+
+import etl_pipeline as etl
+
+DRIZZLE_DIR = os.path.join(os.path.dirname(os.path.dirname(etl.SCHEMA_PATH)), "drizzle")
+MIGRATIONS = sorted(
+    os.path.basename(path)[:4] for path in glob.glob(os.path.join(DRIZZLE_DIR, "0*.sql"))
+)
+
+
+def migrate(conn, *numbers):
+    """Apply drizzle migrations as wrangler does, one statement at a time."""
+    for number in numbers:
+        (path,) = glob.glob(os.path.join(DRIZZLE_DIR, f"{number}_*.sql"))
+        with open(path, encoding="utf-8") as f:
+            for statement in f.read().split("--> statement-breakpoint"):
+                conn.executescript(statement)
+
+
+def d1_database(*skip):
+    """A D1 stand-in with some existing fics rows and every migration but skip."""
+    conn = sqlite3.connect(":memory:")
+    migrate(conn, *(n for n in MIGRATIONS if n not in skip))
+    conn.executemany(
+        "INSERT INTO fics (id,title,author,link,summary,rating,status,words,tags_json) "
+        "VALUES (?,?,'someone','l','A summary.','T','Completed',1000,?)",
+        [(str(i), f"Old fic {i}", f'["Old Tag {i % 3}"]') for i in range(1, 6)],
+    )
+    return conn
+
+
+def crawl_and_load(conn, tmp_path, *args):
+    etl.main(
+        [
+            "--mode", "full", "--min-kudos", "0", "--pages", "2", "--rate", "1000000", "--no-cache",
+            "--output", str(tmp_path / "import.sql"),
+            "--delta-against", str(tmp_path / "snapshot.json"),
+            *args,
+        ]
+    )
+    for path in sorted(glob.glob(str(tmp_path / "import*.sql"))):
+        with open(path, encoding="utf-8") as f:
+            conn.executescript(f.read())
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def test_load_builds_a_missing_fts_index(stand_in, tmp_path):
+    conn = d1_database("0002")
+    crawl_and_load(conn, tmp_path)
+
+    assert count(conn, "fics_fts") == count(conn, "fics") > 5
+    assert conn.execute(
+        "SELECT rowid FROM fics_fts WHERE fics_fts MATCH 'old AND fic AND tag'"
+    ).fetchall() == [(i,) for i in range(1, 6)]
+
+    # The migration, applied after the load, leaves the index alone
+    migrate(conn, "0002")
+    assert count(conn, "fics_fts") == count(conn, "fics")
+
+
+def test_listing_migration_after_a_load(stand_in, tmp_path):
+    conn = d1_database("0004")
+    crawl_and_load(conn, tmp_path)
+    totals = conn.execute("SELECT * FROM fic_counts ORDER BY 1, 2, 3").fetchall()
+    assert sum(row[3] for row in totals) == count(conn, "fics")
+
+    migrate(conn, "0004")
+    assert conn.execute("SELECT * FROM fic_counts ORDER BY 1, 2, 3").fetchall() == totals
+
+
+def test_load_counts_missing_facets(stand_in, tmp_path):
+    conn = d1_database("0005")
+    crawl_and_load(conn, tmp_path)
+    facets = conn.execute("SELECT * FROM fic_facets ORDER BY 1, 2").fetchall()
+    recount = conn.execute(f"{etl.facet_select_sql('fics')} ORDER BY 1, 2").fetchall()
+    assert facets == recount
+    # Rows already in the database are counted before the load's own changes
+    assert {(f, v): n for f, v, n in facets}[("rating", "T")] >= 5
+
+    migrate(conn, "0005")
+    assert conn.execute("SELECT * FROM fic_facets ORDER BY 1, 2").fetchall() == facets
+
+
+def test_sqlite_export_sets_up_missing_tables(stand_in, tmp_path):
+    conn = d1_database("0002", "0005")
+    etl.main(
+        [
+            "--mode", "full", "--min-kudos", "0", "--pages", "2", "--rate", "1000000", "--no-cache",
+            "--format", "sqlite", "--output", str(tmp_path / "caitvi.sqlite"),
+            "--sqlite-export", str(tmp_path / "import.sql"),
+        ]
+    )
+    with open(tmp_path / "import.sql", encoding="utf-8") as f:
+        conn.executescript(f.read())
+
+    assert count(conn, "fics_fts") == count(conn, "fics") > 5
+    facets = conn.execute("SELECT * FROM fic_facets ORDER BY 1, 2").fetchall()
+    assert facets == conn.execute(f"{etl.facet_select_sql('fics')} ORDER BY 1, 2").fetchall()
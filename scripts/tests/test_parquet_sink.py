@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import etl_pipeline as etl
+
+
+search_pages = etl.iter_search_pages
+
+
+def interrupt_after(pages: int):
+    """iter_search_pages that fails on the search page after `pages`."""
+
+    def iter_pages(**kwargs):
+        for page, fics in search_pages(**kwargs):
+            if page > pages:
+                raise etl.CrawlInterrupted(page)
+            yield page, fics
+
+    return iter_pages
+
+
+def crawl(output, **kwargs):
+    return etl.run_pipeline(
+        "full", str(output), "parquet", min_kudos=0, page_limit=3, page_delay=0, **kwargs
+    )
+
+
+def load_table(output):
+    from pyiceberg.catalog.sql import SqlCatalog
+
+    warehouse = os.path.abspath(output)
+    catalog = SqlCatalog(
+        "caitvi",
+        uri=f"sqlite:///{os.path.join(warehouse, 'catalog.db')}",
+        warehouse=f"file://{warehouse}",
+    )
+    return catalog.load_table(etl.SNAPSHOT_TABLE)
+
+
+def test_interrupted_run_commits_once_on_resume(stand_in, corpus, tmp_path, monkeypatch):
+    output = tmp_path / "warehouse"
+
+    monkeypatch.setattr(etl, "iter_search_pages", interrupt_after(2))
+    with pytest.raises(etl.CrawlInterrupted):
+        crawl(output)
+
+    # Nothing committed; the two crawled pages stay staged for the resume
+    assert load_table(output).current_snapshot() is None
+    assert len(os.listdir(output / "staging")) == 2
+    assert os.path.exists(f"{output}.checkpoint.json")
+
+    monkeypatch.setattr(etl, "iter_search_pages", search_pages)
+    assert crawl(output, resume=True) == len(corpus)
+
+    table = load_table(output)
+    assert len(table.snapshots()) == 1
+    ids = table.scan().to_arrow().column("id").to_pylist()
+    assert sorted(ids) == sorted(str(work["id"]) for work in corpus)
+    assert not os.listdir(output / "staging")
+    assert not os.path.exists(f"{output}.checkpoint.json")
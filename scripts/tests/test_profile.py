@@ -0,0 +1,25 @@
+import pstats
+
+import etl_pipeline as etl
+
+
+def test_profile_with_worker_threads(stand_in, corpus, tmp_path):
+    profile = tmp_path / "run.prof"
+    output = tmp_path / "out.sql"
+    work_ids = ",".join(str(work["id"]) for work in corpus[:8])
+
+    etl.main([
+        "--mode", "batch",
+        "--work-ids", work_ids,
+        "--workers", "4",
+        "--rate", "1000000",
+        "--no-cache",
+        "--output", str(output),
+        "--profile", str(profile),
+    ])
+
+    # Every work was fetched on the pool's threads, and their calls were profiled
+    assert output.read_text(encoding="utf-8").count("INSERT") >= 1
+    assert stand_in.requests >= 8
+    functions = {name for _, _, name in pstats.Stats(str(profile)).stats}
+    assert "fetch_work" in functions
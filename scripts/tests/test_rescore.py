@@ -0,0 +1,115 @@
+import json
+import re
+import sqlite3
+
+import numpy as np
+import pytest
+
+import benchmark
+import etl_pipeline as etl
+from test_tag_rules import ADVERSARIAL_TAGS
+
+
+def corpus_inputs(size=300):
+    tag_lists, ratings, words = [], [], []
+    for work in benchmark.make_corpus(size, seed=3):
+        tag_lists.append(work["characters"] + work["tags"])
+        ratings.append(etl.map_rating(work["rating"]))
+        words.append(work["words"])
+    return tag_lists, ratings, words
+
+
+def test_score_matrix_matches_calculate_metrics():
+    tag_lists, ratings, words = corpus_inputs()
+    tag_lists += ADVERSARIAL_TAGS
+    ratings += ["E", "M", "T", "G"] * (len(ADVERSARIAL_TAGS) // 4) + ["T"] * (
+        len(ADVERSARIAL_TAGS) % 4
+    )
+    words += [0, 5001, 20001, 60000] * (len(ADVERSARIAL_TAGS) // 4) + [10001] * (
+        len(ADVERSARIAL_TAGS) % 4
+    )
+
+    scores = etl.score_matrix(tag_lists, ratings, words)
+
+    expected = [
+        [getattr(etl.calculate_metrics(t, r, w), m) for m in etl.METRICS]
+        for t, r, w in zip(tag_lists, ratings, words)
+    ]
+    np.testing.assert_array_equal(scores, np.array(expected))
+
+
+def test_score_matrix_of_no_fics():
+    assert etl.score_matrix([], [], []).shape == (0, len(etl.METRICS))
+
+
+@pytest.fixture
+def export(tmp_path):
+    """wrangler --json export where every third row has stale scores."""
+    tag_lists, ratings, words = corpus_inputs(60)
+    rows = []
+    for i, (tags, rating, word_count) in enumerate(zip(tag_lists, ratings, words)):
+        state = etl.calculate_metrics(tags, rating, word_count)
+        row = {
+            "id": str(1000 + i),
+            "tags_json": json.dumps(tags),
+            "rating": rating,
+            "words": word_count,
+        }
+        for metric in etl.METRICS:
+            row[f"base_{metric}"] = getattr(state, metric)
+        if i % 3 == 0:
+            row["base_angst"] = 6 - row["base_angst"] if row["base_angst"] != 3 else 1
+        rows.append(row)
+    path = tmp_path / "fics_export.json"
+    path.write_text(json.dumps([{"results": rows, "success": True}]))
+    return path, rows
+
+
+def test_rescore_writes_narrow_updates_of_changed_rows(export, tmp_path):
+    path, rows = export
+    output = tmp_path / "rescore.sql"
+
+    assert etl.run_rescore(str(path), str(output)) == len(rows[::3])
+
+    statements = [
+        line for line in output.read_text().splitlines() if line and not line.startswith("--")
+    ]
+    pattern = re.compile(
+        r"UPDATE fics SET base_angst=\d,mood_fluff=[01],mood_angst=[01],mood_spicy=[01],"
+        r"updated_at=CURRENT_TIMESTAMP WHERE id='(\d+)';"
+    )
+    updated = [pattern.fullmatch(s).group(1) for s in statements]
+    assert updated == [row["id"] for row in rows[::3]]
+
+    # Applied to the exported table, every row ends up with fresh scores
+    conn = sqlite3.connect(":memory:")
+    with open(etl.SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    columns = list(rows[0])
+    conn.executemany(
+        f"INSERT INTO fics (title,author,link,{','.join(columns)}) "
+        f"VALUES ('t','a','l',{','.join('?' for _ in columns)})",
+        [tuple(row.values()) for row in rows],
+    )
+    conn.executescript(output.read_text())
+    for row in rows:
+        state = etl.calculate_metrics(json.loads(row["tags_json"]), row["rating"], row["words"])
+        stored = conn.execute(
+            f"SELECT {','.join(etl.SCORE_COLUMNS)} FROM fics WHERE id = ?", (row["id"],)
+        ).fetchone()
+        assert stored == tuple(getattr(state, m) for m in etl.METRICS)
+
+
+def test_rescore_of_current_scores_writes_nothing(export, tmp_path):
+    path, rows = export
+    first, second = tmp_path / "first.sql", tmp_path / "second.sql"
+    etl.run_rescore(str(path), str(first))
+
+    fresh = [dict(row) for row in rows]
+    for row in fresh:
+        state = etl.calculate_metrics(json.loads(row["tags_json"]), row["rating"], row["words"])
+        row.update({f"base_{m}": getattr(state, m) for m in etl.METRICS})
+    path.write_text(json.dumps(fresh))
+
+    assert etl.run_rescore(str(path), str(second)) == 0
+    assert "UPDATE" not in second.read_text()
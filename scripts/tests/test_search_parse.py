@@ -0,0 +1,68 @@
+import os
+
+import AO3
+import AO3.search
+import pytest
+from bs4 import BeautifulSoup
+
+import etl_pipeline as etl
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def ao3_api_records(content: bytes, monkeypatch) -> tuple[list[dict], int]:
+    """The page parsed by ao3-api's own AO3.Search.update (the fallback path)."""
+    monkeypatch.setattr(
+        AO3.search, "search", lambda *args, **kwargs: BeautifulSoup(content, features="lxml")
+    )
+    search = AO3.Search(any_field="Caitlyn/Vi")
+    search.update()
+    return [etl.search_result_to_record(r) for r in search.results], search.total_results
+
+
+@pytest.mark.parametrize("name", ["search_page.html", "search_page_empty.html"])
+def test_fast_parse_matches_ao3_api(name, monkeypatch):
+    content = fixture(name)
+    assert etl.parse_search_page(content) == ao3_api_records(content, monkeypatch)
+
+
+def test_fast_parse_fields():
+    records, total = etl.parse_search_page(fixture("search_page.html"))
+    assert total == 1234
+    wip, oneshot, anonymous = records
+
+    assert wip["id"] == 51234567
+    assert wip["title"] == "Sheriff & the Enforcer"
+    assert wip["authors"] == ["inkwell", "hextech_nerd"]
+    assert wip["fandoms"] == ["Arcane: League of Legends (Cartoon 2021)", "League of Legends"]
+    assert wip["relationships"] == ["Caitlyn/Vi (League of Legends)", "Jinx & Vi (League of Legends)"]
+    assert wip["characters"] == ["Vi (League of Legends)", "Caitlyn (League of Legends)"]
+    assert wip["tags"] == ["Slow Burn", "Hurt/Comfort", "Smut"]
+    assert wip["rating"] == "Explicit"
+    assert wip["categories"] == ["F/F", "Multi"]
+    # "12/?": ao3-api leaves the status unset without an expected chapter count
+    assert (wip["words"], wip["nchapters"], wip["status"]) == (123456, 12, None)
+    assert wip["summary"] == (
+        "\nCaitlyn is the new Sheriff of Piltover. Vi is not impressed.\n"
+        "Or: the one where they solve crimes & fall in love, slowly.\n"
+    )
+    assert (wip["kudos"], wip["hits"], wip["comments"], wip["bookmarks"]) == (12345, 234567, 1024, 1002)
+    assert wip["date_updated"] == "2025-03-12"
+
+    assert (oneshot["nchapters"], oneshot["status"], oneshot["comments"]) == (1, "Completed", None)
+    assert anonymous["authors"] == []
+    assert anonymous["summary"] is None
+    assert (anonymous["words"], anonymous["kudos"], anonymous["bookmarks"]) == (1048576, None, None)
+
+
+def test_empty_results_page():
+    assert etl.parse_search_page(fixture("search_page_empty.html")) == ([], 0)
+
+
+def test_unrecognized_page_falls_back():
+    assert etl.parse_search_page(b"<html><body><p>Retry later</p></body></html>") is None
@@ -0,0 +1,56 @@
+import json
+import threading
+import time
+
+import AO3
+
+import etl_pipeline as etl
+
+
+def saved_login(tmp_path, username="vi"):
+    path = tmp_path / "session.json"
+    path.write_text(
+        json.dumps(
+            {
+                "username": username,
+                "saved_at": time.time(),
+                "cookies": [
+                    {
+                        "name": "_otwarchive_session",
+                        "value": "abc",
+                        "domain": "archiveofourown.org",
+                        "path": "/",
+                        "expires": None,
+                        "secure": True,
+                    }
+                ],
+            }
+        )
+    )
+    return str(path)
+
+
+def test_saved_cookies_restore_the_login_without_posting(tmp_path, monkeypatch):
+    def login(*args, **kwargs):
+        raise AssertionError("logged in with the password")
+
+    monkeypatch.setattr(AO3.Session, "__init__", login)
+    pool = etl.SessionPool("vi", "hunter2", size=2, cookie_path=saved_login(tmp_path))
+
+    sessions = [pool.get()]
+    thread = threading.Thread(target=lambda: sessions.append(pool.get()))
+    thread.start()
+    thread.join()
+
+    for session in sessions:
+        assert isinstance(session, AO3.Session)
+        assert session.is_authed and session.username == "vi"
+        assert session.session.cookies.get("_otwarchive_session") == "abc"
+    assert sessions[0].session is not sessions[1].session
+
+
+def test_login_saved_for_another_user_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(AO3, "Session", lambda username, password: AO3.GuestSession())
+    pool = etl.SessionPool("jinx", "hunter2", cookie_path=saved_login(tmp_path))
+
+    assert not pool.get().is_authed
@@ -0,0 +1,27 @@
+import time
+
+import etl_pipeline as etl
+
+
+def test_closing_stops_bands_waiting_to_retry(stand_in, monkeypatch):
+    fetch = etl.fetch_search_page
+
+    def flaky(search, params, page):
+        if page > 1:
+            raise RuntimeError("AO3 is down")
+        return fetch(search, params, page)
+
+    monkeypatch.setattr("etl.crawl.fetch_search_page", flaky)
+    # Retries back off for 30-60s
+    governor = etl.RequestGovernor(None, base_backoff=60.0)
+    pages = etl.iter_sharded_pages(
+        {"tags": etl.CAITVI_TAGS},
+        workers=1,
+        progress={"bands": [[0, None], [0, None]], "completed": []},
+        governor=governor,
+    )
+
+    assert next(pages)[1]
+    start = time.monotonic()
+    pages.close()
+    assert time.monotonic() - start < 5
@@ -0,0 +1,278 @@
+import sqlite3
+
+import pytest
+
+import etl_pipeline as etl
+
+
+def make_row(fic_id="1", **changes):
+    state = etl.FicState(spice=3, angst=4, fluff=2, plot=5, romance=4)
+    fic = etl.FicData(
+        id=fic_id,
+        title="Sheriff & the Enforcer",
+        author="inkwell",
+        link=f"https://archiveofourown.org/works/{fic_id}",
+        summary="Caitlyn is the new Sheriff. Vi is not impressed.",
+        rating="E",
+        category="F/F",
+        status="Ongoing",
+        is_translated=False,
+        tags=["Caitlyn/Vi (League of Legends)", "Slow Burn"],
+        stats=etl.FicStats(words=120000, chapters=12, kudos=100, hits=2000, comments=10, bookmarks=5),
+        state=state,
+        quote="It's not that simple.",
+    )
+    row = etl.fic_to_row(fic)
+    row.update(changes)
+    return row
+
+
+def statements_of(paths):
+    """Statements of the SQL files, each ending in its semicolon."""
+    lines = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            lines += [line for line in f.read().splitlines() if not line.startswith("--")]
+    text = "\n".join(lines) + "\n"
+    return [s.strip() + ";" for s in text.split(";\n") if s.strip()]
+
+
+# ============== DeltaSnapshot ==============
+
+
+def test_diff_of_new_unchanged_and_changed_rows():
+    snapshot = etl.DeltaSnapshot()
+    assert snapshot.diff(make_row()) is None
+    assert snapshot.diff(make_row()) == []
+    assert snapshot.diff(make_row(kudos=101, title="Sheriff")) == ["title", "kudos"]
+    assert snapshot.diff(make_row(kudos=101, title="Sheriff")) == []
+    assert snapshot.touched == {"1"}
+
+
+def test_update_columns_rehashes_the_fic():
+    snapshot = etl.DeltaSnapshot()
+    assert snapshot.update_columns("1", {"kudos": 1}) is None
+    assert "1" not in snapshot.fics
+
+    snapshot.diff(make_row())
+    assert snapshot.update_columns("1", {"kudos": 100, "hits": 2000}) == []
+    assert snapshot.update_columns("1", {"kudos": 150, "hits": 2000}) == ["kudos"]
+    # The stored hash now describes the refreshed row
+    assert snapshot.diff(make_row(kudos=150)) == []
+    assert snapshot.diff(make_row(kudos=100)) == ["kudos"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    snapshot = etl.DeltaSnapshot()
+    for fic_id in ("1", "2"):
+        snapshot.diff(make_row(fic_id))
+    snapshot.save(path)
+
+    loaded = etl.DeltaSnapshot.load(path)
+    assert loaded.fics == snapshot.fics
+    assert loaded.touched == set()
+    assert loaded.diff(make_row("1")) == []
+    assert loaded.diff(make_row("2", quote="")) == ["quote"]
+
+
+def test_unfetched_quote_is_never_a_change():
+    snapshot = etl.DeltaSnapshot()
+    snapshot.diff(make_row())
+    assert snapshot.diff(make_row(quote=None)) == []
+    assert snapshot.diff(make_row(quote=None, kudos=101)) == ["kudos"]
+    # The snapshot still holds the stored quote
+    assert snapshot.diff(make_row(kudos=101)) == []
+
+
+def test_missing_snapshot_treats_every_fic_as_new(tmp_path):
+    snapshot = etl.DeltaSnapshot.load(str(tmp_path / "missing.json"))
+    assert snapshot.diff(make_row()) is None
+
+
+def test_delta_sink_writes_narrow_updates_and_skips_unchanged(tmp_path):
+    snapshot = etl.DeltaSnapshot()
+    snapshot.diff(make_row("1"))
+    snapshot.diff(make_row("2"))
+    output = tmp_path / "import.sql"
+    sink = etl.SqlSink(str(output), snapshot=snapshot)
+
+    for row in (make_row("1", kudos=120, hits=2500), make_row("2"), make_row("3")):
+        sink.write(row, sink.diff(row))
+    sink.writer.close()
+
+    statements = statements_of([output])
+    assert statements[0] == (
+        "UPDATE fics SET kudos=120,hits=2500,"
+        f"{etl.FIC_UPDATE_SUFFIX} WHERE id='1';"
+    )
+    assert statements[1].startswith("INSERT INTO fics (")
+    assert "('3'," in statements[1]
+    assert "'2'" not in output.read_text()
+    assert (sink.inserted, sink.updated, sink.unchanged) == (1, 1, 1)
+
+
+def test_delta_without_changes_writes_no_statements(tmp_path):
+    snapshot = etl.DeltaSnapshot()
+    snapshot.diff(make_row("1"))
+    output = tmp_path / "import.sql"
+    sink = etl.SqlSink(str(output), snapshot=snapshot)
+    row = make_row("1")
+    sink.write(row, sink.diff(row))
+    sink.close()
+
+    # The workflow skips the import when every line is a comment
+    assert statements_of([output]) == []
+    assert all(line.startswith("--") for line in output.read_text().splitlines() if line)
+
+
+def test_only_written_rows_get_new_rand_keys(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    with open(etl.SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    snapshot = etl.DeltaSnapshot()
+
+    def load(*rows):
+        output = tmp_path / "import.sql"
+        sink = etl.SqlSink(str(output), snapshot=snapshot)
+        for row in rows:
+            sink.write(row, sink.diff(row))
+        sink.close()
+        conn.executescript(output.read_text())
+        return dict(conn.execute("SELECT id, rand_key FROM fics"))
+
+    first = load(*(make_row(str(i)) for i in range(50)))
+    assert len(set(first.values())) == 50
+    second = load(make_row("0", kudos=1), *(make_row(str(i)) for i in range(1, 50)))
+    assert second["0"] != first["0"]
+    assert {k: v for k, v in second.items() if k != "0"} == {
+        k: v for k, v in first.items() if k != "0"
+    }
+
+
+def test_loads_keep_the_stored_quote_when_none_was_fetched(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    with open(etl.SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    snapshot = etl.DeltaSnapshot()
+
+    def load(snapshot, row):
+        output = tmp_path / "import.sql"
+        sink = etl.SqlSink(str(output), snapshot=snapshot)
+        sink.write(row, sink.diff(row))
+        sink.close()
+        conn.executescript(output.read_text())
+        return conn.execute("SELECT quote, kudos FROM fics").fetchall()
+
+    assert load(snapshot, make_row()) == [("It's not that simple.", 100)]
+    assert load(snapshot, make_row(quote=None, kudos=101)) == [("It's not that simple.", 101)]
+    # A stale snapshot upserts the whole row
+    assert load(etl.DeltaSnapshot(), make_row(quote=None, kudos=102)) == [
+        ("It's not that simple.", 102)
+    ]
+
+
+# ============== SqlWriter ==============
+
+
+def apply(paths):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            conn.executescript(f.read())
+    return conn.execute("SELECT id, length(v) FROM t ORDER BY id").fetchall()
+
+
+def test_rows_become_multi_row_inserts(tmp_path):
+    writer = etl.SqlWriter(str(tmp_path / "import.sql"), etl.SqlOutputOptions(batch_size=3))
+    for i in range(7):
+        writer.insert("INSERT INTO t (id, v) VALUES", f"({i},'x')")
+    writer.statement("DELETE FROM t WHERE id = 6;")
+    paths = writer.close()
+
+    assert paths == [str(tmp_path / "import.sql")]
+    statements = statements_of(paths)
+    assert [s.count("),\n(") + 1 for s in statements[:3]] == [3, 3, 1]
+    assert statements[3] == "DELETE FROM t WHERE id = 6;"
+    assert writer.rows == 8
+    assert len(apply(paths)) == 6
+
+
+def test_statements_stay_under_the_d1_limit(tmp_path):
+    writer = etl.SqlWriter(str(tmp_path / "import.sql"), etl.SqlOutputOptions(batch_size=1000))
+    big = "y" * 30_000
+    for i in range(7):
+        writer.insert("INSERT INTO t (id, v) VALUES", f"({i},'{big}')")
+    paths = writer.close()
+
+    statements = statements_of(paths)
+    assert [s.count("),\n(") + 1 for s in statements] == [2, 2, 2, 1]
+    assert all(len(s.encode()) <= etl.MAX_STATEMENT_BYTES for s in statements)
+    assert apply(paths) == [(i, 30_000) for i in range(7)]
+
+
+def test_a_row_over_the_limit_is_written_on_its_own(tmp_path):
+    writer = etl.SqlWriter(str(tmp_path / "import.sql"), etl.SqlOutputOptions(batch_size=1000))
+    huge = "z" * (etl.MAX_STATEMENT_BYTES + 1)
+    writer.insert("INSERT INTO t (id, v) VALUES", "(1,'a')")
+    writer.insert("INSERT INTO t (id, v) VALUES", f"(2,'{huge}')")
+    writer.insert("INSERT INTO t (id, v) VALUES", "(3,'c')")
+    paths = writer.close()
+
+    statements = statements_of(paths)
+    assert len(statements) == 3
+    assert statements[0].endswith("(1,'a');") and statements[2].endswith("(3,'c');")
+    assert apply(paths) == [(1, 1), (2, len(huge)), (3, 1)]
+
+
+@pytest.mark.parametrize(
+    "options,rows_per_file",
+    [
+        (etl.SqlOutputOptions(batch_size=2, max_file_rows=4), [4, 4, 2]),
+        # Each chunk of two rows is about 40 bytes
+        (etl.SqlOutputOptions(batch_size=2, max_file_bytes=100), [4, 4, 2]),
+        # Whole chunks only: the last one still fits in the third file
+        (etl.SqlOutputOptions(batch_size=3, max_file_rows=4), [3, 3, 4]),
+    ],
+)
+def test_output_rotates_across_numbered_files(tmp_path, options, rows_per_file):
+    output = tmp_path / "import.sql"
+    (tmp_path / "import.009.sql").write_text("-- stale part from an earlier run\n")
+    (tmp_path / "import.001.sql").write_text("-- stale part from an earlier run\n")
+
+    writer = etl.SqlWriter(str(output), options, header="-- Generated: test\n")
+    for i in range(10):
+        writer.insert("INSERT INTO t (id, v) VALUES", f"({i},'x')")
+    paths = writer.close()
+
+    names = [f"import.{n:03d}.sql" for n in range(1, len(rows_per_file) + 1)]
+    assert paths == [str(tmp_path / name) for name in names]
+    # Only the numbered run starting at 001 is treated as an earlier run's output
+    assert sorted(p.name for p in tmp_path.iterdir()) == names + ["import.009.sql"]
+    for n, (path, rows) in enumerate(zip(paths, rows_per_file), start=1):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        assert text.startswith(f"-- Generated: test\n-- Part: {n}\n")
+        assert text.count("'x')") == rows
+    assert len(apply(paths)) == 10
+
+
+def test_resume_drops_rows_written_after_the_checkpoint(tmp_path):
+    output = str(tmp_path / "import.sql")
+    options = etl.SqlOutputOptions(batch_size=2, max_file_rows=4)
+    writer = etl.SqlWriter(output, options)
+    for i in range(6):
+        writer.insert("INSERT INTO t (id, v) VALUES", f"({i},'x')")
+    checkpoint = writer.state()
+    for i in range(6, 12):
+        writer.insert("INSERT INTO t (id, v) VALUES", f"({i},'x')")
+    writer.flush()
+
+    resumed = etl.SqlWriter(output, options, resume=checkpoint)
+    for i in range(6, 10):
+        resumed.insert("INSERT INTO t (id, v) VALUES", f"({i},'x')")
+    paths = resumed.close()
+
+    assert resumed.rows == 10
+    assert [row_id for row_id, _ in apply(paths)] == list(range(10))
@@ -0,0 +1,44 @@
+import glob
+import sqlite3
+
+import etl_pipeline as etl
+
+
+def crawl(tmp_path, *args):
+    etl.main(
+        [
+            "--mode", "full", "--min-kudos", "0", "--pages", "3", "--rate", "1000000", "--no-cache",
+            "--output", str(tmp_path / "import.sql"),
+            "--delta-against", str(tmp_path / "snapshot.json"),
+            *args,
+        ]
+    )
+
+
+def load(conn, tmp_path):
+    for path in sorted(glob.glob(str(tmp_path / "import*.sql"))):
+        with open(path, encoding="utf-8") as f:
+            conn.executescript(f.read())
+
+
+def test_rebuild_tag_index_covers_unchanged_fics(stand_in, corpus, tmp_path):
+    conn = sqlite3.connect(":memory:")
+    with open(etl.SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    crawl(tmp_path)
+    load(conn, tmp_path)
+    # A database loaded before the tag index existed
+    conn.executescript("DELETE FROM fic_tags; DELETE FROM tags;")
+
+    crawl(tmp_path)
+    load(conn, tmp_path)
+    assert conn.execute("SELECT count(*) FROM fic_tags").fetchone()[0] == 0
+
+    crawl(tmp_path, "--rebuild-tag-index")
+    load(conn, tmp_path)
+    tagged = conn.execute("SELECT count(DISTINCT fic_id) FROM fic_tags").fetchone()[0]
+    assert tagged == len(corpus)
+    facets = conn.execute("SELECT facet, value, count FROM fic_facets ORDER BY 1, 2").fetchall()
+    recount = conn.execute(f"{etl.facet_select_sql('fics')} ORDER BY 1, 2").fetchall()
+    assert facets == recount
+    assert {facet for facet, _, _ in facets} >= {"fandom", "relationship", "freeform"}
@@ -0,0 +1,118 @@
+import pytest
+
+import benchmark
+import etl_pipeline as etl
+
+
+def naive_metrics(tags, rating, word_count, rules=etl.TAG_RULES):
+    """calculate_metrics as it was before CompiledTagRules: every rule, every tag."""
+    scores = {"spice": 1, "angst": 1, "fluff": 1, "plot": 1, "romance": 3}
+    forced_values = {}
+    min_values = {}
+
+    if rating == "E":
+        scores["spice"] = 5
+    elif rating == "M":
+        scores["spice"] = 3
+
+    if word_count > 50000:
+        scores["plot"] = 5
+    elif word_count > 20000:
+        scores["plot"] = 4
+    elif word_count > 10000:
+        scores["plot"] = 3
+    elif word_count > 5000:
+        scores["plot"] = 2
+
+    lower_tags = [t.lower() for t in tags]
+    for tag in lower_tags:
+        for rule_key, rule in rules.items():
+            if rule_key not in tag:
+                continue
+            for action, value in rule.items():
+                if action.endswith("_add"):
+                    scores[action[:-4]] += value
+                elif action.endswith("_min"):
+                    metric = action[:-4]
+                    min_values[metric] = max(min_values.get(metric, 0), value)
+                elif action not in forced_values or value in (1, 5):
+                    forced_values[action] = value
+
+    for metric, min_val in min_values.items():
+        scores[metric] = max(scores[metric], min_val)
+    scores.update(forced_values)
+
+    if scores["angst"] >= 4 and not any("comfort" in t for t in lower_tags):
+        scores["fluff"] -= 1
+
+    return etl.FicState(**{k: max(1, min(5, v)) for k, v in scores.items()})
+
+
+ADVERSARIAL_TAGS = [
+    [],
+    [""],
+    # Case differences
+    ["SMUT", "Slow Burn", "HURT/COMFORT", "Tooth-Rotting Fluff"],
+    # Keywords inside other keywords and words
+    ["Heavy Angst", "Light Angst", "Angst with a Happy Ending", "No Angst"],
+    ["Hurt No Comfort", "hurt/comfort", "Comfort"],
+    ["Sexual Tension", "Sex Pollen", "Unsafe Sex", "Sextoys", "Essex"],
+    ["Porn Without Plot", "PWP", "Porn with Feelings"],
+    ["Pre-Canon", "Post-Canon", "Canon Compliant", "Canon Divergence"],
+    ["Fluff and Angst", "Fluff and Smut", "Domestic Fluff"],
+    ["Major Character Death", "Temporary Character Death", "Dead Dove: Do Not Eat"],
+    # Overlapping matches and repeats across tags
+    ["slow burnslow burn", "angstangstangst", "Slow Burn", "slow burn"],
+    ["Friendship", "Friends to Lovers", "Platonic Relationship", "Established Relationship"],
+    ["Fix-It", "Time Travel Fix-It", "Explicit Sexual Content", "Mature Themes"],
+    # Non-ASCII text around keywords
+    ["Ångst", "Flüff", "Hurt/Comfort — Angst", "soft vi ✨"],
+]
+
+
+@pytest.mark.parametrize("tags", ADVERSARIAL_TAGS)
+@pytest.mark.parametrize("rating,word_count", [("T", 0), ("E", 5001), ("M", 60000)])
+def test_compiled_rules_match_naive_scan(tags, rating, word_count):
+    assert etl.calculate_metrics(tags, rating, word_count) == naive_metrics(
+        tags, rating, word_count
+    )
+
+
+def test_compiled_rules_match_naive_scan_on_corpus():
+    for work in benchmark.make_corpus(500, seed=7):
+        tags = work["fandoms"] + work["relationships"] + work["characters"] + work["tags"]
+        rating = etl.map_rating(work["rating"])
+        assert etl.calculate_metrics(tags, rating, work["words"]) == naive_metrics(
+            tags, rating, work["words"]
+        )
+
+
+def test_custom_rules_match_naive_scan():
+    rules = {
+        "a": {"spice_add": 1},
+        "aa": {"angst_add": 1},
+        "aaa": {"fluff": 5},
+        "ab": {"plot_min": 4},
+        "b": {"romance": 1},
+        "comfort zone": {"fluff_add": 1},
+    }
+    compiled = etl.CompiledTagRules(rules)
+    for tags in (["aaaa"], ["ab", "ba"], ["AAB", "comfort zone"], ["c"], ["aaa", "comfort"]):
+        assert etl.calculate_metrics(tags, "T", 0, compiled) == naive_metrics(
+            tags, "T", 0, rules
+        )
+
+
+@pytest.mark.parametrize(
+    "patterns,text",
+    [
+        (["he", "she", "his", "hers"], "ushers"),
+        (["a", "aa", "aaa"], "aaaa"),
+        (["abc", "bc", "c", "bcd"], "xabcd"),
+        (["hurt/comfort", "comfort", "hurt"], "hurt/comfort"),
+        (["", "x"], "abc"),
+    ],
+)
+def test_matcher_finds_every_substring(patterns, text):
+    expected = tuple(i for i, pattern in enumerate(patterns) if pattern in text)
+    assert etl.TagMatcher(patterns).search(text) == expected
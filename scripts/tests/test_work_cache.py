@@ -0,0 +1,75 @@
+import sqlite3
+import time
+
+import etl_pipeline as etl
+
+
+def writes(cache):
+    """Record the data-changing statements the cache runs from here on."""
+    statements = []
+    cache._conn.set_trace_callback(
+        lambda sql: statements.append(sql)
+        if sql.split()[0].upper() in ("UPDATE", "INSERT", "DELETE", "COMMIT")
+        else None
+    )
+    return statements
+
+
+def test_hits_do_not_write_until_a_batch_fills(tmp_path):
+    cache = etl.WorkCache(str(tmp_path))
+    keys = [f"work:{i}" for i in range(cache.TOUCH_BATCH)]
+    for key in keys:
+        cache.set(key, {"title": key})
+    statements = writes(cache)
+
+    for _ in range(3):
+        for key in keys[:-1]:
+            assert cache.get(key, ttl=60) == {"title": key}
+    assert statements == []
+
+    cache.get(keys[-1], ttl=60)
+    assert [s.split()[0].upper() for s in statements] == ["UPDATE"] * len(keys) + ["COMMIT"]
+    assert cache.hits == 3 * (len(keys) - 1) + 1
+    cache.close()
+
+
+def test_recent_hits_survive_eviction(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = etl.WorkCache(str(tmp_path), max_bytes=100)
+    value = "x" * 30
+    for key in ("a", "b"):
+        cache.set(key, value)
+        now[0] += 1
+    cache.get("a", ttl=60)
+    now[0] += 1
+
+    cache.set("c", value)
+    cache.set("d", value)
+
+    assert cache.get("a", ttl=60) == value
+    assert cache.get("b", ttl=60) is None
+    cache.close()
+
+
+def test_close_writes_pending_access_times(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = etl.WorkCache(str(tmp_path))
+    cache.set("a", 1)
+    now[0] += 5
+    cache.get("a", ttl=60)
+    cache.close()
+
+    conn = sqlite3.connect(cache.path)
+    assert conn.execute("SELECT accessed_at FROM entries WHERE key = 'a'").fetchone() == (1005.0,)
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = etl.WorkCache(str(tmp_path))
+    cache.set("a", 1)
+    cache.get("a", ttl=60)
+    assert cache.get("a", ttl=-1) is None
+    assert cache.get("a", ttl=60) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.close()
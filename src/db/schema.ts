@@ -1,4 +1,4 @@
-import { sqliteTable, text, integer, primaryKey } from 'drizzle-orm/sqlite-core';
+import { sqliteTable, text, integer, primaryKey, index, uniqueIndex } from 'drizzle-orm/sqlite-core';
 import { relations } from 'drizzle-orm';
 
 /**
@@ -9,6 +9,9 @@ import { relations } from 'drizzle-orm';
  * - ratings: Vote ledger for community ratings (write-heavy)
  * - shared_collections: User-shared bookshelf snapshots
  * - fic_reports: Dead link/error reporting table
+ * - tags / fic_tags: Normalized tag index written by the ETL
+ * - fic_counts: Listing totals per filter combination, written by the ETL
+ * - fic_facets: Filter facet counts (rating, status, word bucket, tags), written by the ETL
  */
 
 // Table: fics - Core Content Table
@@ -50,7 +53,24 @@ export const fics = sqliteTable('fics', {
   quote: text('quote'),
   createdAt: integer('created_at', { mode: 'timestamp' }).$defaultFn(() => new Date()),
   updatedAt: integer('updated_at', { mode: 'timestamp' }).$defaultFn(() => new Date()),
-});
+
+  // Blind-box moods (base meter >= 4) and a random sort key, both maintained by the ETL
+  moodFluff: integer('mood_fluff', { mode: 'boolean' }).notNull().default(false),
+  moodAngst: integer('mood_angst', { mode: 'boolean' }).notNull().default(false),
+  moodSpicy: integer('mood_spicy', { mode: 'boolean' }).notNull().default(false),
+  randKey: integer('rand_key').notNull().default(0),
+}, (table) => [
+  index('fics_rand_key_idx').on(table.randKey),
+  index('fics_mood_fluff_rand_key_idx').on(table.moodFluff, table.randKey),
+  index('fics_mood_angst_rand_key_idx').on(table.moodAngst, table.randKey),
+  index('fics_mood_spicy_rand_key_idx').on(table.moodSpicy, table.randKey),
+  // Listing: one covering index per sort, keyed on (column, id) for keyset paging.
+  // The ETL also creates these after each load (LISTING_INDEXES in scripts/etl/sql.py)
+  index('fics_created_at_id_idx').on(table.createdAt, table.id, table.rating, table.status, table.words),
+  index('fics_kudos_id_idx').on(table.kudos, table.id, table.rating, table.status, table.words),
+  index('fics_words_id_idx').on(table.words, table.id, table.rating, table.status),
+  index('fics_rating_status_words_idx').on(table.rating, table.status, table.words),
+]);
 
 // Table: ratings - Vote Ledger Table
 // Using composite PK (ficId + ipHash) for vote deduplication
@@ -102,10 +122,69 @@ export const ficReports = sqliteTable('fic_reports', {
   createdAt: integer('created_at', { mode: 'timestamp' }).$defaultFn(() => new Date()),
 });
 
+// Table: tags - Interned AO3 tags
+// Written by the ETL only; ids are derived from the tag name
+export const tags = sqliteTable('tags', {
+  id: integer('id').primaryKey(),
+
+  name: text('name').notNull(),
+
+  kind: text('kind', { enum: ['fandom', 'character', 'relationship', 'freeform'] }).notNull(),
+}, (table) => [
+  uniqueIndex('tags_name_idx').on(table.name),
+  index('tags_kind_name_idx').on(table.kind, table.name),
+]);
+
+// Table: fic_tags - Fic <-> Tag Index
+// Mirrors fics.tags_json; no foreign keys, the ETL keeps it in sync
+export const ficTags = sqliteTable('fic_tags', {
+  ficId: text('fic_id').notNull(),
+
+  tagId: integer('tag_id').notNull(),
+}, (table) => [
+  primaryKey({
+    columns: [table.ficId, table.tagId],
+  }),
+  index('fic_tags_tag_id_idx').on(table.tagId, table.ficId),
+]);
+
+// Table: fic_counts - Listing Totals
+// Rebuilt by the ETL after each load; '' stands for a missing rating/status
+export const ficCounts = sqliteTable('fic_counts', {
+  rating: text('rating').notNull(),
+
+  status: text('status').notNull(),
+
+  wordBucket: text('word_bucket', { enum: ['short', 'medium', 'long', 'epic', 'legendary'] }).notNull(),
+
+  count: integer('count').notNull(),
+}, (table) => [
+  primaryKey({
+    columns: [table.rating, table.status, table.wordBucket],
+  }),
+]);
+
+// Table: fic_facets - Filter Facet Counts
+// facet is 'rating', 'status', 'words' or a tag kind (value = tag name);
+// kept current by the ETL on every load
+export const ficFacets = sqliteTable('fic_facets', {
+  facet: text('facet').notNull(),
+
+  value: text('value').notNull(),
+
+  count: integer('count').notNull(),
+}, (table) => [
+  primaryKey({
+    columns: [table.facet, table.value],
+  }),
+  index('fic_facets_facet_count_idx').on(table.facet, table.count),
+]);
+
 // Relations
 export const ficsRelations = relations(fics, ({ many }) => ({
   ratings: many(ratings),
   reports: many(ficReports),
+  tags: many(ficTags),
 }));
 
 export const ratingsRelations = relations(ratings, ({ one }) => ({
@@ -122,6 +201,21 @@ export const ficReportsRelations = relations(ficReports, ({ one }) => ({
   }),
 }));
 
+export const tagsRelations = relations(tags, ({ many }) => ({
+  fics: many(ficTags),
+}));
+
+export const ficTagsRelations = relations(ficTags, ({ one }) => ({
+  fic: one(fics, {
+    fields: [ficTags.ficId],
+    references: [fics.id],
+  }),
+  tag: one(tags, {
+    fields: [ficTags.tagId],
+    references: [tags.id],
+  }),
+}));
+
 // Type Exports
 export type Fic = typeof fics.$inferSelect;
 export type NewFic = typeof fics.$inferInsert;
@@ -134,3 +228,15 @@ export type NewSharedCollection = typeof sharedCollections.$inferInsert;
 
 export type FicReport = typeof ficReports.$inferSelect;
 export type NewFicReport = typeof ficReports.$inferInsert;
+
+export type Tag = typeof tags.$inferSelect;
+export type NewTag = typeof tags.$inferInsert;
+
+export type FicTag = typeof ficTags.$inferSelect;
+export type NewFicTag = typeof ficTags.$inferInsert;
+
+export type FicCount = typeof ficCounts.$inferSelect;
+export type NewFicCount = typeof ficCounts.$inferInsert;
+
+export type FicFacet = typeof ficFacets.$inferSelect;
+export type NewFicFacet = typeof ficFacets.$inferInsert;
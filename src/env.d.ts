@@ -1,5 +1,10 @@
 /// <reference types="astro/client" />
 
+interface ImportMetaEnv {
+  // Base URL of the static JSON shards written by etl_pipeline.py --shards-dir
+  readonly PUBLIC_FIC_SHARDS_URL?: string;
+}
+
 type Runtime = import("@astrojs/cloudflare").Runtime<Env>;
 
 interface Env {
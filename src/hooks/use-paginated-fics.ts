@@ -8,6 +8,29 @@ interface FicsPageResponse {
   total?: number;
   hasMore: boolean;
   nextOffset: number;
+  nextCursor?: string;
+}
+
+// Pre-rendered listing pages (scripts/etl_pipeline.py --shards-dir), when deployed
+const SHARDS_URL = import.meta.env.PUBLIC_FIC_SHARDS_URL?.replace(/\/$/, '');
+
+/** Shard directory of a listing, if its filters were pre-rendered */
+function shardPath(filters: FilterState): string | undefined {
+  if (!SHARDS_URL || filters.q.trim() || filters.wordCount !== 'any' || filters.ratings.length > 1) {
+    return undefined;
+  }
+  return `${SHARDS_URL}/listing/${filters.sort}/${filters.ratings[0] ?? 'all'}/${filters.status ?? 'all'}`;
+}
+
+/** A pre-rendered page, or null when it wasn't rendered or can't be fetched */
+async function fetchShard(url: string, signal: AbortSignal): Promise<FicsPageResponse | null> {
+  try {
+    const response = await fetch(url, { signal });
+    if (response.ok) return await response.json() as FicsPageResponse;
+  } catch (error) {
+    if ((error as Error).name === "AbortError") throw error;
+  }
+  return null;
 }
 
 interface PaginatedFicsResult {
@@ -31,6 +54,10 @@ export const usePaginatedFics = (pageSize: number, filters: FilterState): Pagina
   const [debouncedQ, setDebouncedQ] = useState(filters.q);
 
   const nextOffsetRef = useRef(0);
+  // Keyset cursor of the next page; offset stays as the fallback
+  const nextCursorRef = useRef<string | undefined>(undefined);
+  // Set once a shard is missing (past the pre-rendered pages); the rest comes from the API
+  const shardsDoneRef = useRef(false);
   const loadingMoreRef = useRef(false);
   const abortRef = useRef<AbortController | null>(null);
   const reqIdRef = useRef(0);
@@ -51,22 +78,32 @@ export const usePaginatedFics = (pageSize: number, filters: FilterState): Pagina
     q: debouncedQ,
   };
   const filterParams = buildFilterParams(effectiveFilters);
+  const shards = shardPath(effectiveFilters);
 
-  const fetchPage = useCallback(async (offset: number, paramStr: string): Promise<FicsPageResponse | null> => {
+  const fetchPage = useCallback(async (offset: number, cursor: string | undefined, paramStr: string, shardDir?: string): Promise<FicsPageResponse | null> => {
     abortRef.current?.abort();
     const controller = new AbortController();
     abortRef.current = controller;
     const reqId = ++reqIdRef.current;
 
     try {
-      const sep = paramStr ? '&' : '';
-      const url = `/api/fics?limit=${pageSize}&offset=${offset}${sep}${paramStr}`;
-      const response = await fetch(url, { signal: controller.signal });
-      if (!response.ok) {
-        throw new Error(`Failed to fetch fics: ${response.status}`);
+      let data: FicsPageResponse | null = null;
+      if (shardDir && !shardsDoneRef.current) {
+        data = await fetchShard(`${shardDir}/${offset}.json`, controller.signal);
+        if (!data) shardsDoneRef.current = true;
+      }
+
+      if (!data) {
+        const sep = paramStr ? '&' : '';
+        const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+        const url = `/api/fics?limit=${pageSize}&offset=${offset}${cursorParam}${sep}${paramStr}`;
+        const response = await fetch(url, { signal: controller.signal });
+        if (!response.ok) {
+          throw new Error(`Failed to fetch fics: ${response.status}`);
+        }
+        data = await response.json() as FicsPageResponse;
       }
 
-      const data = await response.json() as FicsPageResponse;
       if (!Array.isArray(data.items)) {
         throw new Error("Unexpected API response format");
       }
@@ -95,9 +132,11 @@ export const usePaginatedFics = (pageSize: number, filters: FilterState): Pagina
       setHasMore(true);
       setError(null);
       nextOffsetRef.current = 0;
+      nextCursorRef.current = undefined;
+      shardsDoneRef.current = false;
       loadingMoreRef.current = false;
 
-      const data = await fetchPage(0, filterParams);
+      const data = await fetchPage(0, undefined, filterParams, shards);
       if (cancelled) return;
 
       if (data) {
@@ -105,6 +144,7 @@ export const usePaginatedFics = (pageSize: number, filters: FilterState): Pagina
         setTotal(data.total ?? null);
         setHasMore(data.hasMore);
         nextOffsetRef.current = data.nextOffset;
+        nextCursorRef.current = data.nextCursor;
       }
       setIsInitialLoading(false);
     };
@@ -114,23 +154,24 @@ export const usePaginatedFics = (pageSize: number, filters: FilterState): Pagina
     return () => {
       cancelled = true;
     };
-  }, [fetchPage, filterParams]);
+  }, [fetchPage, filterParams, shards]);
 
   const loadMore = useCallback(async () => {
     if (loadingMoreRef.current || !hasMore) return;
     loadingMoreRef.current = true;
     setIsLoadingMore(true);
 
-    const data = await fetchPage(nextOffsetRef.current, filterParams);
+    const data = await fetchPage(nextOffsetRef.current, nextCursorRef.current, filterParams, shards);
     if (data) {
       setItems((prev) => [...prev, ...data.items]);
       setHasMore(data.hasMore);
       nextOffsetRef.current = data.nextOffset;
+      nextCursorRef.current = data.nextCursor;
     }
 
     loadingMoreRef.current = false;
     setIsLoadingMore(false);
-  }, [fetchPage, filterParams, hasMore]);
+  }, [fetchPage, filterParams, hasMore, shards]);
 
   return { items, total, error, hasMore, isInitialLoading, isLoadingMore, loadMore };
 };
@@ -6,8 +6,39 @@ const VALID_SORTS: SortOption[] = ['default', 'kudos', 'words_desc', 'words_asc'
 const VALID_RATINGS: Rating[] = ['G', 'T', 'M', 'E'];
 const VALID_STATUSES = ['completed', 'ongoing'] as const;
 
-export function escapeLike(str: string): string {
-  return str.replace(/[%_\\]/g, (ch) => `\\${ch}`);
+/**
+ * Turn a free-text query into an FTS5 MATCH expression for fics_fts.
+ * Words are quoted (so FTS5 syntax in the input is inert) and ANDed; the
+ * last word is a prefix match for search-as-you-type.
+ */
+export function buildFtsQuery(str: string): string | undefined {
+  const words = str.match(/[\p{L}\p{N}]+/gu);
+  if (!words) return undefined;
+  return words
+    .map((word, i) => (i === words.length - 1 ? `"${word}"*` : `"${word}"`))
+    .join(' ');
+}
+
+/**
+ * The word count buckets a minWords/maxWords filter covers exactly, so its
+ * total can be summed from fic_counts. Undefined when a bound falls inside
+ * a bucket.
+ */
+export function wordBucketsFor(minWords?: number, maxWords?: number): WordCountBucket[] | undefined {
+  const min = minWords ?? 0;
+  const max = maxWords ?? Infinity;
+  const buckets: WordCountBucket[] = [];
+  for (const [bucket, range] of Object.entries(WORD_COUNT_RANGES) as [WordCountBucket, typeof WORD_COUNT_RANGES[WordCountBucket]][]) {
+    if (bucket === 'any') continue;
+    const lo = range.min ?? 0;
+    const hi = range.max ?? Infinity;
+    if (lo >= min && hi <= max) {
+      buckets.push(bucket);
+    } else if (lo <= max && hi >= min) {
+      return undefined;
+    }
+  }
+  return buckets;
 }
 
 export function buildFilterParams(filters: FilterState): string {
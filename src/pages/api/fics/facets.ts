@@ -0,0 +1,67 @@
+import type { APIRoute } from "astro";
+import { desc, eq, inArray } from "drizzle-orm";
+import { ficFacets } from "@/db/schema";
+
+const DEFAULT_TAG_LIMIT = 20;
+const MAX_TAG_LIMIT = 100;
+
+const COUNT_FACETS = { rating: "ratings", status: "statuses", words: "wordCounts" } as const;
+const TAG_KINDS = ["fandom", "character", "relationship", "freeform"] as const;
+
+type TagKind = typeof TAG_KINDS[number];
+
+// Filter counts maintained by the ETL in fic_facets: rating/status/word bucket
+// counts are primary-key reads, top tags per kind a short fic_facets_facet_count_idx scan
+export const GET: APIRoute = async ({ locals, request }) => {
+  try {
+    const url = new URL(request.url);
+    const rawLimit = Number.parseInt(url.searchParams.get("tags") ?? "", 10);
+    const tagLimit = Number.isNaN(rawLimit)
+      ? DEFAULT_TAG_LIMIT
+      : Math.min(Math.max(rawLimit, 0), MAX_TAG_LIMIT);
+
+    const [counts, ...topTags] = await Promise.all([
+      locals.db
+        .select()
+        .from(ficFacets)
+        .where(inArray(ficFacets.facet, Object.keys(COUNT_FACETS))),
+      ...TAG_KINDS.map((kind) =>
+        locals.db
+          .select({ name: ficFacets.value, count: ficFacets.count })
+          .from(ficFacets)
+          .where(eq(ficFacets.facet, kind))
+          .orderBy(desc(ficFacets.count))
+          .limit(tagLimit)
+      ),
+    ]);
+
+    const body = {
+      ratings: {} as Record<string, number>,
+      statuses: {} as Record<string, number>,
+      wordCounts: {} as Record<string, number>,
+      tags: {} as Record<TagKind, { name: string; count: number }[]>,
+    };
+    for (const row of counts) {
+      // '' counts fics without a rating/status, which no filter selects
+      if (!row.value) continue;
+      body[COUNT_FACETS[row.facet as keyof typeof COUNT_FACETS]][row.value] = row.count;
+    }
+    TAG_KINDS.forEach((kind, i) => {
+      body.tags[kind] = topTags[i];
+    });
+
+    return new Response(JSON.stringify(body), {
+      status: 200,
+      headers: {
+        "Content-Type": "application/json",
+        "Cache-Control": "public, max-age=60",
+      },
+    });
+  } catch (e) {
+    const message = e instanceof Error ? e.message : "Unknown error";
+    return new Response(JSON.stringify({ error: message }), {
+      status: 500,
+      headers: { "Content-Type": "application/json" },
+    });
+  }
+};
@@ -1,8 +1,10 @@
 import type { APIRoute } from "astro";
-import { and, or, eq, inArray, gte, lte, desc, asc, sql } from "drizzle-orm";
-import { fics } from "@/db/schema";
+import { and, eq, inArray, gte, lte, desc, asc, sql } from "drizzle-orm";
+import type { SQL } from "drizzle-orm";
+import { ficCounts, fics } from "@/db/schema";
 import { dbFicToFic } from "@/lib/fic-transform";
-import { parseFilterParams, escapeLike } from "@/lib/filter-utils";
+import { parseFilterParams, buildFtsQuery, wordBucketsFor } from "@/lib/filter-utils";
+import type { ParsedFilterParams } from "@/lib/filter-utils";
 import type { SortOption } from "@/types/filters";
 
 const DEFAULT_LIMIT = 24;
@@ -15,17 +17,102 @@ function parsePositiveInt(value: string | null, fallback: number): number {
   return parsed;
 }
 
-function getOrderClauses(sort: SortOption) {
-  switch (sort) {
-    case 'kudos':
-      return [desc(fics.kudos), desc(fics.id)];
-    case 'words_desc':
-      return [desc(fics.words), desc(fics.id)];
-    case 'words_asc':
-      return [asc(fics.words), asc(fics.id)];
-    default:
-      return [desc(fics.createdAt), desc(fics.id)];
+// fics_fts ranking, weighting title > author > tags > summary (lower is better)
+const FTS_RANK = sql.raw('bm25(fics_fts, 10.0, 5.0, 1.0, 3.0)');
+
+// Searches join fics_fts once. Its rowid is the numeric fic id; casting the
+// rowid (not fics.id) lets each match look its fic up by primary key
+const FTS_TABLE = sql.raw('fics_fts');
+const FTS_JOIN = sql`${fics.id} = CAST(fics_fts.rowid AS TEXT)`;
+
+// Sort key of each SortOption; (column, id) is unique, so it doubles as the
+// keyset cursor and matches a covering fics_*_id_idx index
+const SORT_KEYS = {
+  default: { column: fics.createdAt, ascending: false },
+  kudos: { column: fics.kudos, ascending: false },
+  words_desc: { column: fics.words, ascending: false },
+  words_asc: { column: fics.words, ascending: true },
+} as const;
+
+type CursorValue = string | number;
+
+function getOrderClauses(sort: SortOption, ftsQuery?: string) {
+  const { column, ascending } = SORT_KEYS[sort];
+  const direction = ascending ? asc : desc;
+  const clauses = [direction(column), direction(fics.id)];
+  if (sort === 'default' && ftsQuery) {
+    // Rank matches by relevance, from the joined fics_fts row
+    return [asc(FTS_RANK), ...clauses];
   }
+  return clauses;
+}
+
+function encodeCursor(value: CursorValue, id: string): string {
+  return btoa(JSON.stringify([value, id]));
+}
+
+function decodeCursor(cursor: string): [CursorValue, string] | undefined {
+  try {
+    const decoded = JSON.parse(atob(cursor));
+    if (
+      Array.isArray(decoded) &&
+      decoded.length === 2 &&
+      (typeof decoded[0] === "string" || typeof decoded[0] === "number") &&
+      typeof decoded[1] === "string"
+    ) {
+      return [decoded[0], decoded[1]];
+    }
+  } catch {
+    // fall through
+  }
+  return undefined;
+}
+
+// Rows strictly after the cursor in the sort's order (a row-value range
+// seek on the sort's index)
+function afterCursor(sort: SortOption, [value, id]: [CursorValue, string]): SQL {
+  const { column, ascending } = SORT_KEYS[sort];
+  return ascending
+    ? sql`(${column}, ${fics.id}) > (${value}, ${id})`
+    : sql`(${column}, ${fics.id}) < (${value}, ${id})`;
+}
+
+async function countTotal(
+  db: App.Locals["db"],
+  params: ParsedFilterParams,
+  whereClause: SQL | undefined,
+  ftsQuery?: string,
+): Promise<number> {
+  // Filters on rating/status/whole word buckets are summed from the
+  // fic_counts totals the ETL keeps; anything else counts the matches
+  const buckets = ftsQuery ? undefined : wordBucketsFor(params.minWords, params.maxWords);
+  if (buckets) {
+    const conditions = [];
+    if (params.ratings && params.ratings.length > 0) {
+      conditions.push(inArray(ficCounts.rating, params.ratings));
+    }
+    if (params.status) {
+      conditions.push(eq(ficCounts.status, params.status));
+    }
+    if (params.minWords !== undefined || params.maxWords !== undefined) {
+      conditions.push(inArray(ficCounts.wordBucket, buckets));
+    }
+    const result = await db
+      .select({ total: sql<number | null>`sum(${ficCounts.count})` })
+      .from(ficCounts)
+      .where(conditions.length > 0 ? and(...conditions) : undefined);
+    return result[0]?.total ?? 0;
+  }
+
+  let query = db
+    .select({ count: sql<number>`count(*)` })
+    .from(fics)
+    .$dynamic();
+  if (ftsQuery) {
+    query = query.innerJoin(FTS_TABLE, FTS_JOIN);
+  }
+  const result = await query.where(whereClause);
+  return result[0]?.count ?? 0;
 }
 
 export const GET: APIRoute = async ({ locals, request }) => {
@@ -37,17 +124,20 @@ export const GET: APIRoute = async ({ locals, request }) => {
 
     const params = parseFilterParams(url);
 
+    const rawCursor = url.searchParams.get("cursor");
+    const cursor = rawCursor ? decodeCursor(rawCursor) : undefined;
+    if (rawCursor && !cursor) {
+      return new Response(JSON.stringify({ error: "Invalid cursor" }), {
+        status: 400,
+        headers: { "Content-Type": "application/json" },
+      });
+    }
+
     const conditions = [];
 
-    if (params.q) {
-      const pattern = `%${escapeLike(params.q)}%`;
-      conditions.push(
-        or(
-          sql`${fics.title} LIKE ${pattern} ESCAPE '\\'`,
-          sql`${fics.author} LIKE ${pattern} ESCAPE '\\'`,
-          sql`${fics.tagsJson} LIKE ${pattern} ESCAPE '\\'`,
-        )
-      );
+    const ftsQuery = params.q ? buildFtsQuery(params.q) : undefined;
+    if (ftsQuery) {
+      conditions.push(sql`fics_fts MATCH ${ftsQuery}`);
     }
 
     if (params.ratings && params.ratings.length > 0) {
@@ -67,36 +157,52 @@ export const GET: APIRoute = async ({ locals, request }) => {
     }
 
     const whereClause = conditions.length > 0 ? and(...conditions) : undefined;
-    const orderClauses = getOrderClauses(params.sort);
+    const orderClauses = getOrderClauses(params.sort, ftsQuery);
+
+    // Relevance-ranked search pages by offset; every other listing is keyset
+    const keyset = !(params.sort === 'default' && ftsQuery);
 
     let total: number | undefined;
-    if (offset === 0) {
-      const countResult = await locals.db
-        .select({ count: sql<number>`count(*)` })
-        .from(fics)
-        .where(whereClause);
-      total = countResult[0]?.count ?? 0;
+    if (offset === 0 && !cursor) {
+      total = await countTotal(locals.db, params, whereClause, ftsQuery);
     }
 
-    const rows = await locals.db
-      .select()
+    const pageWhere = keyset && cursor
+      ? and(whereClause, afterCursor(params.sort, cursor))
+      : whereClause;
+
+    let query = locals.db
+      .select({ fic: fics, sortValue: sql<CursorValue | null>`${SORT_KEYS[params.sort].column}` })
       .from(fics)
-      .where(whereClause)
+      .$dynamic();
+    if (ftsQuery) {
+      query = query.innerJoin(FTS_TABLE, FTS_JOIN);
+    }
+
+    const rows = await query
+      .where(pageWhere)
       .orderBy(...orderClauses)
       .limit(limit + 1)
-      .offset(offset);
+      .offset(keyset && cursor ? 0 : offset);
 
     const hasMore = rows.length > limit;
     const pageRows = hasMore ? rows.slice(0, limit) : rows;
-    const items = pageRows.map(dbFicToFic);
+    const items = pageRows.map((row) => dbFicToFic(row.fic));
     const nextOffset = offset + items.length;
 
+    // A NULL sort value can't be compared, so that page continues by offset
+    const last = pageRows[pageRows.length - 1];
+    const nextCursor = keyset && hasMore && last && last.sortValue !== null
+      ? encodeCursor(last.sortValue, last.fic.id)
+      : undefined;
+
     return new Response(
       JSON.stringify({
         items,
         total,
         hasMore,
         nextOffset,
+        nextCursor,
       }),
       {
         status: 200,
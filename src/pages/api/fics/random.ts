@@ -1,14 +1,16 @@
 import type { APIRoute } from "astro";
-import { sql, gte } from "drizzle-orm";
+import { and, asc, eq, gte, type SQL } from "drizzle-orm";
 import { fics } from "@/db/schema";
 import { dbFicToFic } from "@/lib/fic-transform";
 
-const MOOD_THRESHOLD = 4;
+// rand_key is uniform in [0, RAND_KEY_RANGE), redrawn whenever the ETL writes a row
+const RAND_KEY_RANGE = 2 ** 31;
 
+// Flags precomputed by the ETL (base meter >= 4), each indexed with rand_key
 const MOOD_COLUMN = {
-  fluff: fics.baseFluff,
-  angst: fics.baseAngst,
-  spicy: fics.baseSpice,
+  fluff: fics.moodFluff,
+  angst: fics.moodAngst,
+  spicy: fics.moodSpicy,
 } as const;
 
 type Mood = keyof typeof MOOD_COLUMN;
@@ -17,25 +19,42 @@ function isValidMood(value: string): value is Mood {
   return value in MOOD_COLUMN;
 }
 
+/**
+ * Pick a random fic with one index seek: the first rand_key at or after a
+ * random start, wrapping around to the lowest key.
+ */
+async function pickRandom(db: App.Locals["db"], condition?: SQL) {
+  const start = Math.floor(Math.random() * RAND_KEY_RANGE);
+
+  const rows = await db
+    .select()
+    .from(fics)
+    .where(and(condition, gte(fics.randKey, start)))
+    .orderBy(asc(fics.randKey))
+    .limit(1);
+  if (rows.length > 0) return rows;
+
+  return db
+    .select()
+    .from(fics)
+    .where(condition)
+    .orderBy(asc(fics.randKey))
+    .limit(1);
+}
+
 export const GET: APIRoute = async ({ locals, request }) => {
   try {
     const url = new URL(request.url);
     const moodParam = url.searchParams.get("mood");
 
-    let query = locals.db.select().from(fics);
-
-    if (moodParam && isValidMood(moodParam)) {
-      query = query.where(gte(MOOD_COLUMN[moodParam], MOOD_THRESHOLD));
-    }
+    const moodCondition = moodParam && isValidMood(moodParam)
+      ? eq(MOOD_COLUMN[moodParam], true)
+      : undefined;
 
-    let rows = await query.orderBy(sql`RANDOM()`).limit(1);
+    let rows = await pickRandom(locals.db, moodCondition);
 
     if (rows.length === 0 && moodParam) {
-      rows = await locals.db
-        .select()
-        .from(fics)
-        .orderBy(sql`RANDOM()`)
-        .limit(1);
+      rows = await pickRandom(locals.db);
     }
 
     if (rows.length === 0) {